@@ -1,7 +1,8 @@
 from ptychoep.backend.backend import np
 from ptychoep.rng.rng_utils import get_rng, normal
 from ptychoep.ptycho.core import Ptycho
-from ptychoep.ptycho.projector import Fourier_projector
+from ptychoep.ptycho.projector import FourierProjector
+from ptychoep.utils.run_control import RunMonitor, copy_result
 
 class BasePIE:
     """
@@ -12,12 +13,20 @@ class BasePIE:
     overall optimization loop and interface for updating the object function, while 
     allowing specific update rules to be implemented in derived classes.
 
+    The inner loop works on preallocated (H, W) workspaces: the exit wave, the
+    projection residual (owned by a FourierProjector), the object-update weight
+    derived from the probe and a copy of the previous object patch. `self.obj`
+    and `self.prb` are updated in place, so a scan costs a fixed number of
+    array passes and no allocations. Probe-derived quantities are recomputed
+    by `_refresh_probe_cache` only after the probe has changed.
+
     Attributes:
         ptycho (Ptycho): Container for scan positions, probe, and diffraction data.
         alpha (float): Step size parameter for object update.
         obj (ndarray): Complex-valued object array (reconstruction target).
         prb (ndarray): Complex-valued probe array (copied from input ptycho).
-        fft2, ifft2: Fourier transform functions based on the current backend (numpy or cupy).
+        update_probe (bool): Whether the probe is updated after every object update.
+        projector (FourierProjector): Fourier-magnitude projector with reusable workspaces.
         callback (callable): Optional function called after each iteration: callback(it, err, obj).
 
     Args:
@@ -27,15 +36,27 @@ class BasePIE:
         dtype: Data type for internal arrays (default: complex64).
         callback (callable or None): Optional callback function for logging or visualization.
         seed (int or None): Random seed for reproducible initialization (if obj_init is None).
+        compact_roi (bool): If True, reconstruct on the scanned region only
+            (`Ptycho.compacted`). `self.ptycho`, `self.obj` and the callback use the
+            compact grid; `run` maps the object back to the full grid (zero outside).
 
     Methods:
-        run(n_iter=100): Executes the reconstruction for a given number of iterations.
-        _update_object(...): Abstract method to be implemented in subclasses to define
-                             how the object is updated at each scan position.
+        run(n_iter=100, time_budget=None, target_error=None, stall_patience=None):
+            Executes the reconstruction until a stopping criterion is met (see RunMonitor).
+        _refresh_probe_cache(): Abstract method computing the object-update weight from the probe.
+        _update_object(...): Applies the object update at one scan position (in place).
+        _update_probe(...): Applies the probe update at one scan position (in place).
+        _end_sweep(it, err): Hook called after every sweep, e.g. for momentum steps.
     """
 
-    def __init__(self, ptycho: Ptycho, alpha: float = 0.1, obj_init=None, dtype = np().complex64, callback=None, seed : int = None):
+    update_probe = False
+
+    def __init__(self, ptycho: Ptycho, alpha: float = 0.1, obj_init=None, dtype = np().complex64, callback=None, seed : int = None,
+                 compact_roi: bool = False):
         self.xp = np() 
+        if compact_roi:
+            ptycho = ptycho.compacted()
+            obj_init = ptycho.crop(obj_init)
         self.ptycho = ptycho
         self.alpha = self.xp.asarray(alpha)
         self.callback = callback
@@ -50,30 +71,96 @@ class BasePIE:
 
         # Set probe
         self.prb = self.xp.array(ptycho.prb.copy())
-        # FFT
-        self.fft2 = self.xp.fft.fft2
-        self.ifft2 = self.xp.fft.ifft2
-
-    def run(self, n_iter=100):
-        for it in range(n_iter):
+        self.projector = FourierProjector()
+        self._workspaces = None
+        self._probe_dirty = True
+
+    def _allocate_workspaces(self):
+        """Allocate the per-scan (H, W) workspaces (done once, on the first run)."""
+        xp = self.xp
+        shape = self.prb.shape
+        cdtype = xp.result_type(self.obj.dtype, self.prb.dtype)
+        rdtype = xp.empty(0, dtype=cdtype).real.dtype
+        self._exit = xp.empty(shape, dtype=cdtype)
+        self._obj_weight = xp.empty(shape, dtype=cdtype)
+        self._tmp = xp.empty(shape, dtype=cdtype)
+        self._old_patch = xp.empty(shape, dtype=cdtype)
+        self._rtmp = xp.empty(shape, dtype=rdtype)
+        self._workspaces = True
+
+    def _max_abs2(self, arr):
+        """max |arr|^2, using the real workspace."""
+        self.xp.abs(arr, out=self._rtmp)
+        return self.xp.max(self._rtmp) ** 2
+
+    def run(self, n_iter=100, time_budget=None, target_error=None, stall_patience=None):
+        """
+        Run the reconstruction.
+
+        Stops after `n_iter` sweeps, or earlier on `time_budget` (seconds),
+        `target_error` or `stall_patience` (see RunMonitor). If any of the
+        latter is set, the best-so-far estimate is returned. The monitor is
+        kept as `self.monitor`.
+        """
+        if self._workspaces is None:
+            self._allocate_workspaces()
+        xp = self.xp
+        n_scan = len(self.ptycho._diff_data)
+        monitor = self.monitor = RunMonitor(n_iter, time_budget, target_error, stall_patience)
+
+        for it in monitor:
             err = 0.0
             for d in self.ptycho._diff_data:
-                yy, xx = d.indices
-                obj_patch = self.obj[yy, xx]
-                exit_wave = self.prb * obj_patch
+                if self._probe_dirty:
+                    self._refresh_probe_cache()
+                    self._probe_dirty = False
 
-                proj_wave, error_val = Fourier_projector(exit_wave, d.diffraction)
+                patch = self.obj[d.indices]
+                xp.multiply(self.prb, patch, out=self._exit)
+                residual, error_val = self.projector.residual(self._exit, d.amplitude())
                 err += error_val
 
-                self._update_object(proj_wave, exit_wave, (yy, xx))
+                if self.update_probe:
+                    self._old_patch[...] = patch
+                self._update_object(residual, patch)
+                if self.update_probe:
+                    self._update_probe(residual, self._old_patch)
+                    self._probe_dirty = True
 
-            avg_err = float(err / len(self.ptycho._diff_data))
+            avg_err = float(err / n_scan)
+            self._end_sweep(it, avg_err)
 
             if self.callback:
                 self.callback(it, avg_err, self.obj)
+            monitor.record(avg_err, lambda: copy_result(self._result()))
 
+        return self.ptycho.expand_result(monitor.result(self._result()))
+
+    def _result(self):
         return self.obj
 
+    def _end_sweep(self, it, err):
+        """Hook called after each full sweep over the scans (before the callback)."""
+        pass
 
-    def _update_object(self, proj_wave, exit_wave, indices):
+    def _refresh_probe_cache(self):
+        """Recompute `self._obj_weight` (and any other probe statistics) from `self.prb`."""
         raise NotImplementedError("派生クラスで実装してください")
+
+    def _update_object(self, residual, patch):
+        """patch += obj_weight * (proj - exit); `patch` is a view into `self.obj`."""
+        self.xp.multiply(self._obj_weight, residual, out=self._tmp)
+        patch += self._tmp
+
+    def _update_probe(self, residual, old_patch):
+        """
+        ePIE-style probe step: prb += beta * conj(O) * (proj - exit) / max|O|^2.
+
+        `old_patch` is a workspace holding the object patch before the object
+        update, and is overwritten.
+        """
+        scale = self.beta / self._max_abs2(old_patch)
+        self.xp.conjugate(old_patch, out=old_patch)
+        old_patch *= residual
+        old_patch *= scale
+        self.prb += old_patch
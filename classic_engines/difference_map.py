@@ -1,56 +1,11 @@
 # utils/engines/difference_map.py
-from ptychoep.backend.backend import np
+import os
+import tempfile
+import numpy as _np
+from ptychoep.backend.backend import np, is_cupy
 from ptychoep.rng.rng_utils import get_rng, normal
-from ptychoep.ptycho.projector import Fourier_projector
-
-def _normalize_index_to_arrays(idx, xp):
-    """
-    Normalize indexing formats to flat array indices.
-
-    Converts a 2D slice-based index (slice, slice) or tuple of arrays (yy, xx)
-    into flattened (yy_flat, xx_flat) arrays for consistent scatter/gather operations.
-
-    This is especially useful in algorithms like Difference Map where object updates
-    rely on scatter-add operations over overlapping scan regions.
-
-    Args:
-        idx (tuple): A tuple of either (slice, slice) or (ndarray, ndarray) indexers.
-        xp: The backend module (numpy or cupy).
-
-    Returns:
-        tuple: A pair of 1D arrays (yy, xx) representing flattened y- and x-coordinates.
-    """
-    y_idx, x_idx = idx
-    if isinstance(y_idx, slice) and isinstance(x_idx, slice):
-        y = xp.arange(y_idx.start, y_idx.stop)
-        x = xp.arange(x_idx.start, x_idx.stop)
-        YY, XX = xp.meshgrid(y, x, indexing="ij")
-        return YY.reshape(-1), XX.reshape(-1)
-    else:
-        return y_idx.reshape(-1), x_idx.reshape(-1)
-
-def _gather_patch(obj, idx, xp):
-    """
-    Safely extract a patch from the object array using flexible indexing.
-
-    Supports both slice-based and advanced indexing (with arrays), and returns
-    the sub-region of the object array corresponding to the scan position.
-
-    Args:
-        obj (ndarray): The full complex object array.
-        idx (tuple): A tuple of (slice, slice) or (ndarray, ndarray) specifying the patch.
-        xp: The backend module (numpy or cupy).
-
-    Returns:
-        ndarray: The selected sub-region of the object array.
-    """
-
-    y_idx, x_idx = idx
-    if isinstance(y_idx, slice) and isinstance(x_idx, slice):
-        return obj[y_idx, x_idx]
-    else:
-        return obj[y_idx, x_idx]
-    
+from ptychoep.ptycho.projector import FourierProjector
+from ptychoep.utils.run_control import RunMonitor, copy_result
 
 class DifferenceMap:
     """
@@ -67,27 +22,51 @@ class DifferenceMap:
 
     Attributes:
         ptycho (Ptycho): Ptycho object containing scan positions and diffraction data.
-        beta (float): Relaxation parameter for the update.
+        beta (float): Relaxation parameter. Standard DM uses beta = 1; the relaxed
+            variants in raar.py (RAAR, RRR) use it in `_phi_coefficients`.
         obj (ndarray): Current estimate of the object.
         prb (ndarray): Current estimate of the probe.
         callback (callable): Optional function to monitor convergence at each iteration.
         n_scan (int): Number of scan positions.
         prb_len (int): Size of the square probe region.
-        diffs (ndarray): Stacked measured diffraction amplitudes.
-        indices (List[slice or arrays]): Index mappings for scan regions.
-        all_yy, all_xx (ndarray): Flattened scan region indices for scatter-add operations.
+        diffs (ndarray): Stacked measured diffraction amplitudes (memory-mapped when out_of_core).
+        Phi (ndarray): Current DM iterate of shape (N, H, W) (memory-mapped when out_of_core).
+        indices (List[Tuple[slice, slice]]): Index mappings for scan regions.
+        geometry (ScanGeometry): Precomputed patch offsets used for batched gather/scatter-add.
+        projector (FourierProjector): Fourier-magnitude projector reusing (chunk, H, W) workspaces.
+        chunk_size (int): Number of scans processed at once; bounds the (chunk, H, W) workspace.
+        out_of_core (bool): If True, Phi and the diffraction stack live in memory-mapped
+            files under `workdir` (a temporary directory removed with the engine). A stack
+            that is already memory-mapped in scan order (e.g. `Ptycho.load`) is read in
+            place instead of being copied.
+        update_probe (bool): If False, the probe is kept fixed and the illumination
+            normalisation of the object update is computed only once.
+        compact_roi (bool): If True, the reconstruction runs on the scanned region only
+            (`Ptycho.compacted`); `self.ptycho`, `self.obj` and the callback use the
+            compact grid, and `run` maps the object back to the full grid (zero outside).
 
     Notes:
         - The computational cost is dominated by FFT and scatter operations.
-        - The implementation supports both slice-based and array-based indexing of patches.
+        - Each iteration streams over scan chunks, so apart from Phi and the diffraction
+          stack the workspace is O(chunk_size * H * W) plus a few object-sized arrays.
+        - Object accumulation is a slice-wise scatter-add (see ScanGeometry), so its
+          workspace is proportional to the object, not to (N, H, W).
         - The update rules are based on the original Difference Map formulation used in ptychography.
     """
 
-    def __init__(self, ptycho, beta=1.0, obj_init=None, prb_init=None, callback=None, seed : int = None):
+    def __init__(self, ptycho, beta=1.0, obj_init=None, prb_init=None, callback=None, seed : int = None,
+                 chunk_size: int = 64, update_probe: bool = True,
+                 out_of_core: bool = False, workdir: str = None, compact_roi: bool = False):
         self.xp = np()
+        if compact_roi:
+            ptycho = ptycho.compacted()
+            obj_init = ptycho.crop(obj_init)
         self.ptycho = ptycho
         self.beta = beta
         self.callback = callback
+        self.chunk_size = chunk_size
+        self.update_probe = update_probe
+        self.out_of_core = out_of_core
 
         # --- init object/probe ---
         xp = self.xp
@@ -101,64 +80,170 @@ class DifferenceMap:
         self.prb = xp.array(prb_init) if prb_init is not None else xp.array(ptycho.prb.copy())
 
         # --- data ---
-        self.diffs = xp.stack([d.diffraction for d in ptycho._diff_data])
         self.indices = [d.indices for d in ptycho._diff_data]
         self.prb_len = ptycho.prb_len
-        self.n_scan = len(self.diffs)
-
-        self.fft2 = xp.fft.fft2
-        self.ifft2 = xp.fft.ifft2
-
-        yyxx = [_normalize_index_to_arrays(idx, xp) for idx in self.indices]
-        self.all_yy = xp.concatenate([yy for yy, _ in yyxx])
-        self.all_xx = xp.concatenate([xx for _, xx in yyxx])
-
-    def run(self, n_iter=100):
+        self.n_scan = len(ptycho._diff_data)
+        self.geometry = ptycho.geometry
+        self._allocate_storage(workdir)
+        self.projector = FourierProjector((min(chunk_size, self.n_scan),) + self.geometry.patch_shape,
+                                          dtype=self.Phi.dtype)
+
+        # --- fixed probe: cache the conjugate probe and illumination normalisation ---
+        self._prb_conj = None
+        self._den_obj = None
+        if not update_probe:
+            self._prb_conj = self.prb.conj()
+            self._den_obj = self._illumination()
+
+    def _allocate_storage(self, workdir):
+        """Allocate Phi and the diffraction stack, in device memory or in memory-mapped files."""
         xp = self.xp
-        exit_waves = self._compute_exit_waves()
-        Phi, _ = Fourier_projector(exit_waves, self.diffs)
-
-        for it in range(n_iter):
+        shape = (self.n_scan,) + self.geometry.patch_shape
+        diff_dtype = self.ptycho._diff_data[0].diffraction.dtype
+        phi_dtype = _np.result_type(self.obj.dtype, self.prb.dtype)
+
+        if not self.out_of_core:
+            # the Ptycho's stack itself (a copy only if the scans were reordered)
+            self.diffs = xp.asarray(self.ptycho.diffraction_stack)
+            self.Phi = xp.empty(shape, dtype=phi_dtype)
+            return
+
+        self._tmpdir = tempfile.TemporaryDirectory(prefix="dm_", dir=workdir)
+        open_memmap = _np.lib.format.open_memmap
+        self.Phi = open_memmap(os.path.join(self._tmpdir.name, "phi.npy"),
+                               mode="w+", dtype=phi_dtype, shape=shape)
+        rows = self.ptycho._order
+        if isinstance(self.ptycho._stack, _np.memmap) and (_np.diff(rows) == 1).all():
+            # already on disk in scan order: a read-only view of the file
+            self.diffs = self.ptycho.diffraction_stack.view()
+            self.diffs.flags.writeable = False
+            return
+        self.diffs = open_memmap(os.path.join(self._tmpdir.name, "diffs.npy"),
+                                 mode="w+", dtype=diff_dtype, shape=shape)
+        for sel in self._chunks():
+            self.diffs[sel] = _to_host(self.ptycho.take_diffraction(sel))
+
+    def _chunks(self):
+        for start in range(0, self.n_scan, self.chunk_size):
+            yield slice(start, min(start + self.chunk_size, self.n_scan))
+
+    def _load(self, arr, sel):
+        """Bring a chunk of a (possibly memory-mapped) stack onto the active backend."""
+        return self.xp.asarray(arr[sel])
+
+    def _load_diffs(self, sel):
+        """Amplitudes of a chunk of scans (decoded if the Ptycho uses compact storage)."""
+        return self.ptycho.amplitude(self._load(self.diffs, sel))
+
+    def _store(self, arr, sel, chunk):
+        """Write back a chunk modified in place (only needed when it was copied to the device)."""
+        if self.out_of_core and is_cupy():
+            arr[sel] = chunk.get()
+
+    def run(self, n_iter=100, time_budget=None, target_error=None, stall_patience=None):
+        """
+        Run the reconstruction.
+
+        Stops after `n_iter` iterations, or earlier on `time_budget` (seconds),
+        `target_error` or `stall_patience` (see RunMonitor). If any of the
+        latter is set, the best-so-far (object, probe) is returned. The
+        monitor is kept as `self.monitor`.
+        """
+        monitor = self.monitor = RunMonitor(n_iter, time_budget, target_error, stall_patience)
+        track_error = self.callback is not None or monitor.tracks_best
+
+        # --- initial Phi: projected exit waves ---
+        err = 0.0
+        for sel in self._chunks():
+            exit_waves = self._compute_exit_waves(sel)
+            proj, err_val = self.projector(exit_waves, self._load_diffs(sel))
+            err += err_val * (sel.stop - sel.start)
+            self.Phi[sel] = _to_host(proj) if self.out_of_core else proj
+        err /= self.n_scan
+
+        for it in monitor:
             if self.callback:
-                _, err = Fourier_projector(exit_waves, self.diffs, return_per_scan=False)
                 self.callback(it, float(err), self.obj)
 
-            self._update_object_probe(Phi)
-            exit_waves = self._compute_exit_waves()
-            Phi = Phi + Fourier_projector(2 * exit_waves - Phi, self.diffs)[0] - exit_waves
-
-        return self.obj, self.prb
-
-    def _compute_exit_waves(self):
-        xp = self.xp
-        patches = xp.stack([_gather_patch(self.obj, idx, xp) for idx in self.indices])
+            self._update_object_probe()
+
+            # --- Phi update (DM: Phi + P_F(2 * exit - Phi) - exit), streamed over scan chunks ---
+            err = 0.0
+            for sel in self._chunks():
+                exit_waves = self._compute_exit_waves(sel)
+                diffs = self._load_diffs(sel)
+                if track_error:
+                    err += self.projector.error(exit_waves, diffs) * (sel.stop - sel.start)
+                phi = self._load(self.Phi, sel)
+                self._update_phi(phi, exit_waves, diffs)
+                self._store(self.Phi, sel, phi)
+            err = err / self.n_scan if track_error else float("nan")
+            # err is the fitness of the object/probe updated in this iteration
+            monitor.record(err, lambda: copy_result((self.obj, self.prb)))
+
+        return self.ptycho.expand_result(monitor.result((self.obj, self.prb)))
+
+    def _phi_coefficients(self):
+        """
+        Coefficients (a, b, c) of the Phi update  Phi <- a * Phi + b * P_F(z) + c * z,
+        with z = 2 * exit - Phi.
+
+        For DM, Phi + P_F(z) - exit = P_F(z) + (Phi - z) / 2. Relaxed variants
+        (see raar.py) override this.
+        """
+        return 0.5, 1.0, -0.5
+
+    def _update_phi(self, phi, exit_waves, diffs):
+        """Apply the Phi update to one chunk in place (`exit_waves` is clobbered)."""
+        a, b, c = self._phi_coefficients()
+        z = exit_waves
+        z *= 2
+        z -= phi
+        proj, _ = self.projector(z, diffs)
+        phi *= a
+        if b != 1.0:
+            proj *= b
+        phi += proj
+        z *= c
+        phi += z
+
+    def _compute_exit_waves(self, sel=None):
+        patches = self.geometry.gather(self.obj, sel)
         return self.prb[None, :, :] * patches
 
-    def _update_object_probe(self, Phi):
+    def _illumination(self):
+        """Sum of |P|^2 over all scan patches (plus a small floor), on the object grid."""
+        den_obj = self.xp.full(self.obj.shape, 1e-10, dtype=self.obj.real.dtype)
+        return self.geometry.scatter_add(den_obj, self.xp.abs(self.prb) ** 2)
+
+    def _update_object_probe(self):
         xp = self.xp
+        geo = self.geometry
 
         # --- object update (scatter add) ---
-        num_obj_real = xp.zeros_like(self.obj.real)
-        num_obj_imag = xp.zeros_like(self.obj.imag)
-        den_obj = xp.zeros_like(self.obj.real) + 1e-10
-
-        prb_conj = self.prb.conj()
-        prb_abs2 = xp.abs(self.prb) ** 2
-
-        all_val = xp.concatenate([(prb_conj * phi).reshape(-1) for phi in Phi])
-        all_prb_abs2 = xp.concatenate([prb_abs2.reshape(-1) for _ in Phi])
+        num_obj = xp.zeros_like(self.obj)
+        prb_conj = self.prb.conj() if self.update_probe else self._prb_conj
+        for sel in self._chunks():
+            geo.scatter_add(num_obj, self._load(self.Phi, sel), sel=sel, weight=prb_conj)
+        den_obj = self._illumination() if self.update_probe else self._den_obj
+        self.obj = num_obj / den_obj
 
-        xp.add.at(num_obj_real, (self.all_yy, self.all_xx), all_val.real)
-        xp.add.at(num_obj_imag, (self.all_yy, self.all_xx), all_val.imag)
-        xp.add.at(den_obj, (self.all_yy, self.all_xx), all_prb_abs2)
+        if not self.update_probe:
+            return
 
-        self.obj = (num_obj_real + 1j * num_obj_imag) / den_obj
-
-        # --- probe update ---
+        # --- probe update (chunked reduction over scans) ---
         num_prb = xp.zeros_like(self.prb)
         den_prb = xp.zeros_like(self.prb) + 1e-10
-        for idx, phi in zip(self.indices, Phi):
-            obj_patch = _gather_patch(self.obj, idx, xp)
-            num_prb += obj_patch.conj() * phi
-            den_prb += xp.abs(obj_patch) ** 2
+        for sel in self._chunks():
+            obj_patches = geo.gather(self.obj, sel)
+            num_prb += xp.sum(obj_patches.conj() * self._load(self.Phi, sel), axis=0)
+            den_prb += xp.sum(xp.abs(obj_patches) ** 2, axis=0)
         self.prb = num_prb / den_prb
+
+
+def _to_host(arr):
+    """Return a NumPy view/copy of a backend array."""
+    if is_cupy():
+        import cupy
+        return cupy.asnumpy(arr)
+    return arr
@@ -1,4 +1,3 @@
-from ptychoep.ptycho.projector import Fourier_projector
 from ptychoep.backend.backend import np
 from .base_pie import BasePIE
 
@@ -23,50 +22,26 @@ class ePIE(BasePIE):
         callback (callable or None): Optional function to monitor or log progress per iteration.
         dtype (dtype): Data type for internal arrays.
         seed (int or None): Optional random seed for reproducibility.
+        update_probe (bool): If False, the probe is kept fixed (object-only reconstruction).
+        compact_roi (bool): Reconstruct on the scanned region only (see BasePIE).
 
     Returns:
         A tuple of (reconstructed object, reconstructed probe).
     """
 
-    def __init__(self, ptycho, alpha=0.1, beta=0.1, obj_init=None, prb_init = None, callback=None, dtype = np().complex64, seed : int = None):
-        super().__init__(ptycho, alpha, obj_init, dtype, callback, seed)
-        self.prb = prb_init if prb_init is not None else ptycho.prb
+    def __init__(self, ptycho, alpha=0.1, beta=0.1, obj_init=None, prb_init = None, callback=None, dtype = np().complex64, seed : int = None,
+                 update_probe: bool = True, compact_roi: bool = False):
+        super().__init__(ptycho, alpha, obj_init, dtype, callback, seed, compact_roi)
+        self.prb = self.xp.array(prb_init if prb_init is not None else ptycho.prb)
         self.beta = beta
-    
+        self.update_probe = update_probe
 
-    def _update_object(self, old_probe, proj_wave, exit_wave, indices):
-        yy, xx = indices
-        prb_abs = self.xp.abs(old_probe)
-        prb_conj = old_probe.conj()
-        prb_max = self.xp.max(old_probe)
-        delta = self.alpha * prb_conj * (proj_wave - exit_wave) / prb_max**2
-        self.obj[yy, xx] += delta
-
-    def _update_probe(self, old_object_patch, proj_wave, exit_wave, indices):
-        yy, xx = indices
-        obj_abs = self.xp.abs(old_object_patch)
-        obj_conj = old_object_patch.conj()
-        obj_max = self.xp.max(obj_abs)
-        delta_prb = self.beta * obj_conj *  (proj_wave - exit_wave) / obj_max**2
-        self.prb += delta_prb
-
-    def run(self, n_iter=100):
-        for it in range(n_iter):
-            err = 0.0
-            for d in self.ptycho._diff_data:
-                yy, xx = d.indices
-                obj_patch = self.obj[yy, xx]
-                exit_wave = self.prb * obj_patch
-                proj_wave, err_val = Fourier_projector(exit_wave, d.diffraction)
-                err += err_val
-
-                old_object_patch, old_probe = self.obj[yy, xx].copy(), self.prb.copy()
-
-                self._update_object(old_probe, proj_wave, exit_wave, (yy, xx))
-                self._update_probe(old_object_patch, proj_wave, exit_wave, (yy, xx))
-
-            if self.callback:
-                self.callback(it, err / len(self.ptycho._diff_data), self.obj)
+    def _refresh_probe_cache(self):
+        # alpha * conj(P) / max|P|^2
+        weight = self._obj_weight
+        scale = self.alpha / self._max_abs2(self.prb)
+        self.xp.conjugate(self.prb, out=weight)
+        weight *= scale
 
+    def _result(self):
         return self.obj, self.prb
-
@@ -0,0 +1,177 @@
+import numpy as _np
+from ptychoep.backend.backend import np
+from ptychoep.ptycho.projector import FourierProjector
+from ptychoep.utils.run_control import RunMonitor, copy_result
+from .base_pie import BasePIE
+
+class MiniBatchPIE(BasePIE):
+    """
+    Mini-batch PIE-family engine (PIE, ePIE or rPIE update rules).
+
+    Scans are processed in batches: the exit waves of a batch are projected
+    with one batched FFT, the object updates of all scans in the batch are
+    scatter-added into the object, and (for ePIE/rPIE) the per-scan probe
+    updates are averaged over the batch and applied once.
+
+    With the default "coloring" strategy, batches are drawn from groups of
+    mutually non-overlapping scans (see `ScanGeometry.groups`), so every object
+    pixel receives at most one update per batch and the object step matches
+    the serial engine with the probe held fixed over the batch. With "random",
+    scans are shuffled every sweep and split into batches of `batch_size`;
+    overlapping updates within a batch are summed.
+
+    Attributes:
+        variant (str): Update rule, one of "pie", "epie" or "rpie".
+        batch_size (int or None): Maximum number of scans per batch.
+        strategy (str): "coloring" (non-overlapping batches) or "random".
+        geometry (ScanGeometry): Scan patch layout used for gather/scatter-add.
+        batches (List[ndarray]): Scan indices of each batch (coloring strategy;
+            recomputed every sweep for the random strategy).
+
+    Args:
+        ptycho (Ptycho): Ptycho object containing object size, probe, and scan data.
+        variant (str): "pie", "epie" or "rpie".
+        alpha (float): Step size for the object update.
+        beta (float): Step size for the probe update (epie / rpie).
+        batch_size (int or None): Maximum batch size. If None, "coloring" uses whole
+            non-overlapping groups, and "random" uses the mean group size.
+        strategy (str): Batching strategy, "coloring" or "random".
+        obj_init (ndarray or None): Optional initial guess for the object.
+        prb_init (ndarray or None): Optional initial guess for the probe.
+        update_probe (bool or None): Whether to update the probe. Defaults to False
+            for "pie" and True otherwise.
+        callback (callable or None): Optional function called after each iteration.
+        dtype (dtype): Data type for internal arrays.
+        seed (int or None): Random seed for the initial object and the random strategy.
+        compact_roi (bool): Reconstruct on the scanned region only (see BasePIE).
+
+    Returns:
+        `run` returns (object, probe) for "epie" / "rpie" and the object for "pie".
+    """
+
+    VARIANTS = ("pie", "epie", "rpie")
+    STRATEGIES = ("coloring", "random")
+
+    def __init__(self, ptycho, variant="rpie", alpha=0.1, beta=0.1, batch_size=None, strategy="coloring",
+                 obj_init=None, prb_init=None, update_probe=None, callback=None, dtype=np().complex64,
+                 seed: int = None, compact_roi: bool = False):
+        if variant not in self.VARIANTS:
+            raise ValueError(f"variant must be one of {self.VARIANTS}, got {variant!r}")
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"strategy must be one of {self.STRATEGIES}, got {strategy!r}")
+        if batch_size is not None and batch_size < 1:
+            raise ValueError("batch_size must be a positive integer.")
+        super().__init__(ptycho, alpha, obj_init, dtype, callback, seed, compact_roi)
+        ptycho = self.ptycho
+        if prb_init is not None:
+            self.prb = self.xp.array(prb_init)
+        self.variant = variant
+        self.beta = beta
+        self.strategy = strategy
+        self.update_probe = (variant != "pie") if update_probe is None else update_probe
+        self._rng = _np.random.default_rng(seed)
+
+        self.geometry = ptycho.geometry
+        groups = self.geometry.groups
+        if batch_size is None and strategy == "random":
+            batch_size = max(1, int(round(self.geometry.n_scan / len(groups))))
+        self.batch_size = batch_size
+
+        # --- batches and the diffraction stack ---
+        if strategy == "coloring":
+            # store the stack in batch order so each batch is a contiguous slice
+            self.batches = [g[i:i + batch_size] if batch_size else g
+                            for g in groups for i in range(0, len(g), batch_size or len(g))]
+            order = _np.concatenate(self.batches)
+            self.diffs = self.xp.asarray(ptycho.take_diffraction(order))
+            bounds = _np.cumsum([0] + [len(b) for b in self.batches])
+            self._batch_slices = [slice(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:])]
+        else:
+            self.batches = None
+            self.diffs = self.xp.asarray(ptycho.diffraction_stack)
+        max_batch = max(len(b) for b in self.batches) if self.batches else min(batch_size, self.geometry.n_scan)
+        self.projector = FourierProjector((max_batch,) + self.geometry.patch_shape,
+                                          dtype=self.xp.result_type(self.obj.dtype, self.prb.dtype))
+
+    def _iter_batches(self):
+        """Yield (scan indices, diffraction amplitudes) for one sweep."""
+        if self.strategy == "coloring":
+            for scans, sl in zip(self.batches, self._batch_slices):
+                yield scans, self.ptycho.amplitude(self.diffs[sl])
+            return
+        perm = self._rng.permutation(self.geometry.n_scan)
+        for i in range(0, len(perm), self.batch_size):
+            scans = perm[i:i + self.batch_size]
+            yield scans, self.ptycho.amplitude(self.diffs[self.xp.asarray(scans)])
+
+    def run(self, n_iter=100, time_budget=None, target_error=None, stall_patience=None):
+        """Run the reconstruction (stopping rules as in `BasePIE.run`)."""
+        if self._workspaces is None:
+            self._allocate_workspaces()
+        geo = self.geometry
+        n_scan = geo.n_scan
+        monitor = self.monitor = RunMonitor(n_iter, time_budget, target_error, stall_patience)
+
+        for it in monitor:
+            err = 0.0
+            for scans, diffs in self._iter_batches():
+                if self._probe_dirty:
+                    self._refresh_probe_cache()
+                    self._probe_dirty = False
+
+                patches = geo.gather(self.obj, scans)
+                exit_waves = patches * self.prb
+                residual, error_val = self.projector.residual(exit_waves, diffs)
+                err += error_val * len(scans)
+
+                if self.update_probe:
+                    self._update_probe_batch(residual, patches)
+                    self._probe_dirty = True
+                # object step uses the probe before this batch's probe update
+                residual *= self._obj_weight
+                geo.scatter_add(self.obj, residual, sel=scans)
+
+            avg_err = float(err / n_scan)
+
+            if self.callback:
+                self.callback(it, avg_err, self.obj)
+            monitor.record(avg_err, lambda: copy_result(self._result()))
+
+        return self.ptycho.expand_result(monitor.result(self._result()))
+
+    def _result(self):
+        return self.obj if self.variant == "pie" else (self.obj, self.prb)
+
+    def _refresh_probe_cache(self):
+        xp = self.xp
+        weight, rtmp = self._obj_weight, self._rtmp
+        prb_max2 = self._max_abs2(self.prb)  # leaves |P| in rtmp
+        xp.conjugate(self.prb, out=weight)
+        if self.variant == "epie":
+            # alpha * conj(P) / max|P|^2
+            weight *= self.alpha / prb_max2
+        elif self.variant == "rpie":
+            # alpha * conj(P) / ((1 - alpha) |P|^2 + alpha max|P|^2)
+            xp.square(rtmp, out=rtmp)
+            rtmp *= 1 - self.alpha
+            rtmp += self.alpha * prb_max2
+            weight /= rtmp
+            weight *= self.alpha
+        else:
+            # |P| conj(P) / (Pmax (|P|^2 + alpha Pmax^2))
+            weight *= rtmp
+            xp.square(rtmp, out=rtmp)
+            rtmp += self.alpha * prb_max2
+            rtmp *= xp.sqrt(prb_max2)
+            weight /= rtmp
+
+    def _update_probe_batch(self, residual, patches):
+        """prb += mean_b beta * conj(O_b) * res_b / max|O_b|^2 over the batch."""
+        xp = self.xp
+        n = len(patches)
+        obj_max2 = xp.abs(patches).reshape(n, -1).max(axis=1) ** 2
+        scale = (self.beta / n) / obj_max2
+        patches = patches.conj()
+        patches *= residual
+        patches *= scale[:, None, None]
+        self.prb += patches.sum(axis=0)
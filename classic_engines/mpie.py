@@ -0,0 +1,101 @@
+from ptychoep.backend.backend import np
+from .rpie import rPIE
+
+class mPIE(rPIE):
+    """
+    Momentum-accelerated PIE (mPIE-style), built on the rPIE update rules.
+
+    Each sweep runs the ordinary rPIE object/probe updates over all scans.
+    At the end of the sweep, the change accumulated during the sweep is fed
+    into a velocity with friction `eta`, and a Nesterov-style step along the
+    velocity is added:
+
+        v <- eta * v + (x_end - x_start)
+        x <- x_end + eta * v
+
+    for x in {object, probe}. The velocity is reset (restart) when the sweep
+    error increases with `restart="error"`, and/or every `restart_interval` sweeps.
+
+    Attributes:
+        eta_obj (float): Momentum friction for the object (0 disables object momentum).
+        eta_prb (float): Momentum friction for the probe (0 disables probe momentum).
+        restart (str or None): "error" to reset the velocity when the error increases,
+            or None to never restart on error.
+        restart_interval (int or None): If set, reset the velocity every this many sweeps.
+        n_restarts (int): Number of velocity restarts performed so far.
+
+    Args:
+        ptycho (Ptycho): Ptycho object containing object and scan information.
+        alpha (float): rPIE relaxation parameter for the object update.
+        beta (float): Step size for the probe update.
+        eta_obj (float): Object momentum friction in [0, 1).
+        eta_prb (float): Probe momentum friction in [0, 1).
+        restart (str or None): Restart rule ("error" or None).
+        restart_interval (int or None): Periodic restart interval in sweeps.
+        obj_init (ndarray or None): Optional initial guess for the object.
+        prb_init (ndarray or None): Optional initial guess for the probe.
+        callback (callable or None): Optional function called after each iteration.
+        dtype (dtype): Data type for internal arrays.
+        seed (int or None): Optional random seed for reproducibility.
+        update_probe (bool): If False, the probe is kept fixed.
+        compact_roi (bool): Reconstruct on the scanned region only (see BasePIE).
+
+    Returns:
+        A tuple of (reconstructed object, reconstructed probe).
+    """
+
+    def __init__(self, ptycho, alpha=0.1, beta=0.1, eta_obj=0.9, eta_prb=0.9, restart="error",
+                 restart_interval: int = None, obj_init=None, prb_init=None, callback=None,
+                 dtype=np().complex64, seed: int = None, update_probe: bool = True,
+                 compact_roi: bool = False):
+        if restart not in ("error", None):
+            raise ValueError(f"restart must be 'error' or None, got {restart!r}")
+        if not (0.0 <= eta_obj < 1.0 and 0.0 <= eta_prb < 1.0):
+            raise ValueError("Momentum friction must be in [0, 1).")
+        super().__init__(ptycho, alpha, beta, obj_init, prb_init, callback, dtype, seed, update_probe,
+                         compact_roi)
+        self.eta_obj = eta_obj
+        self.eta_prb = eta_prb
+        self.restart = restart
+        self.restart_interval = restart_interval
+        self.n_restarts = 0
+        self._momentum = None
+        self._prev_err = None
+        self._sweeps_since_restart = 0
+
+    def run(self, n_iter=100, time_budget=None, target_error=None, stall_patience=None):
+        if self._momentum is None:
+            xp = self.xp
+            # per variable: [anchor (value at sweep start), velocity]
+            self._momentum = {"obj": [self.obj.copy(), xp.zeros_like(self.obj)]}
+            if self.update_probe:
+                self._momentum["prb"] = [self.prb.copy(), xp.zeros_like(self.prb)]
+        return super().run(n_iter, time_budget, target_error, stall_patience)
+
+    def _end_sweep(self, it, err):
+        self._sweeps_since_restart += 1
+        restart = (self.restart == "error" and self._prev_err is not None and err > self._prev_err) \
+            or (self.restart_interval is not None and self._sweeps_since_restart >= self.restart_interval)
+        self._prev_err = err
+
+        for name, eta in (("obj", self.eta_obj), ("prb", self.eta_prb)):
+            if name not in self._momentum:
+                continue
+            x = getattr(self, name)
+            anchor, velocity = self._momentum[name]
+            if restart:
+                velocity[...] = 0
+            else:
+                # v <- eta * v + (x - anchor); x <- x + eta * v  (anchor reused as scratch)
+                velocity *= eta
+                velocity += x
+                velocity -= anchor
+                self.xp.multiply(velocity, eta, out=anchor)
+                x += anchor
+            anchor[...] = x
+
+        if restart:
+            self.n_restarts += 1
+            self._sweeps_since_restart = 0
+        elif "prb" in self._momentum:
+            self._probe_dirty = True
@@ -10,7 +10,8 @@ class PIE(BasePIE):
     This class extends BasePIE and implements the object update rule for PIE. 
     Since the probe is fixed throughout the reconstruction process, certain 
     quantities derived from the probe (e.g., its magnitude, conjugate, and max) 
-    are precomputed and cached for efficiency.
+    are precomputed and cached for efficiency, and folded into a single
+    object-update weight.
 
     Attributes:
         prb_conj (ndarray): Complex conjugate of the probe.
@@ -24,21 +25,19 @@ class PIE(BasePIE):
                                     If None, initialized with complex Gaussian noise.
         callback (callable or None): Optional function to log or monitor progress at each iteration.
         dtype (dtype): Data type for internal arrays (default: complex64).
+        compact_roi (bool): Reconstruct on the scanned region only (see BasePIE).
     """
 
 
-    def __init__(self, ptycho, alpha=0.1, obj_init=None, callback=None, dtype = np().complex64):
-        super().__init__(ptycho, alpha, obj_init, dtype, callback)
+    def __init__(self, ptycho, alpha=0.1, obj_init=None, callback=None, dtype = np().complex64,
+                 compact_roi: bool = False):
+        super().__init__(ptycho, alpha, obj_init, dtype, callback, compact_roi=compact_roi)
         self.prb_conj = self.prb.conj()
         self.prb_abs = self.xp.abs(self.prb)
         self.prb_max = self.xp.max(self.prb_abs)
 
-    def _update_object(self, proj_wave, exit_wave, indices):
-        yy, xx = indices
-        delta = (
-            self.prb_abs * self.prb_conj * (proj_wave - exit_wave)
-            / (self.prb_max * (self.prb_abs**2 + self.alpha * self.prb_max**2))
-        )
-        self.obj[yy, xx] += delta
-
-
+    def _refresh_probe_cache(self):
+        # |P| conj(P) / (Pmax (|P|^2 + alpha Pmax^2))
+        weight = self._obj_weight
+        weight[...] = self.prb_abs * self.prb_conj
+        weight /= self.prb_max * (self.prb_abs**2 + self.alpha * self.prb_max**2)
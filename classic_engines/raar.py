@@ -0,0 +1,51 @@
+from .difference_map import DifferenceMap
+
+class RAAR(DifferenceMap):
+    """
+    Relaxed Averaged Alternating Reflections (RAAR) for ptychography.
+
+    RAAR relaxes the Difference Map iterate towards the current exit waves
+    (the overlap projection of Phi):
+
+        Phi <- beta * [Phi + P_F(2 * exit - Phi) - exit] + (1 - beta) * exit
+
+    With beta = 1 it reduces to DM; values around 0.75-0.9 typically converge
+    in fewer iterations on noisy data. It shares the object/probe update,
+    chunked streaming, projector and out-of-core storage of `DifferenceMap`,
+    and accepts the same arguments.
+
+    Attributes:
+        beta (float): Relaxation parameter in (0, 1].
+    """
+
+    def __init__(self, ptycho, beta=0.75, **kwargs):
+        if not 0.0 < beta <= 1.0:
+            raise ValueError("RAAR requires 0 < beta <= 1.")
+        super().__init__(ptycho, beta=beta, **kwargs)
+
+    def _phi_coefficients(self):
+        # with exit = (z + Phi) / 2:  beta * P_F(z) + Phi / 2 + (1/2 - beta) * z
+        return 0.5, self.beta, 0.5 - self.beta
+
+
+class RRR(DifferenceMap):
+    """
+    Relax-Reflect-Reflect (RRR): a step of size beta along the DM displacement.
+
+        Phi <- Phi + beta * [P_F(2 * exit - Phi) - exit]
+
+    With beta = 1 it reduces to DM. Smaller steps damp the oscillations of DM
+    at a proportional cost in speed. Accepts the same arguments as `DifferenceMap`.
+
+    Attributes:
+        beta (float): Step size in (0, 2).
+    """
+
+    def __init__(self, ptycho, beta=0.5, **kwargs):
+        if not 0.0 < beta < 2.0:
+            raise ValueError("RRR requires 0 < beta < 2.")
+        super().__init__(ptycho, beta=beta, **kwargs)
+
+    def _phi_coefficients(self):
+        # with exit = (z + Phi) / 2:  (1 - beta/2) * Phi + beta * P_F(z) - (beta/2) * z
+        return 1.0 - 0.5 * self.beta, self.beta, -0.5 * self.beta
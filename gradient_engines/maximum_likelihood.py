@@ -0,0 +1,289 @@
+import numpy as _np
+from ptychoep.backend.backend import np
+from ptychoep.rng.rng_utils import get_rng, normal
+from ptychoep.ptycho.projector import FourierProjector
+from ptychoep.utils.run_control import RunMonitor, copy_result
+
+class MaximumLikelihood:
+    """
+    Batched gradient-based maximum-likelihood ptychography engine.
+
+    The object O and probe P are fitted by minimising a likelihood-based loss
+    over all scans, with exit waves psi_j = P * O_j and far-field F_j = FFT(psi_j):
+
+        - "amplitude": L = sum_j || |F_j| - y_j ||^2
+        - "poisson":   L = sum_j sum ( |F_j|^2 - y_j^2 log |F_j|^2 )
+
+    where y_j is the measured amplitude. For a mini-batch of scans, all exit
+    waves are formed and transformed with batched FFTs, the exit-wave gradient
+    is back-propagated, and the object gradient is scatter-added on the object
+    grid (ScanGeometry) while the probe gradient is summed over the batch.
+
+    Optimizers:
+        - "adam": one Adam step on object and probe per mini-batch.
+        - "cg": one nonlinear conjugate-gradient step per iteration on the
+          full-batch gradient, preconditioned by the illumination (sum |P|^2 on
+          the object grid, sum |O_j|^2 for the probe), with Polak-Ribiere+
+          directions and a backtracking line search on the loss.
+
+    Attributes:
+        ptycho (Ptycho): Ptycho object containing scan positions and diffraction data.
+        noise_model (str): "amplitude" or "poisson".
+        optimizer (str): "adam" or "cg".
+        batch_size (int or None): Scans per mini-batch (None: all scans).
+        obj (ndarray): Current estimate of the object.
+        prb (ndarray): Current estimate of the probe.
+        update_probe (bool): Whether the probe is optimized.
+        geometry (ScanGeometry): Scan patch layout used for gather/scatter-add.
+        callback (callable): Optional function called after each iteration: callback(it, err, obj).
+
+    Args:
+        ptycho (Ptycho): Ptycho object with probe, object size, and scan data configured.
+        noise_model (str): Likelihood, "amplitude" or "poisson".
+        optimizer (str): "adam" or "cg".
+        batch_size (int or None): Mini-batch size (Adam). CG always uses the full batch.
+        lr_obj (float): Adam learning rate for the object.
+        lr_prb (float): Adam learning rate for the probe.
+        betas (tuple): Adam moment decay rates.
+        step (float): Largest (initial) step size of the CG line search.
+        max_backtracks (int): Step halvings tried before a CG iteration is skipped.
+        reg (float): Relative regularisation of the CG preconditioners.
+        obj_init (ndarray or None): Optional initial guess for the object. If None, random complex.
+        prb_init (ndarray or None): Optional initial guess for the probe. If None, taken from `ptycho.prb`.
+        update_probe (bool): Whether to optimize the probe.
+        callback (callable or None): Optional callback function for logging or visualization.
+        dtype: Data type for internal arrays (default: complex64).
+        seed (int or None): Random seed for initialization and batch shuffling.
+        compact_roi (bool): Reconstruct on the scanned region only (see DifferenceMap).
+
+    Returns:
+        `run` returns a tuple of (reconstructed object, reconstructed probe).
+
+    Notes:
+        - The error passed to the callback is the mean squared amplitude error of
+          the iterate at which each batch's gradient was evaluated, as in the PIE engines.
+        - Mini-batches are reshuffled every iteration.
+        - Each CG iteration starts from twice the last accepted step (capped at
+          `step`) and halves it until the loss does not increase. If no step
+          is accepted, the iterate is kept and the directions restart from the
+          preconditioned gradient, so the loss never increases in CG mode.
+    """
+
+    NOISE_MODELS = ("amplitude", "poisson")
+    OPTIMIZERS = ("adam", "cg")
+
+    def __init__(self, ptycho, noise_model="amplitude", optimizer="adam", batch_size=None,
+                 lr_obj=5e-2, lr_prb=1e-2, betas=(0.9, 0.999), step=0.5, reg=1e-3, max_backtracks=8,
+                 obj_init=None, prb_init=None, update_probe: bool = True, callback=None,
+                 dtype=np().complex64, seed: int = None, compact_roi: bool = False):
+        if noise_model not in self.NOISE_MODELS:
+            raise ValueError(f"noise_model must be one of {self.NOISE_MODELS}, got {noise_model!r}")
+        if optimizer not in self.OPTIMIZERS:
+            raise ValueError(f"optimizer must be one of {self.OPTIMIZERS}, got {optimizer!r}")
+        if batch_size is not None and batch_size < 1:
+            raise ValueError("batch_size must be a positive integer.")
+
+        self.xp = np()
+        xp = self.xp
+        if compact_roi:
+            ptycho = ptycho.compacted()
+            obj_init = ptycho.crop(obj_init)
+        self.ptycho = ptycho
+        self.noise_model = noise_model
+        self.optimizer = optimizer
+        self.callback = callback
+        self.update_probe = update_probe
+        self.lr_obj, self.lr_prb = lr_obj, lr_prb
+        self.betas = betas
+        self.step = step
+        self.reg = reg
+        self.max_backtracks = max_backtracks
+
+        if obj_init is None:
+            rng = get_rng(seed)
+            self.obj = normal(rng, mean=0.0, var=1.0, size=(ptycho.obj_len, ptycho.obj_len), dtype=dtype)
+        else:
+            self.obj = xp.array(obj_init)
+        self.prb = xp.array(prb_init if prb_init is not None else ptycho.prb)
+        self._rng = _np.random.default_rng(seed)
+
+        self.geometry = ptycho.geometry
+        self.n_scan = self.geometry.n_scan
+        self.batch_size = self.n_scan if (batch_size is None or optimizer == "cg") else min(batch_size, self.n_scan)
+        self.diffs = xp.asarray(ptycho.diffraction_stack)
+        self.projector = FourierProjector((self.batch_size,) + self.geometry.patch_shape,
+                                          dtype=xp.result_type(self.obj.dtype, self.prb.dtype))
+
+        # optimizer state
+        self._t = 0
+        self._adam = None
+        self._cg = None
+        self._cg_step_size = step
+        self._cg_loss = None
+
+    # --- batching ---
+    def _batches(self):
+        if self.batch_size >= self.n_scan:
+            yield slice(0, self.n_scan)
+            return
+        perm = self._rng.permutation(self.n_scan)
+        for i in range(0, self.n_scan, self.batch_size):
+            yield perm[i:i + self.batch_size]
+
+    # --- gradients ---
+    def _exit_descent(self, exit_waves, diffs):
+        """
+        Negative loss gradient with respect to conj(exit wave), and the amplitude error.
+
+        For the amplitude model this is the projection residual P_F(psi) - psi.
+        """
+        if self.noise_model == "amplitude":
+            return self.projector.residual(exit_waves, diffs)
+
+        xp = self.xp
+        freq = xp.fft.fft2(exit_waves, norm="ortho")
+        amp2 = xp.abs(freq) ** 2
+        err = float(xp.mean((diffs - xp.sqrt(amp2)) ** 2))
+        # dL/dF* = F (1 - y^2 / |F|^2)
+        amp2 += 1e-7
+        scale = diffs**2 / amp2
+        scale -= 1
+        freq *= scale
+        return xp.fft.ifft2(freq, norm="ortho"), err
+
+    def _gradient(self, sel):
+        """
+        Negative gradients (object, probe) accumulated over the scans `sel`,
+        plus the summed amplitude error.
+        """
+        xp = self.xp
+        geo = self.geometry
+        patches = geo.gather(self.obj, sel)
+        exit_waves = patches * self.prb
+        diffs = self.diffs[sel] if isinstance(sel, slice) else self.diffs[xp.asarray(sel)]
+        diffs = self.ptycho.amplitude(diffs)
+        descent, err = self._exit_descent(exit_waves, diffs)
+        n = len(patches)
+
+        g_prb = None
+        if self.update_probe:
+            g_prb = xp.sum(patches.conj() * descent, axis=0)
+        g_obj = xp.zeros_like(self.obj)
+        geo.scatter_add(g_obj, descent, sel=sel, weight=self.prb.conj())
+        return g_obj, g_prb, err * n
+
+    def _loss(self):
+        """Mean loss of the current iterate over all scans (up to a constant)."""
+        xp = self.xp
+        exit_waves = self.geometry.gather(self.obj) * self.prb
+        diffs = self.ptycho.amplitude(self.diffs)
+        if self.noise_model == "amplitude":
+            return float(self.projector.error(exit_waves, diffs))
+        amp2 = xp.abs(xp.fft.fft2(exit_waves, norm="ortho")) ** 2
+        amp2 += 1e-7
+        return float(xp.mean(amp2 - diffs**2 * xp.log(amp2)))
+
+    # --- optimizers ---
+    def _adam_step(self, g_obj, g_prb):
+        xp = self.xp
+        b1, b2 = self.betas
+        if self._adam is None:
+            self._adam = {"obj": [xp.zeros_like(self.obj), xp.zeros(self.obj.shape, dtype=self.obj.real.dtype)]}
+            if self.update_probe:
+                self._adam["prb"] = [xp.zeros_like(self.prb), xp.zeros(self.prb.shape, dtype=self.prb.real.dtype)]
+        self._t += 1
+        corr1 = 1 - b1 ** self._t
+        corr2 = 1 - b2 ** self._t
+        for name, g, lr in (("obj", g_obj, self.lr_obj), ("prb", g_prb, self.lr_prb)):
+            if name not in self._adam:
+                continue
+            m, v = self._adam[name]
+            m *= b1
+            m += (1 - b1) * g
+            v *= b2
+            v += (1 - b2) * (g.real**2 + g.imag**2)
+            x = getattr(self, name)
+            x += (lr / corr1) * m / (xp.sqrt(v / corr2) + 1e-8)
+
+    def _preconditioners(self):
+        xp = self.xp
+        illum = xp.zeros(self.obj.shape, dtype=self.obj.real.dtype)
+        self.geometry.scatter_add(illum, xp.abs(self.prb) ** 2)
+        illum += self.reg * xp.max(illum)
+        precond = {"obj": illum}
+        if self.update_probe:
+            patches = self.geometry.gather(self.obj)
+            obj2 = xp.sum(xp.abs(patches) ** 2, axis=0)
+            obj2 += self.reg * xp.max(obj2)
+            precond["prb"] = obj2
+        return precond
+
+    def _cg_step(self, g_obj, g_prb):
+        xp = self.xp
+        grads = {"obj": g_obj}
+        if self.update_probe:
+            grads["prb"] = g_prb
+        precond = self._preconditioners()
+        h = {k: g / precond[k] for k, g in grads.items()}
+
+        # Polak-Ribiere+ on the preconditioned gradients
+        beta = 0.0
+        directions = h
+        if self._cg is not None:
+            num = sum(float(xp.vdot(h[k], grads[k] - self._cg["g"][k]).real) for k in grads)
+            den = sum(float(xp.vdot(self._cg["h"][k], self._cg["g"][k]).real) for k in grads)
+            beta = max(0.0, num / den) if den > 0 else 0.0
+            if beta > 0:
+                directions = {k: h[k] + beta * self._cg["d"][k] for k in grads}
+                # keep a descent direction (grads are negative gradients)
+                if sum(float(xp.vdot(grads[k], directions[k]).real) for k in grads) <= 0:
+                    directions = h
+
+        # backtracking line search on the loss
+        if self._cg_loss is None:
+            self._cg_loss = self._loss()
+        start = {k: getattr(self, k).copy() for k in directions}
+        t = min(self.step, 2.0 * self._cg_step_size)
+        for _ in range(self.max_backtracks + 1):
+            for k, d in directions.items():
+                x = getattr(self, k)
+                xp.add(start[k], t * d, out=x)
+            loss = self._loss()
+            if loss <= self._cg_loss:
+                self._cg_step_size, self._cg_loss = t, loss
+                self._cg = {"g": grads, "h": h, "d": directions}
+                return
+            t *= 0.5
+        # no acceptable step: keep the iterate and restart the directions
+        for k in directions:
+            getattr(self, k)[...] = start[k]
+        self._cg = None
+
+    def run(self, n_iter=100, time_budget=None, target_error=None, stall_patience=None):
+        """
+        Run the optimization.
+
+        Stops after `n_iter` iterations, or earlier on `time_budget` (seconds),
+        `target_error` or `stall_patience` (see RunMonitor). If any of the
+        latter is set, the best-so-far (object, probe) is returned. The
+        monitor is kept as `self.monitor`.
+        """
+        monitor = self.monitor = RunMonitor(n_iter, time_budget, target_error, stall_patience)
+        for it in monitor:
+            err = 0.0
+            if self.optimizer == "adam":
+                for sel in self._batches():
+                    g_obj, g_prb, err_val = self._gradient(sel)
+                    err += err_val
+                    self._adam_step(g_obj, g_prb)
+            else:
+                g_obj, g_prb, err = self._gradient(slice(0, self.n_scan))
+                self._cg_step(g_obj, g_prb)
+
+            avg_err = float(err / self.n_scan)
+
+            if self.callback:
+                self.callback(it, avg_err, self.obj)
+            monitor.record(avg_err, lambda: copy_result((self.obj, self.prb)))
+
+        return self.ptycho.expand_result(monitor.result((self.obj, self.prb)))
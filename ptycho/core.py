@@ -1,6 +1,8 @@
 from typing import List, Tuple, Union, Optional, Callable
-from ptychoep.ptycho.data import DiffractionData
+from dataclasses import replace
+from ptychoep.ptycho.data import DiffractionData, ENCODINGS, ANSCOMBE_OFFSET, decode_amplitude
 from ptychoep.backend.backend import np
+import numpy as _np
 
 
 class Ptycho:
@@ -8,7 +10,10 @@ class Ptycho:
     A container class for managing ptychographic reconstruction data.
 
     This class handles object/probe initialization, scan positions, and
-    a collection of DiffractionData objects.
+    a collection of DiffractionData objects. The diffraction patterns are
+    stored in one contiguous (N, H, W) stack (`diffraction_stack`), of which
+    the DiffractionData hold row views; positions and patch offsets are
+    available as (N, 2) arrays (`positions`, `offsets`).
     """
 
     def __init__(self):
@@ -17,7 +22,12 @@ class Ptycho:
         self.prb: Optional[np().ndarray] = None
         self.obj_len: Optional[int] = None
         self.prb_len: Optional[int] = None
-        self._diff_data: List[DiffractionData] = []
+        # real-space pixel size of the object grid (user units; rescaled by detector preprocessing)
+        self.pixel_size: Optional[float] = None
+        self._reset_storage()
+        # set on compacted instances (see `compacted`)
+        self.roi: Optional[Tuple[slice, slice]] = None
+        self.parent_obj_len: Optional[int] = None
 
     # --- Object and Probe ---
     def set_object(self, obj: np().ndarray):
@@ -33,6 +43,7 @@ class Ptycho:
             raise ValueError("The object must be square-shaped.")
         self.obj = obj
         self.obj_len = obj.shape[0]
+        self._geometry = None
 
     def set_probe(self, probe: np().ndarray):
         """
@@ -49,26 +60,215 @@ class Ptycho:
         self.prb_len = probe.shape[0]
 
     # --- DiffractionData management ---
+    #
+    # The patterns live in one contiguous (M, H, W) stack (`_stack`, rows in
+    # registration order, with spare capacity for appends). `_records[i]` is
+    # the DiffractionData of row i, whose `diffraction` is a view of that row,
+    # and `_order` lists the rows in scan order: sorting and subsetting only
+    # permute `_order`. Positions and patch offsets are kept as (M, 2) host
+    # arrays alongside.
+
+    def _reset_storage(self):
+        self._stack = None
+        self._n_rows = 0
+        self._records: List[Optional[DiffractionData]] = []
+        self._positions = _np.zeros((0, 2), dtype=_np.int64)
+        self._offsets = _np.zeros((0, 2), dtype=_np.int64)
+        self._order = _np.zeros(0, dtype=_np.int64)
+        self._shared = False
+        # compact storage (see `compact_storage`)
+        self.encoding: Optional[str] = None
+        self.count_scale: Optional[float] = None
+        self._invalidate()
+
+    def _invalidate(self):
+        self._diff_list = None
+        self._geometry = None
+
+    @property
+    def _diff_data(self) -> List[DiffractionData]:
+        """DiffractionData in scan order (cached list; do not modify)."""
+        if self._diff_list is None:
+            self._diff_list = [self._records[i] for i in self._order]
+        return self._diff_list
+
+    @property
+    def n_scan(self) -> int:
+        """Number of registered scans."""
+        return len(self._order)
+
+    def _append(self, records: List[DiffractionData], stack=None):
+        """
+        Copy the patterns of `records` into the stack and turn their `diffraction`
+        into row views. A given (k, H, W) `stack` holding the patterns is adopted
+        as storage when this Ptycho is empty.
+        """
+        k = len(records)
+        if k == 0:
+            return
+        xp = np()
+        if any(d.encoding != self.encoding or d.count_scale != self.count_scale for d in records):
+            if self._n_rows or len({(d.encoding, d.count_scale) for d in records}) > 1:
+                raise ValueError("All diffraction data must share the same storage encoding.")
+            self.encoding, self.count_scale = records[0].encoding, records[0].count_scale
+        if self._shared:
+            self._detach()
+        shape = tuple(records[0].diffraction.shape) if stack is None else tuple(stack.shape[1:])
+        if any(tuple(d.diffraction.shape) != shape for d in records):
+            raise ValueError("All diffraction patterns must have the same shape.")
+
+        n = self._n_rows
+        if stack is not None and n == 0:
+            self._stack = stack
+        else:
+            dtype = xp.result_type(*{d.diffraction.dtype for d in records})
+            if self._stack is not None:
+                if tuple(self._stack.shape[1:]) != shape:
+                    raise ValueError(f"Diffraction shape {shape} differs from the registered {self._stack.shape[1:]}.")
+                dtype = xp.result_type(self._stack.dtype, dtype)
+            if self._stack is None or n + k > len(self._stack) or dtype != self._stack.dtype:
+                capacity = n + k if self._stack is None else max(n + k, 2 * len(self._stack))
+                self._grow(capacity, dtype, shape)
+            for i, d in enumerate(records):
+                self._stack[n + i] = d.diffraction
+
+        self._records.extend(records)
+        for i, d in enumerate(records):
+            d.diffraction = self._stack[n + i]
+        self._positions = _np.concatenate([self._positions[:n], _np.asarray(
+            [d.position for d in records], dtype=_np.int64).reshape(k, 2)])
+        self._offsets = _np.concatenate([self._offsets[:n], _np.asarray(
+            [(-1, -1) if d.indices is None else (d.indices[0].start, d.indices[1].start) for d in records],
+            dtype=_np.int64).reshape(k, 2)])
+        self._order = _np.concatenate([self._order, _np.arange(n, n + k)])
+        self._n_rows = n + k
+        self._invalidate()
+
+    def _grow(self, capacity: int, dtype, shape):
+        """Reallocate the stack and re-point the views of the registered records."""
+        xp = np()
+        stack = xp.empty((capacity,) + tuple(shape), dtype=dtype)
+        n = self._n_rows
+        if n:
+            stack[:n] = self._stack[:n]
+        self._stack = stack
+        for i, d in enumerate(self._records):
+            if d is not None:
+                d.diffraction = stack[i]
+
+    def _detach(self):
+        """Give a Ptycho sharing another one's stack (see `subset`) its own compact copy."""
+        rows = self._order
+        stack = np().ascontiguousarray(self._stack[np().asarray(rows)])
+        self._records = [replace(self._records[r], diffraction=stack[i]) for i, r in enumerate(rows)]
+        self._stack = stack
+        self._positions = self._positions[rows]
+        self._offsets = self._offsets[rows]
+        self._order = _np.arange(len(rows))
+        self._n_rows = len(rows)
+        self._shared = False
+        self._invalidate()
+
+    def compact_storage(self, mode: str = "counts", scale: Optional[float] = None, chunk_size: int = 256):
+        """
+        Re-encode the diffraction stack in a compact dtype.
+
+        - "counts": unsigned photon counts (uint16, or uint32 if needed),
+          recovered from Poisson amplitudes a = sqrt((c + 3/8) / scale). Exact
+          for data from PoissonNoise; other data is rounded to counts.
+        - "float16": amplitudes in half precision (about 3 significant digits).
+
+        Consumers read amplitudes through `DiffractionData.amplitude`,
+        `take_amplitude` or `amplitude`, which decode to float32 on the fly.
+        The stack is rewritten in scan order; DiffractionData objects are kept
+        and re-pointed to the new rows. Noise can no longer be applied.
+
+        Parameters
+        ----------
+        mode : str
+            "counts" or "float16".
+        scale : float or None
+            Photons per unit intensity for "counts". Defaults to the PoissonNoise
+            scale (gamma_w / 4 of the data, or `noise_stats["scale"]`).
+        chunk_size : int
+            Frames converted at a time.
+        """
+        xp = np()
+        if mode not in ENCODINGS:
+            raise ValueError(f"mode must be one of {ENCODINGS}, got {mode!r}")
+        if self.encoding is not None:
+            raise ValueError(f"Diffraction data is already stored as {self.encoding!r}.")
+        records = self._diff_data
+        if mode == "counts" and scale is None:
+            stats = getattr(self, "noise_stats", None) or {}
+            if stats.get("type") == "Poisson":
+                scale = stats["scale"]
+            elif records and records[0].gamma_w is not None:
+                scale = records[0].gamma_w / 4.0
+            else:
+                raise ValueError("scale is required for count storage of non-Poisson data.")
+
+        n = len(records)
+        chunks = [slice(a, min(a + chunk_size, n)) for a in range(0, n, chunk_size)]
+        dtype = xp.float16
+        if mode == "counts":
+            peak = max((float(xp.max(xp.abs(self.take_diffraction(sel)))) for sel in chunks), default=0.0)
+            dtype = xp.uint16 if peak ** 2 * scale < 65535 else xp.uint32
+        stack = xp.empty((n,) + tuple(self._stack.shape[1:] if n else ()), dtype=dtype)
+        for sel in chunks:
+            amp = self.take_diffraction(sel)
+            if mode == "counts":
+                # invert a = sqrt((c + 3/8) / scale)
+                stack[sel] = xp.maximum(xp.rint(xp.abs(amp).astype(xp.float64) ** 2 * scale - ANSCOMBE_OFFSET), 0)
+            else:
+                stack[sel] = amp
+
+        self._positions, self._offsets = self.positions, self.offsets
+        for i, d in enumerate(records):
+            d.diffraction = stack[i]
+            d.encoding, d.count_scale = mode, (float(scale) if mode == "counts" else None)
+        self._stack = stack
+        self._records = list(records)
+        self._order = _np.arange(n)
+        self._n_rows = n
+        self._shared = False
+        self.encoding, self.count_scale = mode, (float(scale) if mode == "counts" else None)
+        self._invalidate()
+
+    def amplitude(self, raw: np().ndarray) -> np().ndarray:
+        """Decode a pattern or batch taken from this Ptycho's stack to amplitudes (no-op without compact storage)."""
+        return decode_amplitude(raw, self.encoding, self.count_scale)
+
+    def take_amplitude(self, sel=None) -> np().ndarray:
+        """Amplitudes of the selected scans (`take_diffraction` followed by `amplitude`)."""
+        return self.amplitude(self.take_diffraction(sel))
+
     def add_diffraction_data(self, diff_data: DiffractionData):
         """
-        Add a single DiffractionData instance to the internal list.
+        Add a single DiffractionData instance.
+
+        Its pattern is copied into the diffraction stack and `diff_data.diffraction`
+        becomes a view of the stack row.
         """
         if not isinstance(diff_data, DiffractionData):
             raise TypeError("diff_data must be a DiffractionData instance")
-        self._diff_data.append(diff_data)
+        self._append([diff_data])
 
     def add_diffraction_data_list(self, diff_data_list: List[DiffractionData]):
         """
-        Add multiple DiffractionData objects to the internal list.
+        Add multiple DiffractionData objects (one copy into the stack).
         """
+        diff_data_list = list(diff_data_list)
         for d in diff_data_list:
-            self.add_diffraction_data(d)
+            if not isinstance(d, DiffractionData):
+                raise TypeError("diff_data must be a DiffractionData instance")
+        self._append(diff_data_list)
 
     def clear_diffraction_data(self):
         """
         Clear all currently stored diffraction data.
         """
-        self._diff_data.clear()
+        self._reset_storage()
 
     def sort_diffraction_data(
         self,
@@ -77,7 +277,7 @@ class Ptycho:
         reverse: bool = False,
     ):
         """
-        Sort the internal diffraction data list.
+        Sort the diffraction data (the scan order; the stack itself is not moved).
 
         Parameters
         ----------
@@ -92,23 +292,79 @@ class Ptycho:
             If True, sort in descending order.
         """
         if callable(key):
-            score = key
+            scores = [key(d) for d in self._diff_data]
         elif key == "center_distance":
             if center is None:
                 if self.obj_len is None:
                     raise ValueError("Object size unknown. Set object first or specify center manually.")
                 center = (self.obj_len // 2, self.obj_len // 2)
-            cy, cx = center
-            def score(d: DiffractionData):
-                y, x = d.position
-                return (y - cy) ** 2 + (x - cx) ** 2
+            scores = ((self.positions - _np.asarray(center)) ** 2).sum(axis=1)
         elif key == "meta:sort_key":
-            def score(d: DiffractionData):
-                return d.meta.get("sort_key", 0.0)
+            scores = [d.meta.get("sort_key", 0.0) for d in self._diff_data]
         else:
             raise ValueError(f"Unknown key: {key}")
 
-        self._diff_data.sort(key=score, reverse=reverse)
+        # stable in both directions, like list.sort
+        scores = _np.asarray(scores, dtype=float)
+        perm = _np.argsort(-scores if reverse else scores, kind="stable")
+        self._order = self._order[perm]
+        self._invalidate()
+
+    def subset(self, sel) -> "Ptycho":
+        """
+        Return a Ptycho holding the selected scans.
+
+        The new instance shares this one's diffraction stack (like a NumPy
+        view: in-place changes of the patterns are seen by both) and gets its
+        own DiffractionData views. Appending to it first copies the selected
+        rows into a stack of its own.
+
+        Parameters
+        ----------
+        sel : slice, int array or bool mask
+            Scans to keep, as indices into the current scan order.
+
+        Returns
+        -------
+        Ptycho
+        """
+        sub = self._like()
+        sub._share(self, self._order[_np.arange(self.n_scan)[sel]])
+        return sub
+
+    def _like(self) -> "Ptycho":
+        """Empty Ptycho with the same object, probe, ROI and noise statistics."""
+        other = Ptycho()
+        other.obj, other.obj_len = self.obj, self.obj_len
+        other.prb, other.prb_len = self.prb, self.prb_len
+        other.roi, other.parent_obj_len = self.roi, self.parent_obj_len
+        other.pixel_size = self.pixel_size
+        if getattr(self, "noise_stats", None) is not None:
+            other.noise_stats = self.noise_stats
+        return other
+
+    def _share(self, src: "Ptycho", rows, shift: Tuple[int, int] = (0, 0)):
+        """Adopt `rows` of `src`'s stack (positions and indices shifted by -shift)."""
+        dy, dx = shift
+        self._stack = src._stack
+        self._n_rows = src._n_rows
+        self._records = [None] * src._n_rows
+        for r in rows:
+            d = src._records[r]
+            changes = {}
+            if shift != (0, 0):
+                (py, px) = d.position
+                changes["position"] = (py - dy, px - dx)
+                if d.indices is not None:
+                    sy, sx = d.indices
+                    changes["indices"] = (slice(sy.start - dy, sy.stop - dy), slice(sx.start - dx, sx.stop - dx))
+            self._records[r] = replace(d, **changes)
+        self._positions = src._positions - _np.asarray(shift)
+        self._offsets = _np.where(src._offsets >= 0, src._offsets - _np.asarray(shift), -1)
+        self._order = _np.asarray(rows, dtype=_np.int64)
+        self._shared = True
+        self.encoding, self.count_scale = src.encoding, src.count_scale
+        self._invalidate()
 
     def set_diffraction_from_forward(self, diff_list: List[DiffractionData], append: bool = False):
         """
@@ -136,9 +392,98 @@ class Ptycho:
         append : bool
             If True, append to existing data. Otherwise, overwrite.
         """
-        from .forward import generate_diffraction
-        diff_list = generate_diffraction(self, positions)
-        self.set_diffraction_from_forward(diff_list, append=append)
+        from .forward import _simulate
+        stack, diff_list = _simulate(self, positions)
+        if not append:
+            self.clear_diffraction_data()
+        self._append(diff_list, stack=stack)
+
+    # --- Detector preprocessing ---
+    def reduce_detector(self, size: Optional[int] = None, binning: int = 1) -> "Ptycho":
+        """
+        Crop the detector to its central `size` x `size` region and/or bin it by `binning`.
+
+        Returns a new Ptycho with consistently rescaled probe, object grid,
+        scan positions and `pixel_size` (see `ptycho.preprocess.reduce_detector`).
+        """
+        from .preprocess import reduce_detector
+        return reduce_detector(self, size=size, binning=binning)
+
+    # --- Persistence ---
+    def save(self, path) -> None:
+        """
+        Save the dataset to the directory `path` (see `ptycho.dataset.save_ptycho`).
+
+        The diffraction stack is stored as a raw `.npy` file, together with
+        positions, offsets, gamma_w, probe, object and a JSON manifest.
+        """
+        from .dataset import save_ptycho
+        save_ptycho(self, path)
+
+    @classmethod
+    def load(cls, path, mmap: bool = True) -> "Ptycho":
+        """
+        Open a dataset saved with `save`.
+
+        With `mmap=True` (NumPy backend) the diffraction stack is memory-mapped
+        and frames are read from disk on demand (see `ptycho.dataset.load_ptycho`).
+        """
+        from .dataset import load_ptycho
+        return load_ptycho(path, mmap=mmap)
+
+    @property
+    def geometry(self):
+        """
+        ScanGeometry of the registered diffraction data (patch offsets in scan order).
+
+        Computed once and cached until the object size or the diffraction data change.
+        """
+        if self._geometry is None:
+            from .geometry import ScanGeometry
+            self._geometry = ScanGeometry.from_ptycho(self)
+        return self._geometry
+
+    @property
+    def positions(self) -> _np.ndarray:
+        """(N, 2) host array of the scan positions (y, x) in scan order."""
+        return self._positions[self._order]
+
+    @property
+    def offsets(self) -> _np.ndarray:
+        """(N, 2) host array of the patch top-left corners in scan order (-1 where indices are unset)."""
+        return self._offsets[self._order]
+
+    @property
+    def diffraction_stack(self) -> np().ndarray:
+        """
+        (N, H, W) diffraction patterns in scan order.
+
+        A view of the stack when the scans occupy consecutive rows (e.g.
+        neither sorted nor subset), otherwise a gathered copy.
+        """
+        return self.take_diffraction()
+
+    def take_diffraction(self, sel=None) -> np().ndarray:
+        """
+        Diffraction patterns of the selected scans as an (n, H, W) array.
+
+        Parameters
+        ----------
+        sel : slice, int array or None
+            Indices into the scan order (None: all scans).
+
+        Returns
+        -------
+        ndarray
+            A view of the stack when the selected rows are consecutive, otherwise a copy.
+        """
+        if self._stack is None:
+            return np().zeros((0, 0, 0), dtype=np().float32)
+        rows = self._order if sel is None else self._order[sel]
+        rows = _np.atleast_1d(rows)
+        if len(rows) and (len(rows) == 1 or (_np.diff(rows) == 1).all()):
+            return self._stack[int(rows[0]):int(rows[-1]) + 1]
+        return self._stack[np().asarray(rows)]
 
     @property
     def scan_pos(self) -> List[Tuple[int, int]]:
@@ -150,6 +495,67 @@ class Ptycho:
     @property
     def diffs(self) -> List[np().ndarray]:
         """
-        List of diffraction patterns (legacy-compatible).
+        List of diffraction amplitudes (legacy-compatible; views of the stack
+        unless the data is in compact storage).
         """
-        return [d.diffraction for d in self._diff_data]
+        return [d.amplitude() for d in self._diff_data]
+
+    # --- Region of interest ---
+    def compacted(self) -> "Ptycho":
+        """
+        Return a Ptycho restricted to the scanned region of the object grid.
+
+        The new instance uses the smallest square sub-grid (kept inside this
+        grid) that contains every scan patch. Positions and indices are shifted
+        accordingly; diffraction arrays and the probe are shared, not copied.
+        Its `roi` attribute is the (slice, slice) of the sub-grid within this
+        grid, and `expand` / `crop` map arrays between the two grids.
+
+        Returns
+        -------
+        Ptycho
+            The compacted Ptycho.
+        """
+        if not self._diff_data:
+            raise ValueError("No diffraction data registered.")
+        y0, y1, x0, x1 = self.geometry.bounding_box
+        size = max(y1 - y0, x1 - x0)
+        # square the box, keeping it inside the grid
+        y0 = min(max(y0 - (size - (y1 - y0)) // 2, 0), self.obj_len - size)
+        x0 = min(max(x0 - (size - (x1 - x0)) // 2, 0), self.obj_len - size)
+
+        compact = Ptycho()
+        if self.obj is not None:
+            compact.set_object(self.obj[y0:y0 + size, x0:x0 + size])
+        else:
+            compact.obj_len = size
+        if self.prb is not None:
+            compact.set_probe(self.prb)
+        compact._share(self, self._order, shift=(y0, x0))
+        compact.roi = (slice(y0, y0 + size), slice(x0, x0 + size))
+        compact.parent_obj_len = self.obj_len
+        compact.pixel_size = self.pixel_size
+        if getattr(self, "noise_stats", None) is not None:
+            compact.noise_stats = self.noise_stats
+        return compact
+
+    def crop(self, arr: Optional[np().ndarray]) -> Optional[np().ndarray]:
+        """Restrict an array on the parent object grid to `roi` (no-op if not compacted or already cropped)."""
+        if arr is None or self.roi is None or arr.shape[-2:] == (self.obj_len, self.obj_len):
+            return arr
+        return arr[..., self.roi[0], self.roi[1]]
+
+    def expand(self, arr: np().ndarray, fill=0) -> np().ndarray:
+        """Embed an array on this (compacted) grid into the parent grid, filling the rest with `fill`."""
+        if self.roi is None:
+            return arr
+        xp = np()
+        full = xp.full(arr.shape[:-2] + (self.parent_obj_len, self.parent_obj_len), fill, dtype=arr.dtype)
+        full[..., self.roi[0], self.roi[1]] = arr
+        return full
+
+    def expand_result(self, result):
+        """Apply `expand` to the object of an engine result (an object or an (object, ...) tuple)."""
+        if isinstance(result, tuple):
+            return (self.expand(result[0]),) + tuple(result[1:])
+        return self.expand(result)
@@ -4,6 +4,44 @@ from ptychoep.backend.backend import np
 
 IdxType = Optional[Tuple[slice, slice]]
 
+ANSCOMBE_OFFSET = 3.0 / 8.0
+ENCODINGS = ("counts", "float16")
+
+
+def decode_amplitude(raw: np().ndarray, encoding: Optional[str] = None,
+                     count_scale: Optional[float] = None) -> np().ndarray:
+    """
+    Convert stored diffraction data (a single pattern or a batch) to amplitudes.
+
+    Parameters
+    ----------
+    raw : np.ndarray
+        Stored data: amplitudes (encoding None), photon counts ("counts") or
+        float16 amplitudes ("float16").
+    encoding : str or None
+        Storage encoding, see `Ptycho.compact_storage`.
+    count_scale : float or None
+        Photons per unit intensity (required for "counts").
+
+    Returns
+    -------
+    np.ndarray
+        Amplitudes; `raw` itself for encoding None, float32 otherwise. Counts c
+        are decoded as sqrt((c + 3/8) / count_scale), the Anscombe-offset
+        amplitude produced by PoissonNoise.
+    """
+    if encoding is None:
+        return raw
+    xp = np()
+    if encoding == "counts":
+        intensity = raw.astype(xp.float32)
+        intensity += xp.float32(ANSCOMBE_OFFSET)
+        intensity /= xp.float32(count_scale)
+        return xp.sqrt(intensity, out=intensity)
+    if encoding == "float16":
+        return raw.astype(xp.float32)
+    raise ValueError(f"Unknown diffraction encoding: {encoding!r}")
+
 
 @dataclass
 class DiffractionData:
@@ -18,13 +56,20 @@ class DiffractionData:
     position : Tuple[int, int]
         The scan position (y, x) on the object grid.
     diffraction : np.ndarray
-        The complex-valued diffraction pattern.
+        The complex-valued diffraction pattern. Once registered in a Ptycho,
+        this is a view of a row of the Ptycho's diffraction stack; modify it
+        in place (``d.diffraction[...] = ...``) to keep the two in sync.
+        With compact storage it holds the encoded data; use `amplitude()`.
     meta : dict
         A dictionary to store auxiliary metadata (e.g., scan index, intensity stats).
     indices : Optional[Tuple[slice, slice]]
         Slice object indexing into the object array corresponding to this scan.
     gamma_w : Optional[float]
         Precision parameter used in uncertainty modeling (optional).
+    encoding : Optional[str]
+        None (amplitudes), "counts" (unsigned photon counts) or "float16".
+    count_scale : Optional[float]
+        Photons per unit intensity, for encoding "counts".
     """
 
     position: Tuple[int, int]
@@ -32,6 +77,19 @@ class DiffractionData:
     meta: dict = field(default_factory=dict)
     indices: IdxType = None
     gamma_w: Optional[float] = None
+    encoding: Optional[str] = None
+    count_scale: Optional[float] = None
+
+    def amplitude(self) -> np().ndarray:
+        """
+        Return the diffraction amplitude, decoding compact storage on the fly.
+
+        Returns
+        -------
+        np.ndarray
+            `diffraction` itself if it stores amplitudes, else a float32 array.
+        """
+        return decode_amplitude(self.diffraction, self.encoding, self.count_scale)
 
     def intensity(self) -> np().ndarray:
         """
@@ -42,7 +100,7 @@ class DiffractionData:
         np.ndarray
             Real-valued intensity image.
         """
-        return np().abs(self.diffraction) ** 2
+        return np().abs(self.amplitude()) ** 2
 
     def get_gamma_w(self):
         """
@@ -78,7 +136,7 @@ class DiffractionData:
         import matplotlib.pyplot as plt
         from ptychoep.backend.backend import np
 
-        data = self.diffraction
+        data = self.amplitude()
         if log_scale:
             data = np().log10(np().abs(data) + 1e-8)
         if ax is None:
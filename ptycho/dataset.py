@@ -0,0 +1,156 @@
+import json
+import os
+from typing import Union
+import numpy as _np
+from ptychoep.backend.backend import np, is_cupy
+from .core import Ptycho
+from .data import DiffractionData
+
+FORMAT_VERSION = 1
+_CHUNK = 256  # frames written per block
+
+
+def _to_host(arr):
+    if is_cupy():
+        import cupy
+        return cupy.asnumpy(arr)
+    return _np.asarray(arr)
+
+
+def save_ptycho(ptycho: Ptycho, path: Union[str, os.PathLike]) -> None:
+    """
+    Write a Ptycho dataset to the directory `path` (created if needed).
+
+    Layout
+    ------
+    manifest.json     format version, sizes, ROI, pixel size, per-scan meta, noise stats, storage encoding
+    diffraction.npy   (N, H, W) diffraction stack in scan order (compact dtype if encoded)
+    positions.npy     (N, 2) scan positions
+    offsets.npy       (N, 2) patch top-left corners (-1 where indices are unset)
+    gamma_w.npy       (N,) noise precisions (NaN where unset)
+    probe.npy, object.npy   if set
+
+    The stack is written block by block into a `.npy` file (64-byte aligned
+    header), so it can be memory-mapped by `load_ptycho`.
+
+    Parameters
+    ----------
+    ptycho : Ptycho
+        Dataset to save.
+    path : str or PathLike
+        Target directory.
+    """
+    os.makedirs(path, exist_ok=True)
+    records = ptycho._diff_data
+    n = len(records)
+
+    patch_shape = None
+    if n:
+        stack0 = ptycho.take_diffraction(slice(0, 1))
+        out = _np.lib.format.open_memmap(os.path.join(path, "diffraction.npy"), mode="w+",
+                                         dtype=_to_host(stack0).dtype, shape=(n,) + tuple(stack0.shape[1:]))
+        for start in range(0, n, _CHUNK):
+            sel = slice(start, min(start + _CHUNK, n))
+            out[sel] = _to_host(ptycho.take_diffraction(sel))
+        out.flush()
+        del out
+        if records[0].indices is not None:
+            sy, sx = records[0].indices
+            patch_shape = [sy.stop - sy.start, sx.stop - sx.start]
+
+    _np.save(os.path.join(path, "positions.npy"), ptycho.positions)
+    _np.save(os.path.join(path, "offsets.npy"), ptycho.offsets)
+    _np.save(os.path.join(path, "gamma_w.npy"),
+             _np.asarray([_np.nan if d.gamma_w is None else d.gamma_w for d in records], dtype=_np.float64))
+    if ptycho.prb is not None:
+        _np.save(os.path.join(path, "probe.npy"), _to_host(ptycho.prb))
+    if ptycho.obj is not None:
+        _np.save(os.path.join(path, "object.npy"), _to_host(ptycho.obj))
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "n_scan": n,
+        "patch_shape": patch_shape,
+        "obj_len": ptycho.obj_len,
+        "prb_len": ptycho.prb_len,
+        "roi": None if ptycho.roi is None else [[s.start, s.stop] for s in ptycho.roi],
+        "parent_obj_len": ptycho.parent_obj_len,
+        "pixel_size": ptycho.pixel_size,
+        "meta": [d.meta for d in records] if any(d.meta for d in records) else None,
+        "noise_stats": getattr(ptycho, "noise_stats", None),
+        "encoding": ptycho.encoding,
+        "count_scale": ptycho.count_scale,
+    }
+    with open(os.path.join(path, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=1)
+
+
+def load_ptycho(path: Union[str, os.PathLike], mmap: bool = True) -> Ptycho:
+    """
+    Open a dataset written by `save_ptycho`.
+
+    Parameters
+    ----------
+    path : str or PathLike
+        Dataset directory.
+    mmap : bool
+        If True (NumPy backend), the diffraction stack is memory-mapped
+        copy-on-write: frames are paged in on demand, and in-place changes
+        (e.g. noise) stay in memory without touching the file. With CuPy,
+        or if False, the stack is read into (device) memory.
+
+    Returns
+    -------
+    Ptycho
+        The dataset, with DiffractionData views of the stack rows.
+    """
+    xp = np()
+    with open(os.path.join(path, "manifest.json")) as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported dataset format version {manifest.get('format_version')!r}")
+
+    def _load(name, **kwargs):
+        file = os.path.join(path, name)
+        return _np.load(file, **kwargs) if os.path.exists(file) else None
+
+    ptycho = Ptycho()
+    obj = _load("object.npy")
+    if obj is not None:
+        ptycho.set_object(xp.asarray(obj))
+    else:
+        ptycho.obj_len = manifest["obj_len"]
+    prb = _load("probe.npy")
+    if prb is not None:
+        ptycho.set_probe(xp.asarray(prb))
+    if manifest["roi"] is not None:
+        ptycho.roi = tuple(slice(a, b) for a, b in manifest["roi"])
+        ptycho.parent_obj_len = manifest["parent_obj_len"]
+    ptycho.pixel_size = manifest.get("pixel_size")
+    if manifest.get("noise_stats") is not None:
+        ptycho.noise_stats = manifest["noise_stats"]
+
+    n = manifest["n_scan"]
+    if n == 0:
+        return ptycho
+    stack = _load("diffraction.npy", mmap_mode="c" if mmap else None)
+    if is_cupy() or not mmap:
+        stack = xp.asarray(stack)
+    positions, offsets, gamma_w = _load("positions.npy"), _load("offsets.npy"), _load("gamma_w.npy")
+    meta = manifest["meta"] or [{}] * n
+    ph, pw = manifest["patch_shape"] or (0, 0)
+
+    records = []
+    for i in range(n):
+        oy, ox = (int(v) for v in offsets[i])
+        records.append(DiffractionData(
+            position=tuple(int(v) for v in positions[i]),
+            diffraction=stack[i],
+            meta=dict(meta[i]),
+            indices=None if oy < 0 else (slice(oy, oy + ph), slice(ox, ox + pw)),
+            gamma_w=None if _np.isnan(gamma_w[i]) else float(gamma_w[i]),
+            encoding=manifest.get("encoding"),
+            count_scale=manifest.get("count_scale"),
+        ))
+    ptycho._append(records, stack=stack)
+    return ptycho
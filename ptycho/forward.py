@@ -30,11 +30,23 @@ def generate_diffraction(ptycho: Ptycho, positions: List[Tuple[int, int]]) -> Li
     if ptycho.obj_len is None or ptycho.prb_len is None:
         raise ValueError("Object and probe dimensions are not initialized.")
 
+    return _simulate(ptycho, positions)[1]
+
+
+def _simulate(ptycho: Ptycho, positions: List[Tuple[int, int]]):
+    """
+    Forward model into one (N, H, W) amplitude stack.
+
+    Returns the stack and the DiffractionData list, whose `diffraction`
+    fields are views of the stack rows.
+    """
     prb_len = ptycho.prb_len
+    positions = list(positions)
     diffs: List[DiffractionData] = []
     fft2 = np().fft.fft2
+    stack = None
 
-    for pos in positions:
+    for i, pos in enumerate(positions):
         y, x = pos
 
         # Extract object patch corresponding to the scan position
@@ -45,12 +57,15 @@ def generate_diffraction(ptycho: Ptycho, positions: List[Tuple[int, int]]) -> Li
 
         # Compute diffraction amplitude via 2D FFT
         diff = np().abs(fft2(obj_patch * ptycho.prb, norm="ortho"))
+        if stack is None:
+            stack = np().empty((len(positions),) + diff.shape, dtype=diff.dtype)
+        stack[i] = diff
 
         # Store slice indices for possible use in backward operations
         yy0, yy1 = y - prb_len // 2, y + prb_len // 2
         xx0, xx1 = x - prb_len // 2, x + prb_len // 2
         indices = (slice(yy0, yy1), slice(xx0, xx1))
 
-        diffs.append(DiffractionData(position=pos, diffraction=diff, indices=indices))
+        diffs.append(DiffractionData(position=pos, diffraction=stack[i], indices=indices))
 
-    return diffs
+    return stack, diffs
@@ -0,0 +1,234 @@
+from typing import List, Optional, Sequence, Tuple
+import numpy as _np
+from ptychoep.backend.backend import np, is_cupy
+
+
+def _as_strided(arr, shape, strides, writeable=True):
+    """Backend-agnostic strided view (writable where possible, unless `writeable` is False)."""
+    if is_cupy():
+        return np().lib.stride_tricks.as_strided(arr, shape=shape, strides=strides)
+    return _np.lib.stride_tricks.as_strided(arr, shape=shape, strides=strides,
+                                           writeable=writeable and arr.flags.writeable)
+
+
+class ScanGeometry:
+    """
+    Precomputed scan-patch layout shared by all reconstruction engines.
+
+    The geometry stores only the top-left offset of every scan patch, so
+    batched gathers and scatter-adds over the object grid can be done
+    without building per-pixel index arrays.
+
+    - Gathers use a sliding-window (strided) view of the object, in which
+      every patch is addressed by a single (y, x) pair. When the selected
+      patches are equally spaced in memory (e.g. one scan, or a scan line),
+      the result is a read-only strided view instead of a copy.
+    - Scatter-adds are overlap-safe: patches are added with one vectorized
+      update per group of mutually non-overlapping scans (see `groups`).
+
+    Attributes:
+        obj_shape (tuple): Shape (H_obj, W_obj) of the object grid.
+        patch_shape (tuple): Shape (H, W) of a scan patch.
+        offsets (numpy.ndarray): Host array of shape (N, 2) with the (y, x) top-left corner of each patch.
+        n_scan (int): Number of scan positions.
+    """
+
+    def __init__(self, obj_shape: Tuple[int, int], offsets, patch_shape: Tuple[int, int]):
+        offsets = _np.asarray(offsets, dtype=_np.int64).reshape(-1, 2)
+        self.obj_shape = tuple(int(s) for s in obj_shape)
+        self.patch_shape = tuple(int(s) for s in patch_shape)
+        ph, pw = self.patch_shape
+        if len(offsets) and (offsets.min() < 0
+                             or offsets[:, 0].max() + ph > self.obj_shape[0]
+                             or offsets[:, 1].max() + pw > self.obj_shape[1]):
+            raise ValueError("Scan patches must lie inside the object grid.")
+
+        self.offsets = offsets
+        self.n_scan = len(offsets)
+        self._ys = np().asarray(offsets[:, 0])
+        self._xs = np().asarray(offsets[:, 1])
+        self._groups: Optional[List[_np.ndarray]] = None
+
+    @classmethod
+    def from_indices(cls, obj_shape: Tuple[int, int], indices: Sequence[Tuple[slice, slice]]):
+        """
+        Build the geometry from a sequence of (slice, slice) patch indices.
+
+        Raises:
+            ValueError: If an index is not a pair of slices or patch sizes differ.
+        """
+        offsets = []
+        patch_shape = None
+        for idx in indices:
+            if not (isinstance(idx, tuple) and len(idx) == 2
+                    and isinstance(idx[0], slice) and isinstance(idx[1], slice)):
+                raise ValueError("ScanGeometry requires (slice, slice) patch indices.")
+            sl_y, sl_x = idx
+            shape = (sl_y.stop - sl_y.start, sl_x.stop - sl_x.start)
+            if patch_shape is None:
+                patch_shape = shape
+            elif shape != patch_shape:
+                raise ValueError("All scan patches must have the same shape.")
+            offsets.append((sl_y.start, sl_x.start))
+        if patch_shape is None:
+            raise ValueError("ScanGeometry requires at least one scan position.")
+        return cls(obj_shape, offsets, patch_shape)
+
+    @classmethod
+    def from_ptycho(cls, ptycho):
+        """Build the geometry from the diffraction data registered in a Ptycho object."""
+        indices = []
+        for d in ptycho._diff_data:
+            if d.indices is None:
+                raise ValueError(f"indices not set for data at position {d.position}")
+            indices.append(d.indices)
+        return cls.from_indices((ptycho.obj_len, ptycho.obj_len), indices)
+
+    @property
+    def bounding_box(self) -> Tuple[int, int, int, int]:
+        """(y0, y1, x0, x1) of the smallest rectangle containing every scan patch."""
+        ph, pw = self.patch_shape
+        y0, x0 = (int(v) for v in self.offsets.min(axis=0))
+        y1, x1 = (int(v) for v in self.offsets.max(axis=0))
+        return y0, y1 + ph, x0, x1 + pw
+
+    # --- indexing helpers ---
+    def slices(self, i: int) -> Tuple[slice, slice]:
+        """Return the (slice, slice) index of the i-th patch."""
+        y, x = self.offsets[i]
+        ph, pw = self.patch_shape
+        return slice(int(y), int(y) + ph), slice(int(x), int(x) + pw)
+
+    def _select(self, sel):
+        if sel is None:
+            return self._ys, self._xs
+        if not isinstance(sel, slice):
+            sel = np().asarray(sel)
+        return self._ys[sel], self._xs[sel]
+
+    def windows(self, arr):
+        """
+        Return a zero-copy sliding-window view of a 2D array.
+
+        The view has shape (H_obj - H + 1, W_obj - W + 1, H, W), and
+        `windows(arr)[y, x]` is the patch whose top-left corner is (y, x).
+        """
+        if arr.shape[-2:] != self.obj_shape or arr.ndim != 2:
+            raise ValueError(f"Expected an array of shape {self.obj_shape}, got {arr.shape}")
+        ph, pw = self.patch_shape
+        shape = (self.obj_shape[0] - ph + 1, self.obj_shape[1] - pw + 1, ph, pw)
+        return _as_strided(arr, shape, arr.strides * 2)
+
+    # --- batched gather / scatter ---
+    def gather(self, arr, sel=None, out=None):
+        """
+        Extract the patches of `arr` at the selected scans as an (n, H, W) stack.
+
+        Args:
+            arr (ndarray): 2D array on the object grid.
+            sel (array-like, slice or None): Scan indices to gather. None selects all scans.
+            out (ndarray or None): Optional output buffer of shape (n, H, W).
+
+        Returns:
+            ndarray: Stack of patches. Without `out`, this is a read-only view of
+            `arr` when the patch corners are equally spaced in memory, otherwise a copy.
+        """
+        if out is None:
+            view = self._strided_patches(arr, sel)
+            if view is not None:
+                return view
+        ys, xs = self._select(sel)
+        patches = self.windows(arr)[ys, xs]
+        if out is None:
+            return patches
+        out[...] = patches
+        return out
+
+    def _strided_patches(self, arr, sel):
+        """Zero-copy (n, H, W) view of the selected patches, or None if their corners are not equally spaced."""
+        if arr.shape[-2:] != self.obj_shape or arr.ndim != 2:
+            raise ValueError(f"Expected an array of shape {self.obj_shape}, got {arr.shape}")
+        if not isinstance(sel, (type(None), slice, list, tuple, _np.ndarray)):
+            return None  # device index arrays: use the fancy-indexed gather
+        offsets = (self.offsets if sel is None else self.offsets[sel]).reshape(-1, 2)
+        if len(offsets) == 0:
+            return None
+        sy, sx = arr.strides
+        starts = offsets[:, 0] * sy + offsets[:, 1] * sx
+        step = int(starts[1] - starts[0]) if len(starts) > 1 else 0
+        if len(starts) > 2 and (_np.diff(starts) != step).any():
+            return None
+        ph, pw = self.patch_shape
+        base = arr[int(offsets[0, 0]):, int(offsets[0, 1]):]
+        return _as_strided(base, (len(starts), ph, pw), (step, sy, sx), writeable=False)
+
+    def scatter_add(self, out, patches, sel=None, weight=None):
+        """
+        Accumulate patches into a 2D array on the object grid (overlap-safe).
+
+        Args:
+            out (ndarray): 2D accumulator on the object grid, updated in place.
+            patches (ndarray): Stack of shape (n, H, W), or a single (H, W) patch
+                added at every selected scan position.
+            sel (array-like, slice or None): Scan indices the patches belong to.
+            weight (ndarray or None): Optional (H, W) factor multiplied into every patch.
+
+        Returns:
+            ndarray: The accumulator `out`.
+        """
+        if sel is None:
+            scans = _np.arange(self.n_scan)
+        else:
+            scans = _np.arange(self.n_scan)[sel]
+        shared = patches.ndim == 2
+        if shared and weight is not None:
+            patches, weight = patches * weight, None
+
+        # one fancy-indexed update per group of non-overlapping scans
+        position = _np.full(self.n_scan, -1, dtype=_np.int64)
+        position[scans] = _np.arange(len(scans))
+        view = self.windows(out)
+        for group in self.groups:
+            members = group[position[group] >= 0]
+            if len(members) == 0:
+                continue
+            if shared:
+                p = patches
+            else:
+                p = patches[np().asarray(position[members])]
+                if weight is not None:
+                    p = p * weight
+            members = np().asarray(members)
+            view[self._ys[members], self._xs[members]] += p
+        return out
+
+    @property
+    def groups(self) -> List[_np.ndarray]:
+        """
+        Partition of the scans into groups of mutually non-overlapping patches.
+
+        Computed once by greedy coloring in scan order and cached. Each group is
+        a host array of scan indices.
+        """
+        if self._groups is None:
+            self._groups = self._color_non_overlapping()
+        return self._groups
+
+    def _color_non_overlapping(self) -> List[_np.ndarray]:
+        ph, pw = self.patch_shape
+        ys, xs = self.offsets[:, 0], self.offsets[:, 1]
+        order = _np.argsort(ys, kind="stable")
+        ys_sorted = ys[order]
+        colors = _np.full(self.n_scan, -1, dtype=_np.int64)
+        for i in range(self.n_scan):
+            # candidates whose rows overlap, then restrict to columns and assigned scans
+            lo = _np.searchsorted(ys_sorted, ys[i] - ph, side="right")
+            hi = _np.searchsorted(ys_sorted, ys[i] + ph, side="left")
+            cand = order[lo:hi]
+            cand = cand[(_np.abs(xs[cand] - xs[i]) < pw) & (colors[cand] >= 0)]
+            used = set(colors[cand].tolist())
+            c = 0
+            while c in used:
+                c += 1
+            colors[i] = c
+        return [_np.flatnonzero(colors == c) for c in range(colors.max() + 1)] if self.n_scan else []
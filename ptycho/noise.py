@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 from ptychoep.backend.backend import np
 from ptychoep.rng.rng_utils import get_rng, normal, poisson
+from .data import ANSCOMBE_OFFSET
 
 
 class Noise(ABC):
@@ -20,6 +21,8 @@ class Noise(ABC):
     """
 
     def __matmul__(self, ptycho):
+        if ptycho.encoding is not None:
+            raise ValueError("Noise must be applied before switching to compact storage.")
         ptycho.noise_stats = self._apply_noise_and_compute_snr(ptycho)
         return ptycho
 
@@ -65,7 +68,7 @@ class GaussianNoise(Noise):
         for d in ptycho._diff_data:
             clean = d.diffraction.copy()
             noise = normal(rng, mean=0.0, var=self.var, size=d.diffraction.shape, dtype=d.diffraction.dtype)
-            d.diffraction = d.diffraction + noise
+            d.diffraction += noise  # in place: the pattern is a view of the Ptycho's stack
             d.gamma_w = 1.0 / self.var
             snr_values.append(self._compute_snr_db(clean, d.diffraction))
 
@@ -102,8 +105,8 @@ class PoissonNoise(Noise):
             intensity = np().abs(clean) ** 2
             expected_counts = intensity * self.scale
             sampled_counts = poisson(rng=rng, lam=expected_counts).astype(np().float32)
-            noisy_intensity = (sampled_counts + 3.0 / 8.0) / self.scale  # Anscombe transform
-            d.diffraction = np().sqrt(noisy_intensity).astype(clean.dtype)
+            noisy_intensity = (sampled_counts + ANSCOMBE_OFFSET) / self.scale  # Anscombe transform
+            d.diffraction[...] = np().sqrt(noisy_intensity)  # in place (view of the Ptycho's stack)
             d.gamma_w = 4.0 * self.scale  # Variance approx for sqrt(Poisson) with Anscombe
             snr_values.append(self._compute_snr_db(clean, d.diffraction))
 
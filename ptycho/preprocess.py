@@ -0,0 +1,327 @@
+from typing import Optional
+from ptychoep.backend.backend import np
+from .core import Ptycho
+from .data import DiffractionData, ANSCOMBE_OFFSET
+
+
+def _center_slices(n: int, m: int):
+    """Slices selecting the central m x m region of an fftshifted n x n array."""
+    start = n // 2 - m // 2
+    return (slice(start, start + m), slice(start, start + m))
+
+
+def crop_spectrum(arr: np().ndarray, size: int) -> np().ndarray:
+    """
+    Keep the central (low-frequency) size x size region of unshifted 2D spectra.
+
+    Arrays use the `fft2` layout (zero frequency at [0, 0]); leading axes are
+    treated as a batch.
+
+    Parameters
+    ----------
+    arr : ndarray
+        Array of shape (..., n, n).
+    size : int
+        Output size m <= n.
+
+    Returns
+    -------
+    ndarray
+        Array of shape (..., m, m), again in unshifted layout.
+    """
+    xp = np()
+    n = arr.shape[-1]
+    if size > n:
+        raise ValueError(f"Cannot crop a {n}x{n} spectrum to {size}x{size}.")
+    shifted = xp.fft.fftshift(arr, axes=(-2, -1))
+    sy, sx = _center_slices(n, size)
+    return xp.fft.ifftshift(shifted[..., sy, sx], axes=(-2, -1))
+
+
+def fourier_resample(arr: np().ndarray, size: int) -> np().ndarray:
+    """
+    Resample a square complex field to size x size by cropping or zero-padding its spectrum.
+
+    With orthonormal FFTs, the field energy in the retained band is preserved,
+    so a probe resampled by a factor f = n / size produces diffraction amplitudes
+    that match the centrally cropped measured patterns (see `crop_detector`).
+
+    Parameters
+    ----------
+    arr : ndarray
+        Complex array of shape (n, n).
+    size : int
+        Output size.
+
+    Returns
+    -------
+    ndarray
+        Resampled array of shape (size, size).
+    """
+    xp = np()
+    n = arr.shape[-1]
+    spec = xp.fft.fftshift(xp.fft.fft2(arr, norm="ortho"))
+    if size <= n:
+        sy, sx = _center_slices(n, size)
+        spec = spec[sy, sx]
+    else:
+        padded = xp.zeros((size, size), dtype=spec.dtype)
+        sy, sx = _center_slices(size, n)
+        padded[sy, sx] = spec
+        spec = padded
+    return xp.fft.ifft2(xp.fft.ifftshift(spec), norm="ortho").astype(arr.dtype, copy=False)
+
+
+def crop_detector(ptycho: Ptycho, size: int) -> Ptycho:
+    """
+    Build a reduced-resolution Ptycho by keeping the central size x size detector region.
+
+    Cropping the diffraction patterns by a factor f = prb_len / size is
+    equivalent to a real-space pixel f times larger. The returned Ptycho
+    therefore has
+
+    - diffraction amplitudes cropped to their central size x size frequencies,
+    - the probe resampled to size x size (`fourier_resample`),
+    - scan positions divided by f (rounded to the nearest coarse pixel and
+      kept inside the object grid),
+    - an object grid of obj_len // f pixels (the object, if set, is block-averaged),
+    - `pixel_size` multiplied by f (if set).
+
+    Cropping only selects pixels, so the storage encoding (`Ptycho.compact_storage`)
+    and the noise statistics are kept.
+
+    Coarse pixel j covers fine pixels [f * j, f * (j + 1)), so an estimate can be
+    brought back to the fine grid by repetition (see utils.multiresolution).
+
+    Parameters
+    ----------
+    ptycho : Ptycho
+        Full-resolution Ptycho with probe, object size and diffraction data set.
+    size : int
+        Cropped detector size; prb_len must be an integer multiple of it.
+
+    Returns
+    -------
+    Ptycho
+        New Ptycho instance (the input is not modified).
+    """
+    xp = np()
+    n = ptycho.prb_len
+    if n is None or ptycho.obj_len is None:
+        raise ValueError("Ptycho must have probe and object size set before cropping.")
+    if size <= 0 or n % size:
+        raise ValueError(f"Detector size {n} is not an integer multiple of {size}.")
+    factor = n // size
+    obj_len = ptycho.obj_len // factor
+
+    low = Ptycho()
+    if ptycho.obj is not None:
+        obj = xp.asarray(ptycho.obj)[:obj_len * factor, :obj_len * factor]
+        low.set_object(obj.reshape(obj_len, factor, obj_len, factor).mean(axis=(1, 3)))
+    else:
+        low.set_object(xp.zeros((obj_len, obj_len), dtype=xp.complex64))
+    low.set_probe(fourier_resample(xp.asarray(ptycho.prb), size))
+    low.pixel_size = None if ptycho.pixel_size is None else ptycho.pixel_size * factor
+
+    half = size // 2
+    for d in ptycho._diff_data:
+        y, x = (min(max(int(round(p / factor)), half), obj_len - (size - half)) for p in d.position)
+        low.add_diffraction_data(DiffractionData(
+            position=(y, x),
+            diffraction=crop_spectrum(d.diffraction, size),
+            meta=dict(d.meta),
+            indices=(slice(y - half, y - half + size), slice(x - half, x - half + size)),
+            gamma_w=d.gamma_w,
+            encoding=d.encoding,
+            count_scale=d.count_scale,
+        ))
+    if getattr(ptycho, "noise_stats", None) is not None:
+        low.noise_stats = ptycho.noise_stats
+    return low
+
+
+def bin_spectrum(arr: np().ndarray, factor: int) -> np().ndarray:
+    """
+    Sum unshifted 2D spectra (e.g. intensities) over factor x factor pixel bins.
+
+    Bins are laid out so that the zero-frequency bin covers frequencies
+    [-factor // 2, factor - factor // 2) (the FFT convention, one bin wide),
+    and the result is again in unshifted `fft2` layout.
+
+    Parameters
+    ----------
+    arr : ndarray
+        Array of shape (..., n, n).
+    factor : int
+        Bin size; n / factor must be an even integer.
+
+    Returns
+    -------
+    ndarray
+        Array of shape (..., n / factor, n / factor).
+    """
+    xp = np()
+    n = arr.shape[-1]
+    if factor <= 0 or n % factor or (n // factor) % 2:
+        raise ValueError(f"Cannot bin a {n}x{n} spectrum by {factor} into an even size.")
+    m = n // factor
+    shifted = xp.roll(xp.fft.fftshift(arr, axes=(-2, -1)), factor // 2, axis=(-2, -1))
+    binned = shifted.reshape(arr.shape[:-2] + (m, factor, m, factor)).sum(axis=(-3, -1))
+    return xp.fft.ifftshift(binned, axes=(-2, -1))
+
+
+def bin_detector(ptycho: Ptycho, factor: int, chunk_size: int = 256) -> Ptycho:
+    """
+    Build a Ptycho with the detector pixels binned factor x factor.
+
+    Binning sums the intensities of neighbouring detector pixels, which is
+    equivalent to a real-space field of view f = factor times smaller at the
+    same pixel size. The returned Ptycho therefore has
+
+    - diffraction amplitudes sqrt(sum of the binned intensities) (`bin_spectrum`),
+    - the probe cropped to its central prb_len / f pixels,
+    - the same object grid, scan positions and `pixel_size`, with patch
+      indices of the new size centred where the old ones were.
+
+    With orthonormal FFTs no rescaling is needed: the binned patterns
+    approximate the diffraction of the exit wave restricted to the smaller
+    window. The probe must be contained in the central prb_len / f pixels,
+    and since binning also damps the long-range part of the exit-wave
+    autocorrelation, the model error grows with the probe diameter relative
+    to that window (about 15% at 20%, 30% at 40% of it). gamma_w is kept,
+    since the amplitude of summed Poisson counts has the same variance.
+
+    Binning works on photon counts where they are known, so that the Anscombe
+    offset of a = sqrt((c + 3/8) / scale) enters each binned pixel once:
+
+    - "counts" storage: the stored counts are summed and kept as counts,
+    - Poisson data (`noise_stats`): counts a^2 * scale - 3/8 are summed and
+      re-encoded as sqrt((sum + 3/8) / scale),
+    - otherwise the intensities a^2 are summed.
+
+    The storage encoding and the noise statistics of the input are kept.
+
+    Parameters
+    ----------
+    ptycho : Ptycho
+        Ptycho with probe, object size and diffraction data set.
+    factor : int
+        Bin size; prb_len / factor must be an even integer.
+    chunk_size : int
+        Number of patterns binned at a time (bounds the temporary memory).
+
+    Returns
+    -------
+    Ptycho
+        New Ptycho instance (the input is not modified).
+    """
+    xp = np()
+    n = ptycho.prb_len
+    if n is None or ptycho.obj_len is None:
+        raise ValueError("Ptycho must have probe and object size set before binning.")
+    if factor <= 0 or n % factor or (n // factor) % 2:
+        raise ValueError(f"Detector size {n} cannot be binned by {factor} into an even size.")
+    size = n // factor
+
+    binned = ptycho._like()
+    sy, sx = _center_slices(n, size)
+    binned.set_probe(xp.asarray(ptycho.prb)[sy, sx].copy())
+
+    records = ptycho._diff_data
+    if not records:
+        return binned
+    chunks = [slice(a, min(a + chunk_size, len(records))) for a in range(0, len(records), chunk_size)]
+    stats = getattr(ptycho, "noise_stats", None) or {}
+    scale = stats["scale"] if stats.get("type") == "Poisson" else None
+
+    if ptycho.encoding == "counts":
+        peak = max(float(xp.max(ptycho.take_diffraction(sel))) for sel in chunks)
+        dtype = xp.uint16 if peak * factor ** 2 < 65535 else xp.uint32
+    else:
+        dtype = xp.float16 if ptycho.encoding == "float16" else ptycho.take_amplitude(chunks[0]).dtype
+    stack = xp.empty((len(records), size, size), dtype=dtype)
+    for sel in chunks:
+        if ptycho.encoding == "counts":
+            stack[sel] = bin_spectrum(ptycho.take_diffraction(sel).astype(xp.int64), factor)
+            continue
+        amp = ptycho.take_amplitude(sel).astype(xp.float64)
+        if scale is None:
+            stack[sel] = xp.sqrt(bin_spectrum(amp * amp, factor))
+        else:
+            counts = bin_spectrum(amp * amp * scale - ANSCOMBE_OFFSET, factor)
+            stack[sel] = xp.sqrt(xp.maximum(counts + ANSCOMBE_OFFSET, 0) / scale)
+
+    shift = n // 2 - size // 2
+    new = []
+    for i, d in enumerate(records):
+        indices = None
+        if d.indices is not None:
+            iy, ix = d.indices
+            indices = (slice(iy.start + shift, iy.start + shift + size),
+                       slice(ix.start + shift, ix.start + shift + size))
+        new.append(DiffractionData(position=d.position, diffraction=stack[i], meta=dict(d.meta),
+                                   indices=indices, gamma_w=d.gamma_w,
+                                   encoding=ptycho.encoding, count_scale=ptycho.count_scale))
+    binned._append(new, stack=stack)
+    return binned
+
+
+def reduce_detector(ptycho: Ptycho, size: Optional[int] = None, binning: int = 1) -> Ptycho:
+    """
+    Detector-reduction stage: central crop (`crop_detector`), then binning (`bin_detector`).
+
+    Cropping to `size` trades resolution for a coarser real-space grid;
+    binning trades field of view for fewer detector pixels at the same grid.
+    The final patterns are size / binning pixels wide, and the returned
+    Ptycho can be passed to any engine.
+
+    Parameters
+    ----------
+    ptycho : Ptycho
+        Full-resolution Ptycho with probe, object size and diffraction data set.
+    size : int or None
+        Cropped detector size (None: no cropping).
+    binning : int
+        Bin size applied after cropping (1: no binning).
+
+    Returns
+    -------
+    Ptycho
+        New Ptycho instance (the input is not modified).
+    """
+    reduced = ptycho
+    if size is not None and size != ptycho.prb_len:
+        reduced = crop_detector(reduced, size)
+    if binning != 1:
+        reduced = bin_detector(reduced, binning)
+    if reduced is ptycho:
+        reduced = ptycho.subset(slice(None))
+    return reduced
+
+
+def upsample_object(obj: np().ndarray, factor: int, obj_len: Optional[int] = None) -> np().ndarray:
+    """
+    Bring a coarse object estimate back to a grid `factor` times finer by pixel repetition.
+
+    Parameters
+    ----------
+    obj : ndarray
+        Coarse object of shape (L, L).
+    factor : int
+        Integer upsampling factor.
+    obj_len : int or None
+        Size of the fine grid; the repeated image is edge-padded (or cut) to it.
+
+    Returns
+    -------
+    ndarray
+        Object of shape (obj_len, obj_len) (or (L * factor, L * factor)).
+    """
+    xp = np()
+    fine = xp.repeat(xp.repeat(obj, factor, axis=0), factor, axis=1)
+    if obj_len is None or obj_len == fine.shape[0]:
+        return fine
+    if obj_len < fine.shape[0]:
+        return fine[:obj_len, :obj_len]
+    pad = obj_len - fine.shape[0]
+    return xp.pad(fine, ((0, pad), (0, pad)), mode="edge")
@@ -1,4 +1,6 @@
-from ptychoep.backend.backend import np
+import inspect
+import numpy as _np
+from ptychoep.backend.backend import np, is_cupy
 
 def Fourier_projector(exit_wave, target_amp, eps: float = 1e-7, return_per_scan: bool = False):
     """
@@ -38,3 +40,167 @@ def Fourier_projector(exit_wave, target_amp, eps: float = 1e-7, return_per_scan:
     proj_wave = ifft2(projected_freq, norm="ortho")
 
     return proj_wave, (error if return_per_scan else float(error))
+
+
+# NumPy >= 2.0 lets the FFT write into a preallocated output.
+_NUMPY_FFT_OUT = "out" in inspect.signature(_np.fft.fft2).parameters
+_cupy_amplitude_kernel = None
+
+
+def _get_cupy_amplitude_kernel():
+    """Fused |F|, squared amplitude error and amplitude replacement (F <- y * F / (|F| + eps))."""
+    global _cupy_amplitude_kernel
+    if _cupy_amplitude_kernel is None:
+        import cupy
+        _cupy_amplitude_kernel = cupy.ElementwiseKernel(
+            "T f, R y, R eps", "T g, R e",
+            "R a = abs(f); R d = y - a; e = d * d; g = f * (y / (a + eps));",
+            "ptychoep_fourier_amplitude")
+    return _cupy_amplitude_kernel
+
+
+class FourierProjector:
+    """
+    Fourier-magnitude projector with reusable workspaces.
+
+    Functionally equivalent to `Fourier_projector`, but the frequency-domain
+    buffer, the amplitude buffers and the output wave are allocated once and
+    reused on every call. The amplitude replacement and the error are computed
+    in a single pass over the spectrum (one fused kernel on CuPy, a fixed
+    sequence of in-place ufuncs on NumPy), and the FFTs write into the
+    workspaces where the backend supports it.
+
+    Workspaces are sized by the first call, or by `shape` at construction.
+    Later calls with a smaller batch of the same (H, W) reuse leading views
+    of the same buffers; a larger batch or a new dtype reallocates them.
+
+    Note:
+        Unless `out` is given, the returned wave is a workspace that is
+        overwritten by the next call on the same projector.
+
+    Args:
+        shape (tuple or None): Optional (H, W) or (N, H, W) shape to preallocate for.
+        dtype: Complex dtype of the workspaces (default: complex64).
+        eps (float): Small positive number to avoid division by zero.
+    """
+
+    def __init__(self, shape=None, dtype=None, eps: float = 1e-7):
+        self.xp = np()
+        self.eps = eps
+        self._ws = None
+        if shape is not None:
+            self._workspace(tuple(shape), dtype if dtype is not None else self.xp.complex64)
+
+    def __call__(self, exit_wave, target_amp, out=None, return_per_scan: bool = False):
+        return self.project(exit_wave, target_amp, out=out, return_per_scan=return_per_scan)
+
+    # --- public API ---
+    def project(self, exit_wave, target_amp, out=None, return_per_scan: bool = False):
+        """
+        Replace the Fourier amplitude of `exit_wave` by `target_amp`.
+
+        Args:
+            exit_wave (ndarray): Exit wave(s), shape (H, W) or (N, H, W).
+            target_amp (ndarray): Measured amplitude, same shape as `exit_wave`.
+            out (ndarray or None): Optional output buffer for the projected wave.
+            return_per_scan (bool): If True, return per-scan errors for batched input.
+
+        Returns:
+            proj_wave (ndarray): Projected exit wave.
+            error (float or ndarray): Mean squared amplitude error, as in `Fourier_projector`.
+        """
+        freq, amp, diff, wave = self._workspace(exit_wave.shape, exit_wave.dtype)
+        freq = self._fft2(exit_wave, freq)
+        error = self._replace_amplitude(freq, target_amp, amp, diff, return_per_scan)
+        proj = self._ifft2(freq, wave if out is None else out)
+        return proj, error
+
+    def residual(self, exit_wave, target_amp, out=None, return_per_scan: bool = False):
+        """
+        Return the projection residual `P(exit_wave) - exit_wave` and the error.
+
+        This is the quantity consumed by the PIE-type object/probe updates, and
+        it is computed without allocating the projected wave separately.
+        """
+        proj, error = self.project(exit_wave, target_amp, out=out, return_per_scan=return_per_scan)
+        proj -= exit_wave
+        return proj, error
+
+    def error(self, exit_wave, target_amp, return_per_scan: bool = False):
+        """
+        Compute only the amplitude error of `exit_wave` (one forward FFT, no projection).
+        """
+        freq, amp, diff, _ = self._workspace(exit_wave.shape, exit_wave.dtype)
+        freq = self._fft2(exit_wave, freq)
+        self.xp.abs(freq, out=amp)
+        self.xp.subtract(target_amp, amp, out=diff)
+        return self._reduce(diff, return_per_scan, squared=False)
+
+    # --- internals ---
+    def _workspace(self, shape, dtype):
+        xp = self.xp
+        cdtype = _np.result_type(dtype, _np.complex64)
+        ws = self._ws
+        if ws is None or ws[0].dtype != cdtype or not _fits(ws[0].shape, shape):
+            rdtype = _np.finfo(cdtype).dtype
+            ws = (xp.empty(shape, dtype=cdtype), xp.empty(shape, dtype=rdtype),
+                  xp.empty(shape, dtype=rdtype), xp.empty(shape, dtype=cdtype))
+            self._ws = ws
+        if ws[0].shape == tuple(shape):
+            return ws
+        return tuple(w[:shape[0]] for w in ws)
+
+    def _fft2(self, a, out):
+        if not is_cupy() and _NUMPY_FFT_OUT:
+            return self.xp.fft.fft2(a, norm="ortho", out=out)
+        return self.xp.fft.fft2(a, norm="ortho")
+
+    def _ifft2(self, a, out):
+        """Inverse FFT into `out`; `a` (a workspace) is clobbered."""
+        if not is_cupy() and _NUMPY_FFT_OUT:
+            # ifft2 ignores `out` for inverse transforms; use ifft(a) = conj(fft(conj(a))) (ortho)
+            xp = self.xp
+            xp.conjugate(a, out=a)
+            xp.fft.fft2(a, norm="ortho", out=out)
+            return xp.conjugate(out, out=out)
+        out[...] = self.xp.fft.ifft2(a, norm="ortho")
+        return out
+
+    def _replace_amplitude(self, freq, target_amp, amp, diff, return_per_scan):
+        """Scale `freq` in place to the target amplitude and return the amplitude error."""
+        xp = self.xp
+        if is_cupy():
+            rdtype = amp.dtype.type
+            _get_cupy_amplitude_kernel()(freq, target_amp.astype(amp.dtype, copy=False),
+                                         rdtype(self.eps), freq, diff)
+            return self._reduce(diff, return_per_scan, squared=True)
+
+        xp.abs(freq, out=amp)
+        xp.subtract(target_amp, amp, out=diff)
+        error = self._reduce(diff, return_per_scan, squared=False)
+        amp += self.eps
+        xp.divide(target_amp, amp, out=amp)
+        freq *= amp
+        return error
+
+    def _reduce(self, diff, return_per_scan, squared):
+        """Mean of diff**2 (or of diff if already squared), globally or per scan."""
+        xp = self.xp
+        if return_per_scan and diff.ndim == 3:
+            flat = diff.reshape(len(diff), -1)
+            if squared:
+                return flat.mean(axis=1)
+            return xp.einsum("ij,ij->i", flat, flat) / flat.shape[1]
+        if squared:
+            return float(xp.mean(diff))
+        flat = diff.reshape(-1)
+        return float(xp.dot(flat, flat)) / flat.size
+
+
+def _fits(ws_shape, shape):
+    """True if a workspace of `ws_shape` can serve a request of `shape` via a leading view."""
+    if len(ws_shape) != len(shape):
+        return False
+    if len(shape) == 2:
+        return tuple(ws_shape) == tuple(shape)
+    return ws_shape[1:] == tuple(shape[1:]) and ws_shape[0] >= shape[0]
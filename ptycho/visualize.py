@@ -1,5 +1,5 @@
 import matplotlib.pyplot as plt
-from ptychoep.backend.backend import np
+from ptychoep.backend.backend import np, is_cupy
 import numpy as _np
 
 def to_numpy(arr):
@@ -12,9 +12,10 @@ def to_numpy(arr):
     Returns:
         Converted NumPy array or original input
     """
-    import cupy
-    if isinstance(arr, cupy.ndarray):
-        return cupy.asnumpy(arr)
+    if is_cupy():
+        import cupy
+        if isinstance(arr, cupy.ndarray):
+            return cupy.asnumpy(arr)
     return arr
 
 
@@ -36,9 +37,7 @@ def compute_illumination(ptycho):
     prb_sq = np().abs(ptycho.prb) ** 2
     scan_img = np().zeros((ptycho.obj_len, ptycho.obj_len), dtype=float)
 
-    for d in ptycho._diff_data:
-        Y, X = d.indices
-        np().add.at(scan_img, (Y, X), prb_sq)
+    ptycho.geometry.scatter_add(scan_img, prb_sq)
 
     sampling_number = np().sum(scan_img > 0.1 * np().max(scan_img))
     alpha = (ptycho.prb_len ** 2 * len(ptycho.scan_pos)) / sampling_number
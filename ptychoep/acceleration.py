@@ -0,0 +1,240 @@
+from __future__ import annotations
+from collections import deque
+import numpy as _np
+from ptychoep.backend.backend import np
+
+
+class BeliefAccelerator:
+    """
+    Base class for sweep-level extrapolation of the EP object belief.
+
+    One EP sweep is treated as a fixed-point map x -> G(x) on the belief mean
+    x of the object. After each sweep, subclasses propose an extrapolated
+    point x_{k+1} from the history of G(x_k) (see `_extrapolate`).
+
+    The extrapolation is written into the AccumulativeUncertainArray as a
+    correction term `precision * (x_{k+1} - G(x_k))` added to the numerator.
+    The correction is tracked separately and removed before the next step,
+    so the EP messages themselves are never modified and the plain EP state
+    can always be recovered.
+
+    Safeguards (each clears the history and keeps the plain EP update for
+    that sweep, i.e. the extrapolated step is dropped and restarted):
+
+    - the fixed-point residual ||G(x_k) - x_k|| of the sweep just completed
+      is larger than that of the previous sweep, which flags a bad
+      extrapolation one sweep before it shows up in the fitness,
+    - the sweep fitness (mean Likelihood error) increases by more than a
+      relative `tolerance` over the previous sweep.
+
+    Attributes
+    ----------
+    tolerance : float
+        Relative fitness increase tolerated before falling back to the plain update.
+    start : int
+        Number of initial sweeps left unaccelerated.
+    n_restarts : int
+        Number of safeguard fallbacks so far.
+    """
+
+    def __init__(self, tolerance: float = 0.0, start: int = 0):
+        self.tolerance = tolerance
+        self.start = start
+        self.belief = None
+        self.reset()
+
+    def attach(self, obj_node) -> None:
+        """Bind the accelerator to the belief of an Object node."""
+        self.belief = obj_node.belief
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear the history (the current correction, if any, stays in the belief)."""
+        self._reset_history()
+        self._prev_fitness = None
+        self._prev_residual = None
+        self._x_in = None         # point the current sweep started from
+        self._correction = None
+        self._sweep = 0
+        self.n_restarts = 0
+
+    def step(self, fitness: float) -> None:
+        """
+        Apply one acceleration step. Call once per sweep, after all object messages were updated.
+
+        Parameters
+        ----------
+        fitness : float
+            Fitness of the sweep just completed (lower is better).
+        """
+        if self.belief is None:
+            raise RuntimeError(f"{type(self).__name__}.step: call attach(obj_node) first")
+        self._sweep += 1
+        if self._sweep <= self.start:
+            return
+        numerator = self.belief._numerator
+        precision = self.belief._precision
+
+        # plain EP output G(x_k)
+        if self._correction is not None:
+            numerator -= self._correction
+            self._correction = None
+        g = numerator / precision
+
+        residual = None
+        if self._x_in is not None:
+            residual = float(np().linalg.norm(g - self._x_in))
+        worse = ((self._prev_fitness is not None
+                  and fitness > self._prev_fitness * (1.0 + self.tolerance))
+                 or (residual is not None and self._prev_residual is not None
+                     and residual > self._prev_residual))
+        self._prev_fitness = fitness
+        self._prev_residual = residual
+
+        x_new = None
+        if worse:
+            self.n_restarts += 1
+            self._reset_history()
+        else:
+            x_new = self._extrapolate(g)
+        if x_new is not None:
+            self._correction = precision * (x_new - g)
+            numerator += self._correction
+        self._x_in = g if x_new is None else x_new
+
+    def _reset_history(self) -> None:
+        raise NotImplementedError
+
+    def _extrapolate(self, g):
+        """Record G(x_k) and return the next point x_{k+1}, or None for the plain update."""
+        raise NotImplementedError
+
+
+class MomentumAccelerator(BeliefAccelerator):
+    """
+    Extrapolation along the last sweep's displacement:
+
+        x_{k+1} = G(x_k) + eta * (G(x_k) - G(x_{k-1}))
+
+    Cheap (two object-sized arrays of history) and effective in the regime
+    where EP converges linearly along a stable direction. The step is only
+    taken while consecutive displacements point the same way
+    (Re<d_k, d_{k-1}> > 0); once the iterates oscillate, e.g. around a noisy
+    fixed point, the plain update is kept. The defaults are conservative:
+    early sweeps move far and are left unaccelerated.
+    """
+
+    def __init__(self, eta: float = 0.2, tolerance: float = 0.0, start: int = 3):
+        """
+        Parameters
+        ----------
+        eta : float
+            Extrapolation factor in (0, 1).
+        tolerance : float
+            Relative fitness increase tolerated before falling back to the plain update.
+        start : int
+            Number of initial sweeps left unaccelerated.
+        """
+        if not 0.0 < eta < 1.0:
+            raise ValueError("eta must be in (0, 1).")
+        self.eta = eta
+        super().__init__(tolerance=tolerance, start=start)
+
+    def _reset_history(self) -> None:
+        self._g_prev = None
+        self._d_prev = None
+
+    def _extrapolate(self, g):
+        g_prev, self._g_prev = self._g_prev, g
+        if g_prev is None:
+            return None
+        d = g - g_prev
+        d_prev, self._d_prev = self._d_prev, d
+        if d_prev is None or float(np().vdot(d_prev, d).real) <= 0.0:
+            return None
+        return g + self.eta * d
+
+
+class AndersonAccelerator(BeliefAccelerator):
+    """
+    Anderson acceleration (type II) of the belief mean.
+
+    Keeps the last `depth` differences of the map outputs G(x_k) and residuals
+    f_k = G(x_k) - x_k, solves
+
+        gamma = argmin || f_k - dF gamma ||^2     (real coefficients)
+
+    and moves to
+
+        x_{k+1} = G(x_k) - dG gamma - (1 - mixing) (f_k - dF gamma).
+
+    Only the belief mean enters the history; the (damped) likelihood messages
+    are hidden state of the map, so Anderson mixing is most useful late in a
+    run, once the messages change slowly (see `start`).
+    """
+
+    def __init__(self, depth: int = 5, mixing: float = 0.5, regularization: float = 1e-8,
+                 tolerance: float = 0.0, start: int = 10):
+        """
+        Parameters
+        ----------
+        depth : int
+            Number of stored differences (Anderson memory m).
+        mixing : float
+            Anderson mixing parameter in (0, 1] (1 = undamped extrapolation).
+        regularization : float
+            Tikhonov regularization of the least-squares problem, relative to its scale.
+        tolerance : float
+            Relative fitness increase tolerated before falling back to the plain update.
+        start : int
+            Number of initial sweeps left unaccelerated.
+        """
+        if depth < 1:
+            raise ValueError("depth must be a positive integer.")
+        if not 0.0 < mixing <= 1.0:
+            raise ValueError("mixing must be in (0, 1].")
+        self.depth = depth
+        self.mixing = mixing
+        self.regularization = regularization
+        super().__init__(tolerance=tolerance, start=start)
+
+    def _reset_history(self) -> None:
+        self._dG = deque(maxlen=self.depth)
+        self._dF = deque(maxlen=self.depth)
+        self._x = None          # input point of the current sweep
+        self._prev = None       # (G, f) of the previous sweep
+
+    def _extrapolate(self, g):
+        if self._x is None:
+            self._x = g
+            return None
+        f = g - self._x
+        if self._prev is not None:
+            g_prev, f_prev = self._prev
+            self._dG.append(g - g_prev)
+            self._dF.append(f - f_prev)
+        self._prev = (g, f)
+        if not self._dF:
+            self._x = g
+            return None
+
+        gamma = self._solve(f)
+        x_new = g - (1.0 - self.mixing) * f
+        for c, dg, df in zip(gamma, self._dG, self._dF):
+            x_new -= c * dg
+            x_new += ((1.0 - self.mixing) * c) * df
+        self._x = x_new
+        return x_new
+
+    def _solve(self, f):
+        """Real least-squares coefficients gamma minimizing ||f - sum_i gamma_i dF_i||."""
+        xp = np()
+        m = len(self._dF)
+        gram = _np.empty((m, m))
+        rhs = _np.empty(m)
+        for i, dfi in enumerate(self._dF):
+            rhs[i] = float(xp.vdot(dfi, f).real)
+            for j in range(i, m):
+                gram[i, j] = gram[j, i] = float(xp.vdot(dfi, self._dF[j]).real)
+        reg = self.regularization * max(_np.trace(gram) / m, 1e-30)
+        return _np.linalg.solve(gram + reg * _np.eye(m), rhs)
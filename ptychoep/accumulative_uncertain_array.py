@@ -6,6 +6,9 @@ class AccumulativeUncertainArray:
     """
     A class that represents a Gaussian posterior in a product form.
     Internally maintains mean × precision and precision separately.
+
+    Regions are addressed either by a (slice, slice) pair or by a 1D integer
+    array of flat (raveled) indices, in which case the UAs exchanged are 1D.
     """
 
     def __init__(self, shape, dtype=np().complex64):
@@ -14,6 +17,10 @@ class AccumulativeUncertainArray:
         self._numerator = np().zeros(shape, dtype=dtype)  # mean * precision
         self._precision = np().ones(shape, dtype=np().float32)
 
+    @staticmethod
+    def _is_flat(indices) -> bool:
+        return hasattr(indices, "ndim") and indices.ndim == 1
+
     def _normalize_indices(self, indices):
         """
         Normalize indexing input.
@@ -30,16 +37,34 @@ class AccumulativeUncertainArray:
 
     def add(self, ua: UncertainArray, indices: tuple[slice, slice] = None):
         """Add a UA to the accumulator at specified region."""
+        if self._is_flat(indices):
+            self._numerator.reshape(-1)[indices] += ua.weighted_mean
+            self._precision.reshape(-1)[indices] += ua.precision
+            return
         sl_y, sl_x = self._normalize_indices(indices)
-        self._numerator[sl_y, sl_x] += ua.mean * ua.precision
+        self._numerator[sl_y, sl_x] += ua.weighted_mean
         self._precision[sl_y, sl_x] += ua.precision
     
     def subtract(self, ua: UncertainArray, indices: tuple[slice, slice] = None):
         """Subtract a UA from the accumulator at specified region."""
+        if self._is_flat(indices):
+            self._numerator.reshape(-1)[indices] -= ua.weighted_mean
+            self._precision.reshape(-1)[indices] -= ua.precision
+            return
         sl_y, sl_x = self._normalize_indices(indices)
-        self._numerator[sl_y, sl_x] -= ua.mean * ua.precision
+        self._numerator[sl_y, sl_x] -= ua.weighted_mean
         self._precision[sl_y, sl_x] -= ua.precision
 
+    def exchange(self, old: UncertainArray, new: UncertainArray, indices):
+        """
+        Replace the contribution `old` by `new` at the given flat indices.
+
+        Equivalent to subtract(old) followed by add(new), with a single
+        scatter of the (compact) difference.
+        """
+        self._numerator.reshape(-1)[indices] += new.weighted_mean - old.weighted_mean
+        self._precision.reshape(-1)[indices] += new.precision - old.precision
+
     def get_mean(self, indices: tuple[slice, slice] = None) -> np().ndarray:
         """Return the mean of the accumulated belief at specified region."""
         sl_y, sl_x = self._normalize_indices(indices)
@@ -50,15 +75,32 @@ class AccumulativeUncertainArray:
         sl_y, sl_x = self._normalize_indices(indices)
         return self._precision[sl_y, sl_x]
 
-    def get_ua(self, indices: tuple[slice, slice] = None) -> UncertainArray:
-        """Return an UncertainArray representing the belief at specified region."""
+    def get_ua(self, indices: tuple[slice, slice] = None, natural: bool = False) -> UncertainArray:
+        """
+        Return an UncertainArray representing the belief at specified region.
+
+        If natural is True, the UA is returned in natural-parameter form
+        (a snapshot of mean * precision and precision) and its mean is computed lazily.
+        """
+        if self._is_flat(indices):
+            numerator = self._numerator.reshape(-1).take(indices)
+            precision = self._precision.reshape(-1).take(indices)
+            if natural:
+                return UncertainArray.from_natural(numerator, precision, dtype=self.dtype)
+            return UncertainArray(mean=numerator / precision, precision=precision, dtype=self.dtype)
         sl_y, sl_x = self._normalize_indices(indices)
+        if natural:
+            return UncertainArray.from_natural(
+                self._numerator[sl_y, sl_x].copy(), self._precision[sl_y, sl_x].copy(), dtype=self.dtype
+            )
         mean = self._numerator[sl_y, sl_x] / self._precision[sl_y, sl_x]
         precision = self._precision[sl_y, sl_x]
         return UncertainArray(mean=mean, precision=precision, dtype=self.dtype)
 
-    def to_ua(self) -> UncertainArray:
-        """Return the full accumulated belief as a single UncertainArray."""
+    def to_ua(self, natural: bool = False) -> UncertainArray:
+        """Return the full accumulated belief as a single UncertainArray (see get_ua)."""
+        if natural:
+            return self.get_ua(natural=True)
         mean = self._numerator / self._precision
         return UncertainArray(mean=mean, precision=self._precision, dtype=self.dtype)
 
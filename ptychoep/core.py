@@ -3,6 +3,8 @@ from ptychoep.rng.rng_utils import get_rng
 from ptychoep.ptycho.data import DiffractionData
 from .object import Object
 from .uncertain_array import UncertainArray as UA
+from .damping import DampingController
+from ptychoep.utils.run_control import RunMonitor, copy_result
 
 class PtychoEP:
     """
@@ -11,61 +13,157 @@ class PtychoEP:
 
     def __init__(self, ptycho, damping=0.7, seed: int | None = None,
                  obj_init=None, prb_init=None, prior_name="gaussian",
-                 callback=None, n_probe_update : int = 0, **prior_kwargs):
+                 callback=None, n_probe_update : int = 0, probe_update_interval: int = 1,
+                 probe_update_options: dict | None = None, acceleration=None,
+                 warm_start: str | None = None, warm_start_iter: int = 30,
+                 warm_start_target: float | None = None, compact_roi: bool = False,
+                 support_threshold: float | None = None, **prior_kwargs):
         """
         Parameters
         ----------
         ptycho : Ptycho
             Ptycho object holding object/probe/diffraction geometry.
-        damping : float
-            Damping coefficient used in Likelihood backward pass.
+        damping : float or DampingController
+            Damping coefficient used in Likelihood backward pass. If a
+            DampingController is given, the damping is adapted after every
+            sweep from the per-scan Likelihood errors.
         obj_init : np.ndarray or None
             Optional object initialization.
         prb_init : np.ndarray or None
             Optional probe initialization.
         prior_name : str
             Name of prior to use ("gaussian" implies no prior).
+        **prior_kwargs
+            Prior parameters, e.g. ``sparsity``, and the prior update region
+            and schedule (``prior_region``, ``prior_tile``, ``prior_threads``,
+            ``prior_interval``, ``prior_start_error``; see BasePrior).
         callback : callable or None
             Function to call after each iteration: callback(iter, error, object_est).
+        n_probe_update : int
+            Number of EM steps per probe update (0: the probe is fixed).
+        probe_update_interval : int
+            Update the probe only every this many EP iterations.
+        probe_update_options : dict or None
+            Keyword arguments of ProbeUpdater, e.g. ``dict(subsample=0.25)``
+            for stochastic (subsampled) probe updates.
+        acceleration : BeliefAccelerator or None
+            Optional sweep-level extrapolation of the object belief
+            (MomentumAccelerator or AndersonAccelerator, see acceleration.py).
+        warm_start : str or None
+            If "dm" (DifferenceMap) or "pie" (mini-batch rPIE), run a few
+            iterations of that engine first and seed the object messages with
+            its result. With probe updates (n_probe_update > 0) the probe is
+            seeded as well. `obj_init` / `prb_init` initialize the engine.
+            With a fixed probe, EP refines the warm-start estimate. With
+            probe updates, the first EM probe/noise-precision updates re-fit
+            the seeded messages and the error typically spikes for a few
+            sweeps before EP settles; run at least ~10 sweeps, and prefer
+            "pie" (a "dm" warm start may not be recovered within that budget).
+            Where blind EP itself fails (the probe shrinking to zero, e.g.
+            sparse scans of a small probe), a warm start does not prevent it.
+        warm_start_iter : int
+            Maximum number of warm-start iterations (hand-off point).
+        warm_start_target : float or None
+            Hand off to EP earlier once the warm-start engine's error reaches this value.
+        compact_roi : bool
+            If True, the object node covers only the scanned region
+            (`Ptycho.compacted`), so the belief, the prior and the callback
+            work on the compact grid. `run` maps the estimate back to the full
+            grid, with mean 0 and precision 1 (the empty belief) outside.
+        support_threshold : float or None
+            If set, real-space messages are restricted to the probe support
+            |P| > support_threshold * max|P| (see Object / Probe); the FFTs
+            still run on full patches. Requires a fixed probe (n_probe_update=0).
         """
         self.xp = np()
+        if support_threshold is not None and n_probe_update > 0:
+            raise ValueError("support_threshold requires a fixed probe (n_probe_update=0).")
+        if compact_roi:
+            ptycho = ptycho.compacted()
+            obj_init = ptycho.crop(obj_init)
         self.ptycho = ptycho
-        self.damping = damping
+        self.damping_controller = damping if isinstance(damping, DampingController) else None
+        self.damping = damping.initial if self.damping_controller else damping
         self.callback = callback
 
         rng = get_rng(seed)
 
+        # --- Optional warm start from a classic engine ---
+        self.warm_start_engine = None
+        if warm_start is not None:
+            obj_init, prb_init = self._warm_start(warm_start, warm_start_iter, warm_start_target,
+                                                  obj_init, prb_init, seed, n_probe_update > 0)
+
         # --- Initialize object node ---
         self.obj_node = Object(
             shape=(ptycho.obj_len, ptycho.obj_len),
             rng=rng,
             initial_probe = prb_init if prb_init is not None else ptycho.prb,
-            initial_object = obj_init
+            initial_object = obj_init,
+            support_threshold = support_threshold
         )
         self.obj_node.set_prior(prior_name, **prior_kwargs)
 
         # --- Register diffraction data and assign Likelihood damping ---
+        self.obj_node.register_data_bulk(ptycho._diff_data)
         for diff in ptycho._diff_data:
-            self.obj_node.register_data(diff)
-            self.obj_node.probe_registry[diff].child.likelihood.damping = damping
-        
+            self.obj_node.probe_registry[diff].child.likelihood.damping = self.damping
+        self.likelihoods = [self.obj_node.probe_registry[diff].child.likelihood for diff in ptycho._diff_data]
+        if self.damping_controller:
+            self.damping_controller.attach(self.likelihoods)
+
+        # sweep-level acceleration (optional)
+        self.acceleration = acceleration
+        if acceleration is not None:
+            acceleration.attach(self.obj_node)
+
         # initialize probe update (optional)
         self.n_probe_update = n_probe_update
+        if probe_update_interval < 1:
+            raise ValueError("probe_update_interval must be a positive integer.")
+        self.probe_update_interval = probe_update_interval
         if n_probe_update > 0:
             from .probe_updater import ProbeUpdater
-            self.probe_updater = ProbeUpdater(self.obj_node) 
+            self.probe_updater = ProbeUpdater(self.obj_node, **(probe_update_options or {}))
 
 
-    def run(self, n_iter=100):
+    WARM_START_ENGINES = ("dm", "pie")
+
+    def _warm_start(self, name, n_iter, target_error, obj_init, prb_init, seed, update_probe):
+        """Run `name` for up to `n_iter` iterations and return its (object, probe)."""
+        if name not in self.WARM_START_ENGINES:
+            raise ValueError(f"warm_start must be one of {self.WARM_START_ENGINES}, got {name!r}")
+        if name == "dm":
+            from ptychoep.classic_engines.difference_map import DifferenceMap
+            engine = DifferenceMap(self.ptycho, obj_init=obj_init, prb_init=prb_init, seed=seed,
+                                   update_probe=update_probe)
+        else:
+            from ptychoep.classic_engines.minibatch_pie import MiniBatchPIE
+            engine = MiniBatchPIE(self.ptycho, variant="rpie", obj_init=obj_init, prb_init=prb_init,
+                                  seed=seed, update_probe=update_probe)
+        obj, prb = engine.run(n_iter=n_iter, target_error=target_error)
+        self.warm_start_engine = engine
+        # engines return full-grid arrays; the object node lives on self.ptycho's (compact) grid
+        return self.ptycho.crop(obj), (prb if update_probe else prb_init)
+
+    def run(self, n_iter=100, time_budget=None, target_error=None, stall_patience=None):
         """
-        Run the EP update loop for a given number of iterations.
+        Run the EP update loop until a stopping criterion is met.
 
         Parameters
         ----------
-        n_iter : int
-            Number of EP iterations.
-        n_probe_update : int
-            Number of probe EM updates per iteration. Set to 0 to disable.
+        n_iter : int or None
+            Maximum number of EP iterations.
+        time_budget : float or None
+            Wall-clock budget in seconds.
+        target_error : float or None
+            Stop once the mean Likelihood error reaches this value.
+        stall_patience : int or None
+            Stop when the error has not improved for this many iterations.
+
+        If any of `time_budget`, `target_error` or `stall_patience` is set,
+        the best-so-far estimate is returned (see RunMonitor). The monitor
+        is kept as `self.monitor`.
 
         Returns
         -------
@@ -75,10 +173,15 @@ class PtychoEP:
             Estimated posterior precision.
         """
         xp = self.xp
-        for it in range(n_iter):
-            # Optional prior update (if not gaussian)
-            if self.obj_node.prior:
-                self.obj_node.prior.forward()
+        monitor = self.monitor = RunMonitor(n_iter, time_budget, target_error, stall_patience)
+        prior = self.obj_node.prior
+        track_error = self.callback is not None or self.acceleration is not None or monitor.tracks_best \
+            or (prior is not None and prior.start_error is not None)
+        mean_err = None
+        for it in monitor:
+            # Optional prior update (if not gaussian), on its own schedule
+            if prior and prior.is_due(it, mean_err):
+                prior.forward()
 
             for diff in self.ptycho._diff_data:
                 self.obj_node.forward(diff)
@@ -89,17 +192,34 @@ class PtychoEP:
                 probe.child.backward()
                 probe.backward()
                 self.obj_node.backward(diff)
-            
+
+            # --- Adaptive damping ---
+            if self.damping_controller:
+                self.damping_controller.update(self.likelihoods)
+
+            mean_err = float("nan")
+            if track_error:
+                mean_err = float(xp.mean(xp.array([lik.error for lik in self.likelihoods])))
+
+            # --- Acceleration of the object belief ---
+            if self.acceleration is not None:
+                self.acceleration.step(mean_err)
+
             # --- Probe EM update ---
-            if self.n_probe_update > 0:
+            if self.n_probe_update > 0 and it % self.probe_update_interval == 0:
                 self.probe_updater.update(n_iter=self.n_probe_update)
 
             # Optional callback
             if self.callback:
-                mean_err = xp.mean(xp.array([
-                    p.child.likelihood.error for p in self.obj_node.probe_registry.values()
-                ]))
-                self.callback(it, float(mean_err), self.obj_node.get_belief().mean)
+                self.callback(it, mean_err, self.obj_node.get_belief().mean)
+            monitor.record(mean_err, lambda: copy_result(self._result()))
+
+        result = monitor.result(self._result())
+        # map back to the full grid (no-op without compact_roi)
+        mean, precision = self.ptycho.expand(result[0]), self.ptycho.expand(result[1], fill=1)
+        return (mean, precision) + tuple(result[2:])
+
+    def _result(self):
         # output results
         obj_estimate = self.obj_node.get_belief() # Uncertain Array
         if self.n_probe_update == 0:
@@ -0,0 +1,143 @@
+from __future__ import annotations
+from typing import Sequence
+import numpy as _np
+
+
+class DampingController:
+    """
+    Adaptive damping of the Likelihood backward messages in PtychoEP.
+
+    `Likelihood.backward` mixes the new message with the previous one as
+    ``damping * new + (1 - damping) * old``, so a larger damping value is a
+    more aggressive step. After every EP sweep the controller compares the
+    amplitude error tracked by each Likelihood (`Likelihood.error`) with the
+    previous sweeps and
+
+    - raises damping (``damping *= grow``, up to `max_damping`) while the error
+      has decreased by more than a relative `tolerance` in each of the last two sweeps,
+    - backs off (``damping *= shrink``, down to `min_damping`) when the error
+      increases by more than `tolerance`,
+    - otherwise (the error oscillates, stagnates at the noise floor or has just
+      recovered) keeps it, except that a damping below its initial value is
+      relaxed back towards it (``damping *= grow``, up to `initial`) after
+      `recovery` consecutive sweeps without an error increase.
+
+    Fully undamped updates (damping = 1) can diverge near convergence, hence
+    the default upper bound of 0.9.
+
+    In "global" mode a single damping value, driven by the mean error over all
+    scans, is applied to every Likelihood. In "per_scan" mode each scan
+    position has its own damping, driven by its own error. Single-scan errors
+    fluctuate more than their mean, so there a back-off requires an increase
+    in two consecutive sweeps. The recovery rule lets a scan that oscillated
+    once return to the base damping when it has settled. Per-scan damping reacts faster in early sweeps,
+    but heterogeneous damping can drift near the noise floor; "global" is the
+    more robust choice for long runs.
+    """
+
+    MODES = ("global", "per_scan")
+
+    def __init__(self, initial: float = 0.7, mode: str = "global",
+                 min_damping: float = 0.2, max_damping: float = 0.9,
+                 grow: float = 1.1, shrink: float = 0.7, tolerance: float = 1e-2,
+                 recovery: int = 3):
+        """
+        Parameters
+        ----------
+        initial : float
+            Initial damping value.
+        mode : str
+            "global" (one value for all scans) or "per_scan".
+        min_damping, max_damping : float
+            Bounds of the damping value, with 0 < min_damping <= max_damping <= 1.
+        grow : float
+            Multiplicative increase (> 1) applied while the error keeps falling.
+        shrink : float
+            Multiplicative decrease (< 1) applied when the error increases.
+        tolerance : float
+            Relative error change below which the error counts as neither
+            decreasing nor increasing.
+        recovery : int
+            Number of consecutive sweeps without an error increase after which
+            a backed-off damping is relaxed one `grow` step towards `initial`.
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"mode must be one of {self.MODES}, got {mode!r}")
+        if not (0.0 < min_damping <= max_damping <= 1.0):
+            raise ValueError("Require 0 < min_damping <= max_damping <= 1.")
+        if grow < 1.0 or not (0.0 < shrink < 1.0):
+            raise ValueError("Require grow >= 1 and 0 < shrink < 1.")
+        if recovery < 1:
+            raise ValueError("recovery must be a positive number of sweeps.")
+        self.initial = float(_np.clip(initial, min_damping, max_damping))
+        self.mode = mode
+        self.min_damping = min_damping
+        self.max_damping = max_damping
+        self.grow = grow
+        self.shrink = shrink
+        self.tolerance = tolerance
+        self.recovery = recovery
+
+        self.damping = None       # float (global) or np.ndarray (per_scan)
+        self._prev_error = None
+        self._prev_decreased = None
+        self._prev_increased = None
+        self._stable = None       # sweeps since the last error increase
+        self.history = []         # mean damping after each update
+
+    def attach(self, likelihoods: Sequence) -> None:
+        """Initialize the controller state and set the initial damping on `likelihoods`."""
+        if self.mode == "global":
+            self.damping = self.initial
+        else:
+            self.damping = _np.full(len(likelihoods), self.initial)
+        self._prev_error = None
+        self._prev_decreased = None
+        self._prev_increased = None
+        self._stable = 0 if self.mode == "global" else _np.zeros(len(likelihoods), dtype=int)
+        self.history = []
+        self._apply(likelihoods)
+
+    def update(self, likelihoods: Sequence) -> None:
+        """
+        Adapt the damping from the current `Likelihood.error` values and apply it.
+
+        Must be called once per EP sweep, after all Likelihood nodes have been updated.
+        """
+        if self.damping is None:
+            self.attach(likelihoods)
+        errors = _np.array([lik.error for lik in likelihoods], dtype=float)
+        error = errors.mean() if self.mode == "global" else errors
+
+        if self._prev_error is not None:
+            increased = error > self._prev_error * (1.0 + self.tolerance)
+            decreased = error < self._prev_error * (1.0 - self.tolerance)
+            raise_ = decreased & self._prev_decreased
+            back_off = increased if self.mode == "global" else increased & self._prev_increased
+            self._stable = _np.where(increased, 0, self._stable + 1)
+            relax = ~raise_ & ~back_off & (self._stable >= self.recovery) & (self.damping < self.initial)
+            self._stable = _np.where(relax, 0, self._stable)
+            damping = _np.where(raise_, _np.minimum(self.damping * self.grow, self.max_damping),
+                                _np.where(back_off, _np.maximum(self.damping * self.shrink, self.min_damping),
+                                          self.damping))
+            damping = _np.where(relax, _np.minimum(self.damping * self.grow, self.initial), damping)
+            if self.mode == "global":
+                self.damping, self._stable = float(damping), int(self._stable)
+            else:
+                self.damping = damping
+            self._prev_decreased = decreased
+            self._prev_increased = increased
+        else:
+            self._prev_decreased = _np.zeros_like(error, dtype=bool)
+            self._prev_increased = _np.zeros_like(error, dtype=bool)
+        self._prev_error = error
+        self._apply(likelihoods)
+
+    def _apply(self, likelihoods: Sequence) -> None:
+        if self.mode == "global":
+            for lik in likelihoods:
+                lik.damping = self.damping
+        else:
+            for lik, d in zip(likelihoods, self.damping):
+                lik.damping = float(d)
+        self.history.append(float(_np.mean(self.damping)))
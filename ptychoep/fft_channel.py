@@ -18,7 +18,8 @@ class FFTChannel:
     the Likelihood, and also propagates backward messages to the Probe.
     """
 
-    def __init__(self, parent_probe, diff: Optional[DiffractionData] = None):
+    def __init__(self, parent_probe, diff: Optional[DiffractionData] = None,
+                 init_msg: Optional[UA] = None):
         """
         Initialize the FFTChannel node.
 
@@ -28,6 +29,9 @@ class FFTChannel:
             The parent Probe object that this channel is connected to.
         diff : DiffractionData or None
             The diffraction data node associated with this channel.
+        init_msg : UncertainArray or None
+            Precomputed initial message from the Likelihood (see
+            `initialize_msg_from_likelihood`), e.g. from a batched FFT.
         """
         self.probe = parent_probe
         self.diff = diff
@@ -36,7 +40,10 @@ class FFTChannel:
         self.msg_to_probe: Optional[UA] = None    # Backward message to Probe
         self.msg_from_likelihood: Optional[UA] = None  # Message from OutputLikelihood (z-domain)
 
-        self.initialize_msg_from_likelihood()
+        if init_msg is None:
+            self.initialize_msg_from_likelihood()
+        else:
+            self.msg_from_likelihood = init_msg
 
     def initialize_msg_from_likelihood(self):
         """
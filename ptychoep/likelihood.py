@@ -28,13 +28,17 @@ class Likelihood:
         self.damping = 1.0
         self.parent = parent
 
-        self.y = diff.diffraction  # observed amplitude (not intensity)
         self.gamma_w = diff.gamma_w if diff.gamma_w is not None else 1.0
 
         self.msg_from_fft: Optional[UA] = None  # Forward message from FFTChannel
         self.belief: Optional[UA] = None        # Posterior over z
         self.error: float = 0.0                 # Optional amplitude MSE for logging
 
+    @property
+    def y(self):
+        """Observed amplitude (not intensity), decoded on the fly from compact storage."""
+        return self.diff.amplitude()
+
     def compute_belief(self):
         """
         Compute the approximate posterior z_hat using Laplace approximation.
@@ -57,6 +61,7 @@ class Likelihood:
             raise RuntimeError("Likelihood.compute_belief: msg_from_fft not set")
 
         xp = np()
+        y = self.y
         z0 = self.msg_from_fft.mean
         tau = self.msg_from_fft.precision
         v0 = 1.0 / tau
@@ -67,16 +72,16 @@ class Likelihood:
         unit_phase = z0 / abs_z0_safe
 
         # Posterior mean (amplitude-domain Laplace approx)
-        z_hat_amp = (v0 * self.y + 2 * v * abs_z0_safe) / (v0 + 2 * v)
+        z_hat_amp = (v0 * y + 2 * v * abs_z0_safe) / (v0 + 2 * v)
         z_hat = unit_phase * z_hat_amp
 
         # Posterior precision
-        v_hat = (v0 * (v0 * self.y + 4 * v * abs_z0_safe)) / (2.0 * abs_z0_safe * (v0 + 2 * v))
+        v_hat = (v0 * (v0 * y + 4 * v * abs_z0_safe)) / (2.0 * abs_z0_safe * (v0 + 2 * v))
         v_hat = xp.maximum(v_hat, 1e-8)
         precision = 1.0 / v_hat
 
         self.belief = UA(mean=z_hat, precision=precision, dtype=z0.dtype)
-        self.error = float(xp.mean((abs_z0 - self.y) ** 2))
+        self.error = float(xp.mean((abs_z0 - y) ** 2))
 
     def backward(self) -> None:
         """
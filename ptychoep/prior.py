@@ -1,4 +1,6 @@
 from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+import numpy as _np
 from .uncertain_array import UncertainArray as UA
 from ptychoep.backend.backend import np
 
@@ -11,21 +13,41 @@ class BasePrior:
     message exchange between the object node and the prior, including belief updates and 
     message replacements in the global object belief.
 
-    Subclasses should implement the `compute_belief()` method to define a specific prior 
+    Subclasses should implement the `posterior()` method to define a specific prior 
     distribution (e.g., sparsity, total variation).
 
+    Besides the model parameters, `prior_kwargs` may contain:
+
+    - ``prior_region`` : "full" (default) or "illuminated". With "illuminated",
+      only the first update covers the whole object; later updates are restricted
+      to the tiles touched by a scan patch. Elsewhere the object receives no data
+      messages, so the prior message is already at its fixed point there.
+    - ``prior_tile`` : tile size (pixels) of the illuminated region. None uses the
+      bounding box of the scans as a single tile.
+    - ``prior_threads`` : number of threads updating tiles concurrently.
+    - ``prior_interval`` : update the prior only every this many EP iterations.
+    - ``prior_start_error`` : skip the prior until the mean Likelihood error of the
+      previous iteration falls below this value.
+
     Attributes
     ----------
     object : Object
         The object node to which this prior is attached.
     msg_from_object : UncertainArray
         The incoming message from the object (belief / previous prior message).
+        With a restricted region, this (and `belief`) holds the last full update.
     belief : UncertainArray
         The approximate posterior under the prior.
     msg_to_object : UncertainArray
-        The outgoing message to be sent back to the object.
+        The outgoing message to be sent back to the object. With a restricted
+        region, it is rebuilt after each update from natural-parameter
+        buffers owned by the prior (the tile updates write into these).
+    tiles : list[tuple[slice, slice]] or None
+        Regions updated after the first call (None: the whole object).
     """
 
+    REGIONS = ("full", "illuminated")
+
     def __init__(self, obj: "Object", prior_kwargs=None):
         self.dtype = obj.dtype
         self.shape = obj.shape
@@ -35,6 +57,34 @@ class BasePrior:
         self.belief: UA | None = None
         self.msg_to_object: UA | None = None
 
+        prior_kwargs = prior_kwargs or {}
+        self.region = prior_kwargs.get("prior_region", "full")
+        if self.region not in self.REGIONS:
+            raise ValueError(f"prior_region must be one of {self.REGIONS}, got {self.region!r}")
+        self.tile_size = prior_kwargs.get("prior_tile", None)
+        self.n_threads = int(prior_kwargs.get("prior_threads", 1))
+        self.interval = int(prior_kwargs.get("prior_interval", 1))
+        self.start_error = prior_kwargs.get("prior_start_error", None)
+        if self.interval < 1 or self.n_threads < 1:
+            raise ValueError("prior_interval and prior_threads must be positive integers.")
+        self.tiles = None
+        self.n_updates = 0
+        self._wm = None    # precision-weighted mean of msg_to_object (restricted region)
+        self._prec = None  # precision of msg_to_object (restricted region)
+
+    def is_due(self, it: int, last_error: float | None = None) -> bool:
+        """
+        Whether the prior is updated at EP iteration `it`.
+
+        `last_error` is the mean Likelihood error of the previous iteration
+        (None before the first one).
+        """
+        if it % self.interval != 0:
+            return False
+        if self.start_error is not None:
+            return last_error is not None and last_error < self.start_error
+        return True
+
     def forward(self):
         """
         Perform a full EP update between the object and the prior.
@@ -43,21 +93,86 @@ class BasePrior:
         1. Receiving the current belief from the object.
         2. Computing the approximate posterior belief under the prior model.
         3. Sending a new message back to the object and updating its belief accordingly.
+
+        With ``prior_region="illuminated"``, every call after the first one
+        performs these steps tile by tile over the illuminated region only.
         """
-        self.msg_from_object = self.object.get_belief() / self.object.msg_from_prior
-        self.compute_belief()
-        self.msg_to_object = self.belief / self.msg_from_object
-        self.object.belief.subtract(self.object.msg_from_prior)
-        self.object.belief.add(self.msg_to_object)
-        self.object.msg_from_prior = self.msg_to_object
+        if self.region == "full" or self.n_updates == 0:
+            self.msg_from_object = self.object.belief.to_ua(natural=True) / self.object.msg_from_prior
+            self.compute_belief()
+            self.msg_to_object = self.belief / self.msg_from_object
+            self.object.belief.subtract(self.object.msg_from_prior)
+            self.object.belief.add(self.msg_to_object)
+            self.object.msg_from_prior = self.msg_to_object
+            if self.region != "full":
+                self._wm = self.msg_to_object.weighted_mean.copy()
+                self._prec = self.msg_to_object.precision.copy()
+        else:
+            if self.tiles is None:
+                self.tiles = self._illuminated_tiles()
+            if self.n_threads > 1 and len(self.tiles) > 1:
+                with ThreadPoolExecutor(max_workers=self.n_threads) as pool:
+                    list(pool.map(self._update_tile, self.tiles))
+            else:
+                for tile in self.tiles:
+                    self._update_tile(tile)
+            # the UA gets its own arrays: consumers may modify them in place
+            self.msg_to_object = UA.from_natural(self._wm.copy(), self._prec.copy(), dtype=self.dtype)
+            self.object.msg_from_prior = self.msg_to_object
+        self.n_updates += 1
+
+    def _update_tile(self, tile: tuple[slice, slice]) -> None:
+        """EP update of the prior restricted to `tile`; tiles are disjoint, so calls may run concurrently."""
+        wm = self._wm[tile]
+        prec = self._prec[tile]
+        old = UA.from_natural(wm.copy(), prec.copy(), dtype=self.dtype)
+        msg_in = self.object.belief.get_ua(tile, natural=True) / old
+        new = self.posterior(msg_in) / msg_in
+        self.object.belief.subtract(old, tile)
+        self.object.belief.add(new, tile)
+        wm[...] = new.weighted_mean
+        prec[...] = new.precision
+
+    def _illuminated_tiles(self) -> list[tuple[slice, slice]]:
+        """Tiles of the scans' bounding box that overlap at least one scan patch."""
+        patches = list(self.object.data_registry.values())
+        if not patches:
+            return []
+        y0 = min(sl_y.start for sl_y, _ in patches)
+        y1 = max(sl_y.stop for sl_y, _ in patches)
+        x0 = min(sl_x.start for _, sl_x in patches)
+        x1 = max(sl_x.stop for _, sl_x in patches)
+        if self.tile_size is None:
+            return [(slice(y0, y1), slice(x0, x1))]
+
+        covered = _np.zeros(self.shape, dtype=bool)
+        for sl_y, sl_x in patches:
+            covered[sl_y, sl_x] = True
+        t = int(self.tile_size)
+        tiles = []
+        for ty in range(y0, y1, t):
+            for tx in range(x0, x1, t):
+                tile = (slice(ty, min(ty + t, y1)), slice(tx, min(tx + t, x1)))
+                if covered[tile].any():
+                    tiles.append(tile)
+        return tiles
 
     def compute_belief(self):
         """
-        Compute the posterior approximation under the prior distribution.
+        Compute the posterior approximation under the prior distribution
+        from `msg_from_object` and store it as `belief`.
+        """
+        if self.msg_from_object is None:
+            raise RuntimeError(f"{type(self).__name__}: msg_from_object is None")
+        self.belief = self.posterior(self.msg_from_object)
+
+    def posterior(self, msg: UA) -> UA:
+        """
+        Posterior approximation (UA) under the prior, given the message `msg` from the object.
 
         This method must be implemented by subclasses to define the actual prior behavior.
         """
-        raise NotImplementedError("compute_belief() must be implemented in subclass")
+        raise NotImplementedError("posterior() must be implemented in subclass")
 
 
 class SparsePrior(BasePrior):
@@ -79,18 +194,15 @@ class SparsePrior(BasePrior):
             prior_kwargs = {}
         self.rho = prior_kwargs.get("sparsity", 0.1)
 
-    def compute_belief(self):
+    def posterior(self, msg: UA) -> UA:
         """
         Compute the posterior belief under a spike-and-slab prior using closed-form updates.
 
-        This follows standard expressions for Gaussian mixture models, using the current
+        This follows standard expressions for Gaussian mixture models, using the given
         message from the object to compute a pixel-wise posterior mean and variance.
         """
-        if self.msg_from_object is None:
-            raise RuntimeError("SparsePrior: msg_from_object is None")
-
-        m = self.msg_from_object.mean
-        v = 1.0 / self.msg_from_object.precision
+        m = msg.mean
+        v = 1.0 / msg.precision
 
         v_post = 1.0 / (1.0 + 1.0 / v)
         m_post = v_post * (m / v)
@@ -104,4 +216,4 @@ class SparsePrior(BasePrior):
         var = np().maximum(e_x2 - np().abs(mu) ** 2, 1e-8)
 
         precision = 1.0 / var
-        self.belief = UA(mean=mu, precision=precision, dtype=self.dtype)
+        return UA(mean=mu, precision=precision, dtype=self.dtype)
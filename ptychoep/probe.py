@@ -10,7 +10,11 @@ class Probe:
         self,
         data: np().ndarray,
         parent: Optional["Object"] = None,
-        diffraction: Optional[DiffractionData] = None
+        diffraction: Optional[DiffractionData] = None,
+        support: Optional[np().ndarray] = None,
+        data_abs: Optional[np().ndarray] = None,
+        data_inv: Optional[np().ndarray] = None,
+        init_msg: Optional[UA] = None
     ):
         """
         Initialize the Probe object.
@@ -23,9 +27,19 @@ class Probe:
             The parent Object node this probe belongs to.
         diffraction : DiffractionData or None
             The measurement node associated with this probe.
+        support : np.ndarray or None
+            Flat indices of the probe support within the patch. If given, the
+            messages exchanged with the Object are compact (K,) arrays over the
+            support (pixels outside are treated as P = 0); the FFT side still
+            works on the full patch.
+        data_abs, data_inv : np.ndarray or None
+            Optional precomputed derived arrays shared between probes (see `set_data`).
+        init_msg : UncertainArray or None
+            Optional precomputed initial message of the child FFTChannel.
         """
         self.dtype = data.dtype
-        self.set_data(data)
+        self.support = support
+        self.set_data(data, data_abs=data_abs, data_inv=data_inv)
 
         self.shape = data.shape
         self.parent = parent
@@ -35,7 +49,7 @@ class Probe:
         self.msg_to_object: Optional[UA] = None
 
         # Create FFTChannel child node and link back
-        self.child = FFTChannel(parent_probe=self, diff = self.diff)
+        self.child = FFTChannel(parent_probe=self, diff = self.diff, init_msg = init_msg)
 
 
 
@@ -77,6 +91,12 @@ class Probe:
         else:
             self.data_inv = data_inv
 
+        if self.support is not None:
+            # compact copies over the support
+            self.data_k = arr.reshape(-1).take(self.support)
+            self.conj_k = self.data_k.conj()
+            self.abs2_k = self.abs2.reshape(-1).take(self.support)
+
 
     def forward(self) -> None:
         """
@@ -94,6 +114,9 @@ class Probe:
         xp = np()
         if self.input_belief is None:
             raise RuntimeError("Probe.forward : no input belief")
+        if self.support is not None:
+            self._forward_support()
+            return
         new_mean =  self.input_belief.mean * self.data
         new_prec = xp.minimum(self.input_belief.precision / self.abs2, 1e8) # acoid too large precision
         self.child.input_belief = UA(mean = new_mean, precision = new_prec, dtype = self.dtype)
@@ -109,6 +132,30 @@ class Probe:
         """
         xp = np()
         msg_from_fft = self.child.msg_to_probe
+        if self.support is not None:
+            # weighted mean: gamma * m * conj(P) / |P|^2 * |P|^2
+            gamma = msg_from_fft.precision
+            m_k = msg_from_fft.mean.reshape(-1).take(self.support)
+            self.msg_to_object = UA.from_natural(gamma * m_k * self.conj_k, gamma * self.abs2_k, dtype=self.dtype)
+            return
         new_mean = msg_from_fft.mean * self.data_inv
         new_prec = msg_from_fft.precision * self.abs2
         self.msg_to_object = UA(mean = new_mean, precision = new_prec, dtype = self.dtype)
+
+    def _forward_support(self) -> None:
+        """
+        Masked forward pass: compact (K,) input belief -> full-patch exit wave.
+
+        The exit-wave mean is zero outside the support, where the clipped
+        precision of the unmasked path makes the variance 1e-8. The precision
+        sent to the FFTChannel is the scalar harmonic mean that `fft_ua` would
+        compute from the full-patch precision.
+        """
+        xp = np()
+        mean_k = self.input_belief.mean
+        exit_wave = xp.zeros(self.shape, dtype=self.dtype)
+        exit_wave.reshape(-1)[self.support] = mean_k * self.data_k
+        variance_k = xp.maximum(self.abs2_k / self.input_belief.precision, 1e-8)
+        n_out = exit_wave.size - variance_k.size
+        precision = exit_wave.size / (xp.sum(variance_k) + n_out * 1e-8)
+        self.child.input_belief = UA(mean = exit_wave, precision = precision, dtype = self.dtype)
@@ -1,7 +1,9 @@
 from __future__ import annotations
+import numpy as _np
 from .object import Object
 from ptychoep.backend.backend import np
 from .accumulative_uncertain_array import AccumulativeUncertainArray as AUA
+from ptychoep.ptycho.geometry import ScanGeometry
 
 class ProbeUpdater:
     """
@@ -11,17 +13,76 @@ class ProbeUpdater:
     current object belief and the messages received from each FFTChannel node.
 
     Optionally, it also updates the noise precision term (adaptive EM).
+
+    In stochastic mode (`subsample` set) the probe is estimated by incremental
+    EM: the per-scan terms of the sufficient statistics
+    sum_i gamma_i conj(O_i) Phi_i and sum_i gamma_i (|O_i|^2 + var_i) are kept
+    (two (N, H, W) arrays), and each call recomputes them, together with the
+    noise precisions, only for a subset of the scans. The aggregate keeps the
+    fixed point of full-batch EM while a call costs O(subset). The first call
+    is a full batch. Once a stochastic update changes the probe by less than
+    `full_batch_tol` (relative), the updater switches to full-batch EM for
+    good and releases the per-scan terms.
     """
 
-    def __init__(self, obj_node: Object):
+    SAMPLINGS = ("random", "stratified")
+
+    def __init__(self, obj_node: Object, subsample: float | int | None = None,
+                 sampling: str = "stratified", step: float = 1.0,
+                 full_batch_tol: float | None = 2e-3, seed: int | None = None):
         """
         Parameters
         ----------
         obj_node : Object
             The object node containing current belief and all probe instances.
+        subsample : float, int or None
+            Stochastic mode: scans used per call, as a fraction in (0, 1) or a
+            count. None (default) uses every scan (full-batch EM).
+        sampling : str
+            "random" (uniform without replacement) or "stratified" (one scan
+            drawn from each of `n` consecutive blocks of the scan order).
+        step : float
+            Step size in (0, 1] of stochastic updates: P <- P + step * (P_EM - P).
+        full_batch_tol : float or None
+            Switch to full-batch updates for good once the relative probe change
+            of a stochastic update falls below this value. None never switches.
+        seed : int or None
+            Seed of the subsampling generator.
         """
+        if sampling not in self.SAMPLINGS:
+            raise ValueError(f"sampling must be one of {self.SAMPLINGS}, got {sampling!r}")
+        if not 0.0 < step <= 1.0:
+            raise ValueError("step must be in (0, 1].")
+        if subsample is not None and subsample <= 0:
+            raise ValueError("subsample must be positive.")
         self.obj_node = obj_node
         self.xp = np()
+        self._geometry = None
+        self.subsample = subsample
+        self.sampling = sampling
+        self.step = step
+        self.full_batch_tol = full_batch_tol
+        self.full_batch = subsample is None
+        self._rng = _np.random.default_rng(seed)
+        self._stats = None          # aggregated (numerator, denominator) sums over all scans
+        self._scan_stats = None     # per-scan (numerator, denominator) terms (stochastic mode)
+
+    @property
+    def geometry(self) -> ScanGeometry:
+        """Patch geometry of the registered data (in registration order), built on first use."""
+        registry = self.obj_node.data_registry
+        if self._geometry is None or self._geometry.n_scan != len(registry):
+            self._geometry = ScanGeometry.from_indices(self.obj_node.shape, list(registry.values()))
+        return self._geometry
+
+    def _sample(self, n_scan: int) -> _np.ndarray:
+        """Sorted scan indices of one stochastic update."""
+        n = self.subsample if self.subsample >= 1 else self.subsample * n_scan
+        n = int(min(max(round(n), 1), n_scan))
+        if self.sampling == "random":
+            return _np.sort(self._rng.choice(n_scan, size=n, replace=False))
+        bounds = _np.linspace(0, n_scan, n + 1).astype(int)
+        return bounds[:-1] + (self._rng.random(n) * (bounds[1:] - bounds[:-1])).astype(int)
 
     def update(self, n_iter: int = 1):
         """
@@ -32,38 +93,44 @@ class ProbeUpdater:
         n_iter : int
             Number of EM update steps to run. The object belief is fixed during these steps.
         """
-        # --- Collect patches ---
         xp = self.xp
+        probes = list(self.obj_node.probe_registry.values())
+        n_scan = len(probes)
+        sel = None if self.full_batch or self._scan_stats is None else self._sample(n_scan)
+        if sel is not None:
+            probes = [probes[i] for i in sel]
+
+        # --- Collect patches ---
         full_belief = self.obj_node.belief.to_ua()
-        O_mu_list = []
-        O_var_list = []
+        O_mu_all = self.geometry.gather(full_belief.mean, sel)                 # (n, H, W)
+        O_var_all = 1.0 / self.geometry.gather(full_belief.precision, sel)     # (n, H, W)
+
         Phi_list = []
         gamma_list = []
-        for diff, probe in self.obj_node.probe_registry.items():
-                indices = self.obj_node.data_registry[diff]
-                O_mu = full_belief.mean[indices]
-                O_var = 1.0 / full_belief.precision[indices]
-                Phi = probe.child.msg_to_probe.mean
-                gamma = probe.child.msg_from_likelihood.precision
-                O_mu_list.append(O_mu)
-                O_var_list.append(O_var)
-                Phi_list.append(Phi)
-                gamma_list.append(gamma)
+        for probe in probes:
+                Phi_list.append(probe.child.msg_to_probe.mean)
+                gamma_list.append(probe.child.msg_from_likelihood.precision)
 
         # --- Stack into arrays ---
-        O_mu_all = xp.stack(O_mu_list, axis=0)            # (N, H, W)
-        O_var_all = xp.stack(O_var_list, axis=0)          # (N, H, W)
-        Phi_all = xp.stack(Phi_list, axis=0)              # (N, H, W)
+        Phi_all = xp.stack(Phi_list, axis=0)              # (n, H, W)
         gamma_all = xp.array(gamma_list).reshape(-1, 1, 1)
 
         # --- precompute constant terms ---
         numerator_terms = xp.conj(O_mu_all) * Phi_all
         denominator_terms = xp.abs(O_mu_all)**2 + O_var_all
+        stored = sel is not None and self._scan_stats is not None
 
         for _ in range(n_iter):
             # --- EM Update of probe ---
-            P1 = xp.sum(gamma_all * numerator_terms, axis=0)
-            P2 = xp.sum(gamma_all * denominator_terms, axis=0)
+            num_terms = gamma_all * numerator_terms
+            den_terms = gamma_all * denominator_terms
+            if stored:
+                # aggregate: stored statistics with the sampled scans' contributions replaced
+                P1 = self._stats[0] + xp.sum(num_terms - self._scan_stats[0][sel], axis=0)
+                P2 = self._stats[1] + xp.sum(den_terms - self._scan_stats[1][sel], axis=0)
+            else:
+                P1 = xp.sum(num_terms, axis=0)
+                P2 = xp.sum(den_terms, axis=0)
             P_est = P1 / P2
             P_est_abs2 = xp.abs(P_est)**2
 
@@ -76,6 +143,21 @@ class ProbeUpdater:
             ).reshape(-1, 1, 1)
             gamma_all = xp.maximum(gamma_all, 1e-8)
 
+        P_old = probes[0].data
+        if stored:
+            self._scan_stats[0][sel] = num_terms
+            self._scan_stats[1][sel] = den_terms
+            if self.step < 1.0:
+                P_est = P_old + self.step * (P_est - P_old)
+            change = float(xp.linalg.norm(P_est - P_old) / xp.maximum(xp.linalg.norm(P_old), 1e-30))
+            if self.full_batch_tol is not None and change < self.full_batch_tol:
+                self.full_batch = True
+                self._scan_stats = None
+        elif not self.full_batch:
+            # first call of the stochastic mode: full batch, keep the per-scan statistics
+            self._scan_stats = (num_terms, den_terms)
+        self._stats = (P1, P2)
+
         # --- Assigns all probes ---
         P_abs2 = xp.maximum(xp.abs(P_est) ** 2, 1e-8)
         P_conj =  xp.conj(P_est)
@@ -83,8 +165,8 @@ class ProbeUpdater:
         for probe in self.obj_node.probe_registry.values():
             probe.set_data(P_est, data_abs=P_abs2, data_inv=P_inv)
 
-        # --- Assign to all precisions ---
-        for i, probe in enumerate(self.obj_node.probe_registry.values()):
+        # --- Assign to all (sampled) precisions ---
+        for i, probe in enumerate(probes):
             probe.child.msg_from_likelihood.precision = gamma_all[i].item()
             probe.child.msg_to_probe.precision = gamma_all[i].item()
         """
@@ -6,20 +6,90 @@ class UncertainArray:
     """
     A container class representing a (possibly complex) Gaussian variable
     using its mean and precision (inverse variance).
+
+    A UA can also be held in natural-parameter form, i.e. as the
+    precision-weighted mean (precision * mean) and the precision.
+    Products and quotients of UAs are computed and returned in this form,
+    so chains of them reduce to additions/subtractions; the mean is only
+    materialized (one division) when a consumer accesses `mean`.
+
+    A UA stores exactly one of the two forms at a time, so arrays handed out
+    by `mean` / `weighted_mean` may be modified in place without leaving a
+    stale copy of the other parameter behind.
     """
     def __init__(self, mean: np().ndarray, precision: np().ndarray = 1.0, dtype = np().complex64):
-        self.mean = np().asarray(mean, dtype = dtype)
+        self._mean = np().asarray(mean, dtype = dtype)
+        self._weighted_mean = None
         self.shape = mean.shape
         self.dtype = dtype
         if np().isscalar(precision) or precision.ndim == 0:
             self.scalar_precision = True
-            self.precision = np().asarray(precision, dtype = np().float32)
+            self._precision = np().asarray(precision, dtype = np().float32)
         elif mean.shape == precision.shape:
             self.scalar_precision = False
-            self.precision = np().asarray(precision, dtype = np().float32)
+            self._precision = np().asarray(precision, dtype = np().float32)
         else:
             raise ValueError("precision shape mismatch.")
 
+    @classmethod
+    def from_natural(cls, weighted_mean: np().ndarray, precision: np().ndarray = 1.0, dtype = np().complex64):
+        """
+        Build a UA from natural parameters (precision * mean, precision).
+
+        The mean is not computed until it is first accessed.
+        """
+        ua = cls(weighted_mean, precision, dtype=dtype)
+        ua._weighted_mean, ua._mean = ua._mean, None
+        return ua
+
+    @property
+    def mean(self) -> np().ndarray:
+        """Mean of the UA. In natural form, accessing it switches the UA to mean form."""
+        if self._mean is None:
+            self._mean = self._weighted_mean / self._precision
+            self._weighted_mean = None
+        return self._mean
+
+    @mean.setter
+    def mean(self, value):
+        self._mean = value
+        self._weighted_mean = None
+
+    @property
+    def precision(self) -> np().ndarray:
+        return self._precision
+
+    @precision.setter
+    def precision(self, value):
+        # keep the mean fixed, as in the mean/precision parametrization
+        self._mean = self.mean
+        self._weighted_mean = None
+        self._precision = value
+
+    @property
+    def weighted_mean(self) -> np().ndarray:
+        """Precision-weighted mean (natural parameter; computed on each access in mean form)."""
+        if self._weighted_mean is not None:
+            return self._weighted_mean
+        return self._precision * self._mean
+
+    @property
+    def is_natural(self) -> bool:
+        """True if the UA holds its natural parameters."""
+        return self._weighted_mean is not None
+
+    def to_natural(self) -> UncertainArray:
+        """
+        Switch (in place) to natural-parameter storage and drop the mean.
+
+        Useful for messages that are only ever added to / subtracted from
+        an accumulator: their weighted mean is then computed once.
+        """
+        if self._weighted_mean is None:
+            self._weighted_mean = self._precision * self._mean
+        self._mean = None
+        return self
+
     @classmethod
     def zeros(cls, shape, dtype=np().complex64, scalar_precision = True):
         if scalar_precision:
@@ -36,6 +106,8 @@ class UncertainArray:
             return cls(normal(rng=rng, size=shape, dtype=dtype), np().ones(shape, dtype=np().float32))
 
     def copy(self):
+        if self._mean is None:
+            return UncertainArray.from_natural(self._weighted_mean.copy(), self._precision.copy(), dtype=self.dtype)
         return UncertainArray(self.mean.copy(), self.precision.copy(), dtype=self.dtype)
 
     def to_tuple(self):
@@ -46,17 +118,15 @@ class UncertainArray:
         if self.scalar_precision != other.scalar_precision:
             raise ValueError("both of the UAs should have scalar/array-type precision")
         precision_mul = self.precision + other.precision
-        product_mul = self.precision * self.mean + other.precision * other.mean
-        mean_mul = product_mul/precision_mul
-        return UncertainArray(mean = mean_mul, precision = precision_mul)
+        product_mul = self.weighted_mean + other.weighted_mean
+        return UncertainArray.from_natural(product_mul, precision_mul, dtype=self.dtype)
     
     def __truediv__(self, other : UncertainArray):
         if self.scalar_precision != other.scalar_precision:
             raise ValueError("both of the UAs should have scalar/array-type precision")
         precision_div = np().maximum(self.precision - other.precision, 1.0)
-        product_div = self.precision * self.mean - other.precision * other.mean
-        mean_div = product_div/precision_div
-        return UncertainArray(mean = mean_div, precision = precision_div)
+        product_div = self.weighted_mean - other.weighted_mean
+        return UncertainArray.from_natural(product_div, precision_div, dtype=self.dtype)
     
     def to_scalar_precision(self) -> UncertainArray:
         """
@@ -0,0 +1,38 @@
+import pytest
+from ptychoep.backend.backend import np
+from ptychoep.ptycho.core import Ptycho
+from ptychoep.ptycho.aperture_utils import circular_aperture
+from ptychoep.ptycho.scan_utils import generate_spiral_scan_positions
+from ptychoep.utils.io_utils import load_data_image
+
+
+def build_ptycho(num_points=50, r=None, step=None):
+    """
+    Synthetic dataset on the current backend, with noiseless diffraction data.
+
+    - r=None: cameraman / eagle object with the sample probe (probe.png, 128 x 128),
+      scanned on a spiral (default step 5).
+    - r given: lily / moon object with a 64 x 64 circular aperture of radius r,
+      scanned on a spiral (default step 16).
+    """
+    xp = np()
+    ptycho = Ptycho()
+    if r is None:
+        obj = xp.array(load_data_image("cameraman.png")) * xp.exp(1j * xp.pi * xp.array(load_data_image("eagle.png")))
+        probe = xp.array(load_data_image("probe.png"), dtype=xp.complex64)
+        step = 5 if step is None else step
+    else:
+        obj = xp.asarray(load_data_image("lily.png")) * xp.exp(1j * xp.pi / 2 * xp.asarray(load_data_image("moon.png")))
+        probe = circular_aperture(size=64, r=r)
+        step = 16.0 if step is None else step
+    ptycho.set_object(obj)
+    ptycho.set_probe(probe)
+    positions = generate_spiral_scan_positions(obj.shape[0], probe.shape[0], num_points, step=step)
+    ptycho.forward_and_set_diffraction(positions)
+    return ptycho
+
+
+@pytest.fixture
+def make_ptycho():
+    """Factory fixture: `make_ptycho(num_points=50, r=None, step=None)` (see `build_ptycho`); call after set_backend."""
+    return build_ptycho
@@ -72,3 +72,43 @@ def test_invalid_index_type(backend):
     ua = UncertainArray.zeros((4, 4))
     with pytest.raises(TypeError):
         aua.add(ua, indices=5)
+
+@pytest.mark.parametrize("backend", ["numpy", "cupy"])
+def test_natural_to_ua(backend):
+    set_backend(backend)
+    xp = backend_np()
+    shape = (4, 4)
+    aua = AccumulativeUncertainArray(shape)
+    ua = UncertainArray(xp.ones(shape, dtype=xp.complex64) * 2.0, xp.ones(shape, dtype=xp.float32) * 3.0)
+    aua.add(ua.to_natural())
+
+    belief = aua.to_ua(natural=True)
+    assert belief.is_natural
+    assert xp.allclose(belief.mean, aua.to_ua().mean)
+    # natural belief is a snapshot of the accumulator
+    aua.clear()
+    assert xp.allclose(belief.weighted_mean, 6.0)
+
+@pytest.mark.parametrize("backend", ["numpy", "cupy"])
+def test_flat_indices(backend):
+    set_backend(backend)
+    xp = backend_np()
+    shape = (4, 4)
+    aua = AccumulativeUncertainArray(shape)
+    idx = xp.asarray([1, 5, 6, 15])
+    old = UncertainArray(xp.full(4, 2.0, dtype=xp.complex64), xp.full(4, 3.0, dtype=xp.float32)).to_natural()
+    new = UncertainArray(xp.full(4, 4.0, dtype=xp.complex64), xp.full(4, 1.0, dtype=xp.float32)).to_natural()
+
+    aua.add(old, idx)
+    ua = aua.get_ua(idx)
+    assert ua.mean.shape == (4,)
+    assert xp.allclose(ua.mean, 6.0 / 4.0)
+    assert xp.allclose(ua.precision, 4.0)
+
+    # exchange == subtract(old) + add(new)
+    aua.exchange(old, new, idx)
+    assert xp.allclose(aua.get_ua(idx).mean, 4.0 / 2.0)
+    assert xp.allclose(aua.get_ua(idx).precision, 2.0)
+    # other pixels untouched
+    assert xp.allclose(aua.get_precision()[0, 0], 1.0)
+    assert xp.allclose(aua.to_ua().precision.sum(), 12 + 4 * 2.0)
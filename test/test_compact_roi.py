@@ -0,0 +1,67 @@
+import pytest
+from ptychoep.backend.backend import set_backend, np
+from ptychoep.rng.rng_utils import get_rng, normal
+from ptychoep.classic_engines.epie import ePIE
+from ptychoep.classic_engines.difference_map import DifferenceMap
+from ptychoep.gradient_engines.maximum_likelihood import MaximumLikelihood
+from ptychoep.ptychoep.core import PtychoEP
+
+
+ENGINES = [
+    (ePIE, dict(update_probe=False)),
+    (DifferenceMap, dict(update_probe=False)),
+    (MaximumLikelihood, dict(update_probe=False, optimizer="cg")),
+]
+
+
+@pytest.mark.parametrize("backend", ["numpy", "cupy"])
+@pytest.mark.parametrize("engine_cls, kwargs", ENGINES)
+def test_classic_engines_compact_roi_matches_full_grid(backend, engine_cls, kwargs, make_ptycho):
+    set_backend(backend)
+    xp = np()
+    ptycho = make_ptycho(num_points=30, r=0.45, step=12.0)
+    obj_init = normal(get_rng(0), mean=0.0, var=1.0, size=ptycho.obj.shape, dtype=xp.complex64)
+    full, _ = engine_cls(ptycho, obj_init=obj_init, **kwargs).run(n_iter=3)
+    engine = engine_cls(ptycho, obj_init=obj_init, compact_roi=True, **kwargs)
+    compact, _ = engine.run(n_iter=3)
+
+    roi = engine.ptycho.roi
+    assert engine.obj.shape[0] < ptycho.obj_len
+    assert compact.shape == full.shape
+    assert xp.allclose(compact[roi], full[roi], atol=1e-4)
+    assert not xp.any(compact[: roi[0].start])
+
+
+def test_ptycho_ep_compact_roi_matches_full_grid(make_ptycho):
+    set_backend("numpy")
+    xp = np()
+    ptycho = make_ptycho(num_points=30, r=0.45, step=12.0)
+    obj_init = normal(get_rng(0), mean=0.0, var=1.0, size=ptycho.obj.shape, dtype=xp.complex64)
+    full_mean, full_prec = PtychoEP(ptycho, obj_init=obj_init, damping=0.7).run(n_iter=2)
+    ep = PtychoEP(ptycho, obj_init=obj_init, damping=0.7, compact_roi=True)
+    mean, prec = ep.run(n_iter=2)
+
+    roi = ep.ptycho.roi
+    assert ep.obj_node.shape == (ep.ptycho.obj_len,) * 2
+    assert xp.allclose(mean[roi], full_mean[roi], atol=1e-5)
+    assert xp.allclose(prec[roi], full_prec[roi])
+    # outside the scanned region: the empty belief
+    assert mean[0, 0] == 0 and prec[0, 0] == 1
+
+
+@pytest.mark.parametrize("warm_start", ["dm", "pie"])
+def test_ptycho_ep_compact_roi_with_warm_start(warm_start, make_ptycho):
+    set_backend("numpy")
+    xp = np()
+    ptycho = make_ptycho(num_points=30, r=0.45, step=12.0)
+    ep = PtychoEP(ptycho, damping=0.7, seed=0, compact_roi=True, warm_start=warm_start, warm_start_iter=2)
+    roi = ep.ptycho.roi
+    assert ep.obj_node.object_init.shape == (ep.ptycho.obj_len,) * 2
+    # the object node starts from the warm-start estimate on the compact grid
+    warm = ep.warm_start_engine.obj
+    assert xp.allclose(ep.obj_node.object_init, warm)
+
+    mean, prec = ep.run(n_iter=1)
+    assert mean.shape == ptycho.obj.shape
+    assert mean[0, 0] == 0 and prec[0, 0] == 1
+    assert xp.all(xp.isfinite(mean[roi]))
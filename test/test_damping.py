@@ -0,0 +1,91 @@
+import pytest
+from types import SimpleNamespace
+import numpy as _np
+from ptychoep.backend.backend import set_backend
+from ptychoep.ptychoep.core import PtychoEP
+from ptychoep.ptychoep.damping import DampingController
+
+
+def fake_likelihoods(n):
+    return [SimpleNamespace(error=1.0, damping=1.0) for _ in range(n)]
+
+
+def run_errors(ctrl, liks, error_seq):
+    for errs in error_seq:
+        for lik, e in zip(liks, errs):
+            lik.error = e
+        ctrl.update(liks)
+
+
+def test_global_damping_rises_and_backs_off():
+    liks = fake_likelihoods(3)
+    ctrl = DampingController(initial=0.5, grow=1.2, shrink=0.5, max_damping=0.9)
+    ctrl.attach(liks)
+    assert all(lik.damping == 0.5 for lik in liks)
+
+    # first update only records, second has no descent streak yet, then it rises
+    run_errors(ctrl, liks, [[1.0] * 3, [0.8] * 3, [0.6] * 3])
+    assert ctrl.damping == pytest.approx(0.6)
+    run_errors(ctrl, liks, [[0.5] * 3] * 5)
+    assert ctrl.damping == pytest.approx(0.72)  # one more rise, then stagnation holds
+    run_errors(ctrl, liks, [[0.4] * 3, [0.3] * 3, [0.2] * 3, [0.1] * 3])
+    assert ctrl.damping == pytest.approx(0.9)  # clipped at max
+    run_errors(ctrl, liks, [[0.2] * 3])
+    assert ctrl.damping == pytest.approx(0.45)
+    assert all(lik.damping == pytest.approx(0.45) for lik in liks)
+    assert len(ctrl.history) == 1 + 13
+
+
+def test_per_scan_damping_is_independent():
+    liks = fake_likelihoods(2)
+    ctrl = DampingController(initial=0.5, mode="per_scan", grow=1.2, shrink=0.5)
+    ctrl.attach(liks)
+    # scan 0 keeps improving, scan 1 keeps getting worse
+    run_errors(ctrl, liks, [[1.0, 1.0], [0.8, 1.2], [0.6, 1.4]])
+    assert liks[0].damping == pytest.approx(0.6)
+    assert liks[1].damping == pytest.approx(0.25)
+    assert isinstance(ctrl.damping, _np.ndarray)
+
+
+def test_per_scan_damping_recovers_after_oscillation():
+    liks = fake_likelihoods(2)
+    ctrl = DampingController(initial=0.5, mode="per_scan", grow=1.2, shrink=0.5, recovery=2)
+    ctrl.attach(liks)
+    # scan 1 oscillates once (two increases), then both scans settle
+    run_errors(ctrl, liks, [[1.0, 1.0], [1.0, 1.2], [1.0, 1.4]])
+    assert liks[1].damping == pytest.approx(0.25)
+    run_errors(ctrl, liks, [[1.0, 1.4]] * 2)
+    assert liks[1].damping == pytest.approx(0.3)
+    run_errors(ctrl, liks, [[1.0, 1.4]] * 6)
+    assert liks[1].damping == pytest.approx(0.5)  # back at the base value, not above it
+    assert liks[0].damping == pytest.approx(0.5)
+    # a new increase resets the stable count
+    run_errors(ctrl, liks, [[1.0, 1.6], [1.0, 1.6]])
+    assert liks[1].damping == pytest.approx(0.5)
+
+
+def test_invalid_controller_arguments():
+    with pytest.raises(ValueError):
+        DampingController(mode="local")
+    with pytest.raises(ValueError):
+        DampingController(min_damping=0.9, max_damping=0.5)
+    with pytest.raises(ValueError):
+        DampingController(shrink=1.5)
+    with pytest.raises(ValueError):
+        DampingController(recovery=0)
+
+
+def test_ptycho_ep_with_damping_controller(make_ptycho):
+    set_backend("numpy")
+    ptycho = make_ptycho(num_points=60, r=0.45)
+
+    errors = []
+    ctrl = DampingController(initial=0.5)
+    ep = PtychoEP(ptycho, damping=ctrl, seed=0, callback=lambda i, e, o: errors.append(e))
+    assert ep.damping == 0.5
+    ep.run(n_iter=10)
+
+    assert len(ctrl.history) == 11
+    assert max(ctrl.history) > 0.5
+    assert errors[-1] < errors[0]
+    assert all(lik.damping == ctrl.damping for lik in ep.likelihoods)
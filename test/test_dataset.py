@@ -0,0 +1,80 @@
+import numpy as _np
+import pytest
+from ptychoep.backend.backend import set_backend
+from ptychoep.ptycho.core import Ptycho
+from ptychoep.ptycho.noise import GaussianNoise
+from ptychoep.ptycho.aperture_utils import circular_aperture
+from ptychoep.classic_engines.difference_map import DifferenceMap
+
+
+def _noisy_sorted(ptycho):
+    """Add noise and per-scan meta, and reorder the scans (exercises the saved scan order)."""
+    GaussianNoise(var=1e-3, seed=0) @ ptycho
+    ptycho._diff_data[3].meta["sort_key"] = 1.5
+    ptycho.sort_diffraction_data(key="center_distance")
+    return ptycho
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_save_load_roundtrip(tmp_path, mmap, make_ptycho):
+    set_backend("numpy")
+    ptycho = _noisy_sorted(make_ptycho(num_points=20, r=0.45, step=20.0))
+    ptycho.save(tmp_path / "scan")
+    loaded = Ptycho.load(tmp_path / "scan", mmap=mmap)
+
+    assert loaded.n_scan == ptycho.n_scan
+    assert isinstance(loaded._stack, _np.memmap) == mmap
+    assert _np.array_equal(loaded.diffraction_stack, ptycho.diffraction_stack)
+    assert _np.array_equal(loaded.positions, ptycho.positions)
+    assert _np.array_equal(loaded.prb, ptycho.prb) and _np.array_equal(loaded.obj, ptycho.obj)
+    assert loaded.noise_stats == ptycho.noise_stats
+    for d_l, d in zip(loaded._diff_data, ptycho._diff_data):
+        assert d_l.indices == d.indices
+        assert d_l.gamma_w == d.gamma_w
+        assert d_l.meta == d.meta
+        assert _np.shares_memory(d_l.diffraction, loaded._stack)
+
+    # engines run on the (memory-mapped) dataset as on the original
+    res = DifferenceMap(loaded, seed=0).run(n_iter=2)[0]
+    ref = DifferenceMap(ptycho, seed=0).run(n_iter=2)[0]
+    assert _np.allclose(res, ref)
+
+
+def test_load_mmap_is_copy_on_write(tmp_path, make_ptycho):
+    set_backend("numpy")
+    ptycho = _noisy_sorted(make_ptycho(num_points=20, r=0.45, step=20.0))
+    ptycho.save(tmp_path)
+    loaded = Ptycho.load(tmp_path)
+    GaussianNoise(var=1e-2, seed=1) @ loaded
+    assert not _np.allclose(loaded.diffraction_stack, ptycho.diffraction_stack)
+    # the file is untouched
+    assert _np.array_equal(Ptycho.load(tmp_path).diffraction_stack, ptycho.diffraction_stack)
+
+
+def test_save_load_compacted_and_empty(tmp_path, make_ptycho):
+    set_backend("numpy")
+    compact = _noisy_sorted(make_ptycho(num_points=20, r=0.45, step=20.0)).compacted()
+    compact.save(tmp_path / "roi")
+    loaded = Ptycho.load(tmp_path / "roi")
+    assert loaded.roi == compact.roi and loaded.parent_obj_len == compact.parent_obj_len
+
+    empty = Ptycho()
+    empty.set_probe(circular_aperture(size=16, r=0.4))
+    empty.save(tmp_path / "empty")
+    loaded = Ptycho.load(tmp_path / "empty")
+    assert loaded.n_scan == 0 and loaded.prb_len == 16
+
+
+def test_save_load_compact_storage(tmp_path, make_ptycho):
+    set_backend("numpy")
+    from ptychoep.ptycho.noise import PoissonNoise
+    ptycho = make_ptycho(num_points=10, r=0.45, step=20.0)
+    PoissonNoise(scale=50.0 / 64, seed=0) @ ptycho
+    amp = ptycho.diffraction_stack.copy()
+    ptycho.compact_storage("counts")
+    ptycho.save(tmp_path)
+
+    loaded = Ptycho.load(tmp_path)
+    assert loaded._stack.dtype == _np.uint16 and loaded.encoding == "counts"
+    assert _np.array_equal(loaded.take_amplitude(), amp)
+    assert loaded._diff_data[0].amplitude().dtype == _np.float32
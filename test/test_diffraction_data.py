@@ -40,3 +40,20 @@ def test_show_runs_without_error():
     data = DiffractionData(position=(0, 0), diffraction=arr)
     ax = data.show()
     assert ax is not None
+
+
+def test_amplitude_decoding():
+    set_backend("numpy")
+    xp = backend_np()
+    counts = xp.array([[0, 1], [10, 1000]], dtype=xp.uint16)
+    d = DiffractionData(position=(0, 0), diffraction=counts, encoding="counts", count_scale=100.0)
+    amp = d.amplitude()
+    assert amp.dtype == xp.float32
+    assert xp.allclose(amp, xp.sqrt((counts + 3.0 / 8.0) / 100.0))
+    assert xp.allclose(d.intensity(), (counts + 3.0 / 8.0) / 100.0)
+
+    half = DiffractionData(position=(0, 0), diffraction=xp.ones((2, 2), dtype=xp.float16), encoding="float16")
+    assert half.amplitude().dtype == xp.float32
+
+    plain = DiffractionData(position=(0, 0), diffraction=xp.ones((2, 2)))
+    assert plain.amplitude() is plain.diffraction
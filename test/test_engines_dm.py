@@ -40,3 +40,125 @@ def test_difference_map_runs_and_reduces_error(backend):
     assert obj_est.shape == obj.shape
     assert prb_est.shape == probe.shape
     assert xp.iscomplexobj(obj_est) and xp.iscomplexobj(prb_est), "推定結果は複素数配列である必要がある"
+
+
+def test_difference_map_update_matches_reference():
+    """スキャッタ加算による更新が素朴な実装と一致することを確認"""
+    set_backend("numpy")
+    xp = np()
+    rng = xp.random.default_rng(0)
+    ptycho = Ptycho()
+    ptycho.set_object((rng.random((32, 32)) + 1j * rng.random((32, 32))).astype(xp.complex64))
+    ptycho.set_probe((rng.random((8, 8)) + 0.5).astype(xp.complex64))
+    ptycho.forward_and_set_diffraction([(8, 8), (10, 12), (14, 9), (20, 20), (16, 16)])
+
+    dm = DifferenceMap(ptycho, seed=0, chunk_size=2)
+    dm.Phi[...] = dm._compute_exit_waves() * (1.0 + 0.1j)
+    Phi = dm.Phi.copy()
+    prb_old = dm.prb.copy()
+    dm._update_object_probe()
+
+    num = xp.zeros((32, 32), dtype=xp.complex64)
+    den = xp.full((32, 32), 1e-10, dtype=xp.float32)
+    for d, phi in zip(ptycho._diff_data, Phi):
+        num[d.indices] += prb_old.conj() * phi
+        den[d.indices] += xp.abs(prb_old) ** 2
+    obj_ref = num / den
+    assert xp.allclose(dm.obj, obj_ref, atol=1e-5)
+
+    num_p = xp.zeros((8, 8), dtype=xp.complex64)
+    den_p = xp.zeros((8, 8), dtype=xp.complex64) + 1e-10
+    for d, phi in zip(ptycho._diff_data, Phi):
+        num_p += obj_ref[d.indices].conj() * phi
+        den_p += xp.abs(obj_ref[d.indices]) ** 2
+    assert xp.allclose(dm.prb, num_p / den_p, atol=1e-5)
+
+
+def test_difference_map_fixed_probe():
+    """update_probe=False ではプローブが固定され、照明正規化がキャッシュされる"""
+    set_backend("numpy")
+    xp = np()
+    ptycho = Ptycho()
+    obj = xp.array(load_data_image("cameraman.png")) * xp.exp(1j * xp.pi * xp.array(load_data_image("eagle.png")))
+    probe = xp.array(load_data_image("probe.png"), dtype=xp.complex64)
+    ptycho.set_object(obj)
+    ptycho.set_probe(probe)
+    ptycho.forward_and_set_diffraction(generate_spiral_scan_positions(image_size=512, probe_size=128, num_points=30))
+
+    errors = []
+    dm = DifferenceMap(ptycho, update_probe=False, callback=lambda it, err, o: errors.append(err))
+    den = dm._den_obj
+    obj_est, prb_est = dm.run(n_iter=5)
+
+    assert dm._den_obj is den
+    assert xp.array_equal(prb_est, probe)
+    assert errors[0] > errors[-1]
+
+
+def test_difference_map_out_of_core_matches_in_core(tmp_path):
+    """メモリマップ版(out_of_core)が通常版と同じ結果を与えることを確認"""
+    set_backend("numpy")
+    xp = np()
+    ptycho = Ptycho()
+    obj = xp.array(load_data_image("cameraman.png")) * xp.exp(1j * xp.pi * xp.array(load_data_image("eagle.png")))
+    ptycho.set_object(obj)
+    ptycho.set_probe(xp.array(load_data_image("probe.png"), dtype=xp.complex64))
+    ptycho.forward_and_set_diffraction(generate_spiral_scan_positions(image_size=512, probe_size=128, num_points=20))
+
+    results = []
+    for kwargs in (dict(), dict(out_of_core=True, workdir=str(tmp_path), chunk_size=7)):
+        errors = []
+        dm = DifferenceMap(ptycho, seed=0, callback=lambda it, err, o: errors.append(err), **kwargs)
+        obj_est, prb_est = dm.run(n_iter=3)
+        results.append((obj_est, prb_est, errors))
+
+    assert isinstance(dm.Phi, xp.memmap)
+    assert any(tmp_path.iterdir())
+    assert xp.allclose(results[0][0], results[1][0], atol=1e-4)
+    assert xp.allclose(results[0][1], results[1][1], atol=1e-4)
+    assert xp.allclose(results[0][2], results[1][2], rtol=1e-4)
+
+
+def test_difference_map_out_of_core_reads_loaded_stack(tmp_path):
+    """読み込んだメモリマップの回折スタックは(走査順なら)コピーせずに読み取り専用で使う"""
+    set_backend("numpy")
+    xp = np()
+    ptycho = Ptycho()
+    ptycho.set_object(xp.array(load_data_image("cameraman.png"), dtype=xp.complex64))
+    ptycho.set_probe(xp.array(load_data_image("probe.png"), dtype=xp.complex64))
+    ptycho.forward_and_set_diffraction(generate_spiral_scan_positions(image_size=512, probe_size=128, num_points=20))
+    ptycho.save(tmp_path / "data")
+    ref = DifferenceMap(ptycho, seed=0).run(n_iter=2)[0]
+
+    loaded = Ptycho.load(tmp_path / "data")
+    workdir = tmp_path / "work"
+    workdir.mkdir()
+    dm = DifferenceMap(loaded, seed=0, out_of_core=True, workdir=str(workdir), chunk_size=7)
+    assert xp.shares_memory(dm.diffs, loaded.diffraction_stack)
+    assert not dm.diffs.flags.writeable
+    assert not (workdir / next(workdir.iterdir()) / "diffs.npy").exists()
+    assert xp.allclose(dm.run(n_iter=2)[0], ref, atol=1e-4)
+
+    # reordered scans: copied into the engine's own file
+    loaded.sort_diffraction_data(key="center_distance")
+    dm = DifferenceMap(loaded, seed=0, out_of_core=True, workdir=str(workdir), chunk_size=7)
+    assert not xp.shares_memory(dm.diffs, loaded._stack)
+    assert xp.array_equal(dm.diffs, loaded.diffraction_stack)
+
+
+def test_difference_map_uses_ptycho_stack():
+    """DM は Ptycho の回折スタックをコピーせずに使う(並べ替え後はコピー)"""
+    set_backend("numpy")
+    xp = np()
+    ptycho = Ptycho()
+    ptycho.set_object(xp.array(load_data_image("cameraman.png"), dtype=xp.complex64))
+    ptycho.set_probe(xp.array(load_data_image("probe.png"), dtype=xp.complex64))
+    ptycho.forward_and_set_diffraction(generate_spiral_scan_positions(image_size=512, probe_size=128, num_points=20))
+
+    dm = DifferenceMap(ptycho)
+    assert xp.shares_memory(dm.diffs, ptycho._stack)
+
+    ptycho.sort_diffraction_data(key="center_distance")
+    dm = DifferenceMap(ptycho)
+    assert not xp.shares_memory(dm.diffs, ptycho._stack)
+    assert xp.array_equal(dm.diffs, xp.stack(ptycho.diffs))
@@ -25,3 +25,36 @@ def test_epie_runs_and_reduces_error(backend):
 
     assert len(errors) == 10
     assert errors[0] > errors[-1]
+
+
+def test_epie_matches_reference_loop():
+    set_backend("numpy")
+    xp = np()
+    rng = xp.random.default_rng(0)
+    ptycho = Ptycho()
+    obj = (rng.random((48, 48)) * xp.exp(1j * rng.random((48, 48)))).astype(xp.complex64)
+    probe = (rng.random((16, 16)) + 0.5).astype(xp.complex64)
+    ptycho.set_object(obj)
+    ptycho.set_probe(probe)
+    ptycho.forward_and_set_diffraction([(12, 12), (18, 14), (24, 24), (30, 20), (20, 32)])
+    probe_before = ptycho.prb.copy()
+
+    obj_init = xp.ones((48, 48), dtype=xp.complex64)
+    prb_init = (probe * 0.8).astype(xp.complex64)
+    obj_est, prb_est = ePIE(ptycho, alpha=0.5, beta=0.3, obj_init=obj_init, prb_init=prb_init).run(n_iter=3)
+
+    # straightforward per-scan reference
+    from ptychoep.ptycho.projector import Fourier_projector
+    o, p = obj_init.copy(), prb_init.copy()
+    for _ in range(3):
+        for d in ptycho._diff_data:
+            patch = o[d.indices].copy()
+            proj, _ = Fourier_projector(p * patch, d.diffraction)
+            res = proj - p * patch
+            o[d.indices] += 0.5 * p.conj() * res / xp.max(xp.abs(p)) ** 2
+            p = p + 0.3 * patch.conj() * res / xp.max(xp.abs(patch)) ** 2
+
+    assert xp.allclose(obj_est, o, atol=1e-4)
+    assert xp.allclose(prb_est, p, atol=1e-4)
+    assert xp.array_equal(ptycho.prb, probe_before)
+    assert xp.array_equal(prb_init, (probe * 0.8).astype(xp.complex64))
@@ -0,0 +1,60 @@
+import pytest
+from ptychoep.backend.backend import set_backend, np
+from ptychoep.gradient_engines.maximum_likelihood import MaximumLikelihood
+
+
+@pytest.mark.parametrize("backend", ["numpy", "cupy"])
+@pytest.mark.parametrize("kwargs", [
+    dict(optimizer="adam", batch_size=10),
+    dict(optimizer="cg"),
+    dict(optimizer="cg", noise_model="poisson", step=0.25),
+])
+def test_ml_runs_and_reduces_error(backend, kwargs, make_ptycho):
+    set_backend(backend)
+    ptycho = make_ptycho()
+
+    errors = []
+    def callback(iter_idx, err, obj_est):
+        errors.append(err)
+
+    engine = MaximumLikelihood(ptycho, prb_init=ptycho.prb.copy(), callback=callback, seed=0, **kwargs)
+    obj_est, prb_est = engine.run(n_iter=10)
+
+    assert len(errors) == 10
+    assert errors[-1] < 0.1 * errors[0]
+    assert obj_est.shape == ptycho.obj.shape
+    assert prb_est.shape == ptycho.prb.shape
+
+
+def test_ml_fixed_probe(make_ptycho):
+    set_backend("numpy")
+    xp = np()
+    ptycho = make_ptycho()
+    probe = ptycho.prb.copy()
+    _, prb_est = MaximumLikelihood(ptycho, optimizer="cg", update_probe=False, seed=0).run(n_iter=2)
+    assert xp.array_equal(prb_est, probe)
+    assert xp.array_equal(ptycho.prb, probe)
+
+
+def test_ml_invalid_arguments(make_ptycho):
+    set_backend("numpy")
+    ptycho = make_ptycho()
+    with pytest.raises(ValueError):
+        MaximumLikelihood(ptycho, noise_model="gaussian")
+    with pytest.raises(ValueError):
+        MaximumLikelihood(ptycho, optimizer="sgd")
+    with pytest.raises(ValueError):
+        MaximumLikelihood(ptycho, batch_size=0)
+
+
+@pytest.mark.parametrize("step", [0.5, 4.0])
+def test_ml_cg_line_search_is_monotone(step, make_ptycho):
+    set_backend("numpy")
+    ptycho = make_ptycho(num_points=20)
+    errors = []
+    engine = MaximumLikelihood(ptycho, optimizer="cg", step=step, prb_init=ptycho.prb.copy(), seed=0,
+                               callback=lambda it, err, obj: errors.append(err))
+    engine.run(n_iter=15)
+    # the callback reports the error of the accepted iterates, which never increases
+    assert all(b <= a for a, b in zip(errors, errors[1:]))
+    assert errors[-1] < 0.5 * errors[0]
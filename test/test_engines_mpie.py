@@ -0,0 +1,45 @@
+import pytest
+from ptychoep.backend.backend import set_backend, np
+from ptychoep.classic_engines.rpie import rPIE
+from ptychoep.classic_engines.mpie import mPIE
+
+
+@pytest.mark.parametrize("backend", ["numpy", "cupy"])
+def test_mpie_converges_faster_than_rpie(backend, make_ptycho):
+    set_backend(backend)
+    ptycho = make_ptycho()
+
+    def run(cls, **kw):
+        errors = []
+        engine = cls(ptycho, alpha=0.1, beta=0.1, prb_init=ptycho.prb.copy(), seed=0,
+                     callback=lambda it, err, obj: errors.append(err), **kw)
+        obj_est, prb_est = engine.run(n_iter=20)
+        assert obj_est.shape == ptycho.obj.shape and prb_est.shape == ptycho.prb.shape
+        return errors
+
+    err_rpie = run(rPIE)
+    err_mpie = run(mPIE)
+    assert len(err_mpie) == 20
+    assert err_mpie[-1] < err_rpie[-1]
+
+
+def test_mpie_without_momentum_matches_rpie(make_ptycho):
+    set_backend("numpy")
+    xp = np()
+    ptycho = make_ptycho()
+    obj_ref, prb_ref = rPIE(ptycho, prb_init=ptycho.prb.copy(), seed=0).run(n_iter=3)
+
+    # zero friction, and restarting every sweep, both reduce to rPIE
+    for kw in (dict(eta_obj=0.0, eta_prb=0.0), dict(restart=None, restart_interval=1)):
+        obj_est, prb_est = mPIE(ptycho, prb_init=ptycho.prb.copy(), seed=0, **kw).run(n_iter=3)
+        assert xp.allclose(obj_est, obj_ref, atol=1e-5)
+        assert xp.allclose(prb_est, prb_ref, atol=1e-5)
+
+
+def test_mpie_invalid_arguments(make_ptycho):
+    set_backend("numpy")
+    ptycho = make_ptycho()
+    with pytest.raises(ValueError):
+        mPIE(ptycho, eta_obj=1.0)
+    with pytest.raises(ValueError):
+        mPIE(ptycho, restart="always")
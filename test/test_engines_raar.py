@@ -0,0 +1,59 @@
+import pytest
+from ptychoep.backend.backend import set_backend, np
+from ptychoep.classic_engines.difference_map import DifferenceMap
+from ptychoep.classic_engines.raar import RAAR, RRR
+
+
+@pytest.mark.parametrize("backend", ["numpy", "cupy"])
+@pytest.mark.parametrize("cls,beta", [(RAAR, 0.75), (RRR, 0.5)])
+def test_relaxed_projections_run_and_reduce_error(backend, cls, beta, make_ptycho):
+    set_backend(backend)
+    ptycho = make_ptycho()
+
+    errors = []
+    engine = cls(ptycho, beta=beta, callback=lambda it, err, o: errors.append(err), seed=0)
+    obj_est, prb_est = engine.run(n_iter=10)
+
+    assert len(errors) == 10
+    assert errors[0] > errors[-1]
+    assert obj_est.shape == ptycho.obj.shape
+    assert prb_est.shape == ptycho.prb.shape
+
+
+def test_relaxed_projections_reduce_to_dm_at_beta_one(make_ptycho):
+    set_backend("numpy")
+    xp = np()
+    ptycho = make_ptycho(num_points=20)
+    obj_ref, prb_ref = DifferenceMap(ptycho, seed=0).run(n_iter=3)
+    for cls in (RAAR, RRR):
+        obj_est, prb_est = cls(ptycho, beta=1.0, seed=0).run(n_iter=3)
+        assert xp.allclose(obj_est, obj_ref, atol=1e-5)
+        assert xp.allclose(prb_est, prb_ref, atol=1e-5)
+
+
+def test_raar_phi_update_matches_formula(make_ptycho):
+    """RAAR: Phi <- beta * DM(Phi) + (1 - beta) * exit"""
+    set_backend("numpy")
+    xp = np()
+    ptycho = make_ptycho(num_points=5)
+    engine = RAAR(ptycho, beta=0.6, seed=0)
+    rng = xp.random.default_rng(1)
+    shape = engine.Phi.shape
+    phi = (rng.standard_normal(shape) + 1j * rng.standard_normal(shape)).astype(xp.complex64)
+    exit_waves = (rng.standard_normal(shape) + 1j * rng.standard_normal(shape)).astype(xp.complex64)
+
+    from ptychoep.ptycho.projector import Fourier_projector
+    proj, _ = Fourier_projector(2 * exit_waves - phi, engine.diffs)
+    expected = 0.6 * (phi + proj - exit_waves) + 0.4 * exit_waves
+
+    engine._update_phi(phi, exit_waves.copy(), engine.diffs)
+    assert xp.allclose(phi, expected, atol=1e-5)
+
+
+def test_relaxed_projections_invalid_beta(make_ptycho):
+    set_backend("numpy")
+    ptycho = make_ptycho(num_points=5)
+    with pytest.raises(ValueError):
+        RAAR(ptycho, beta=0.0)
+    with pytest.raises(ValueError):
+        RRR(ptycho, beta=2.0)
@@ -0,0 +1,116 @@
+import pytest
+import numpy as _np
+from ptychoep.backend.backend import set_backend, np as backend_np
+from ptychoep.ptycho.core import Ptycho
+from ptychoep.ptycho.geometry import ScanGeometry
+
+
+def make_ptycho(positions, obj_len=32, prb_len=8):
+    xp = backend_np()
+    p = Ptycho()
+    obj = (xp.arange(obj_len * obj_len).reshape(obj_len, obj_len) * (1 + 1j)).astype(xp.complex64)
+    p.set_object(obj)
+    p.set_probe(xp.ones((prb_len, prb_len), dtype=xp.complex64))
+    p.forward_and_set_diffraction(positions)
+    return p
+
+
+@pytest.mark.parametrize("backend", ["numpy", "cupy"])
+def test_offsets_and_gather(backend):
+    set_backend(backend)
+    xp = backend_np()
+    p = make_ptycho([(8, 8), (10, 13), (20, 20)])
+    geo = p.geometry
+
+    assert geo.n_scan == 3
+    assert geo.patch_shape == (8, 8)
+    assert _np.array_equal(geo.offsets, [[4, 4], [6, 9], [16, 16]])
+
+    patches = geo.gather(p.obj)
+    assert patches.shape == (3, 8, 8)
+    for i, d in enumerate(p._diff_data):
+        assert xp.allclose(patches[i], p.obj[d.indices])
+        assert geo.slices(i) == d.indices
+
+    sub = geo.gather(p.obj, sel=[2, 0])
+    assert xp.allclose(sub[0], p.obj[p._diff_data[2].indices])
+
+
+def test_gather_returns_view_for_equally_spaced_patches():
+    set_backend("numpy")
+    p = make_ptycho([(8, 8), (8, 12), (8, 16), (20, 20)])
+    geo = p.geometry
+
+    line = geo.gather(p.obj, sel=slice(0, 3))
+    assert _np.shares_memory(line, p.obj) and not line.flags.writeable
+    for i in range(3):
+        assert _np.array_equal(line[i], p.obj[p._diff_data[i].indices])
+    single = geo.gather(p.obj, sel=[3])
+    assert _np.shares_memory(single, p.obj)
+    assert _np.array_equal(single[0], p.obj[p._diff_data[3].indices])
+
+    # irregular spacing falls back to a copy
+    assert not _np.shares_memory(geo.gather(p.obj), p.obj)
+
+
+@pytest.mark.parametrize("backend", ["numpy", "cupy"])
+def test_scatter_add_matches_add_at(backend):
+    set_backend(backend)
+    xp = backend_np()
+    positions = [(8, 8), (10, 10), (9, 14), (20, 20), (12, 9)]
+    p = make_ptycho(positions)
+    geo = p.geometry
+
+    patches = xp.ones((len(positions), 8, 8), dtype=xp.float32) * xp.arange(1, 6, dtype=xp.float32)[:, None, None]
+    weight = xp.arange(64, dtype=xp.float32).reshape(8, 8)
+    out = xp.zeros((32, 32), dtype=xp.float32)
+    geo.scatter_add(out, patches, weight=weight)
+
+    ref = xp.zeros((32, 32), dtype=xp.float32)
+    for d, patch in zip(p._diff_data, patches):
+        ref[d.indices] += weight * patch
+    assert xp.allclose(out, ref)
+
+    # a single patch is broadcast to the selected scans
+    out = xp.zeros((32, 32), dtype=xp.float32)
+    geo.scatter_add(out, weight, sel=[0, 1])
+    ref = xp.zeros((32, 32), dtype=xp.float32)
+    ref[p._diff_data[0].indices] += weight
+    ref[p._diff_data[1].indices] += weight
+    assert xp.allclose(out, ref)
+
+
+@pytest.mark.parametrize("backend", ["numpy", "cupy"])
+def test_groups_are_non_overlapping(backend):
+    set_backend(backend)
+    positions = [(8, 8), (10, 10), (8, 16), (16, 8), (16, 16), (24, 24)]
+    geo = make_ptycho(positions).geometry
+    groups = geo.groups
+
+    assert sorted(_np.concatenate(groups).tolist()) == list(range(len(positions)))
+    for g in groups:
+        for a in g:
+            for b in g:
+                if a != b:
+                    dy, dx = _np.abs(geo.offsets[a] - geo.offsets[b])
+                    assert dy >= 8 or dx >= 8
+
+
+def test_invalid_geometry():
+    set_backend("numpy")
+    with pytest.raises(ValueError):
+        ScanGeometry.from_indices((16, 16), [(slice(0, 4), slice(0, 4)), (slice(0, 6), slice(0, 6))])
+    with pytest.raises(ValueError):
+        ScanGeometry((16, 16), [(14, 0)], (4, 4))
+    with pytest.raises(ValueError):
+        ScanGeometry.from_indices((16, 16), [None])
+
+
+def test_geometry_cache_invalidation():
+    set_backend("numpy")
+    p = make_ptycho([(8, 8), (20, 20)])
+    geo = p.geometry
+    assert p.geometry is geo
+    p.sort_diffraction_data(key="center_distance", reverse=True)
+    assert p.geometry is not geo
+    assert _np.array_equal(p.geometry.offsets[0], [4, 4])
@@ -0,0 +1,49 @@
+import pytest
+from ptychoep.backend.backend import set_backend
+from ptychoep.classic_engines.difference_map import DifferenceMap
+from ptychoep.ptychoep.core import PtychoEP
+from ptychoep.utils.multiresolution import MultiResolution
+
+
+@pytest.mark.parametrize("backend", ["numpy", "cupy"])
+def test_multiresolution_dm(backend, make_ptycho):
+    set_backend(backend)
+    ptycho = make_ptycho(num_points=40, r=0.45)
+    driver = MultiResolution(DifferenceMap, factors=(4, 2), n_iter=(5, 5, 5), carry_probe=True, seed=0)
+    obj, prb = driver.run(ptycho)
+
+    assert driver.factors == (4, 2, 1)
+    assert [e.ptycho.prb_len for e in driver.engines] == [16, 32, 64]
+    assert driver.level_results[0][0].shape == (128, 128)  # first-look image
+    assert obj.shape == ptycho.obj.shape and prb.shape == ptycho.prb.shape
+
+
+def test_multiresolution_ep(make_ptycho):
+    set_backend("numpy")
+    ptycho = make_ptycho(num_points=40, r=0.45)
+    errors = []
+    driver = MultiResolution(PtychoEP, factors=(2, 1), n_iter=3, damping=0.7, seed=0,
+                             callback=lambda it, err, est: errors.append(err))
+    mean, precision = driver.run(ptycho)
+    assert mean.shape == ptycho.obj.shape
+    assert len(errors) == 6
+    # messages of the fine level start from the upsampled coarse estimate
+    assert driver.engines[1].obj_node.object_init.shape == ptycho.obj.shape
+
+
+def test_multiresolution_invalid_factors():
+    with pytest.raises(ValueError):
+        MultiResolution(DifferenceMap, factors=(2, 4))
+    with pytest.raises(ValueError):
+        MultiResolution(DifferenceMap, factors=(4, 2, 1), n_iter=(1, 2))
+    with pytest.raises(ValueError, match="multiple"):
+        MultiResolution(DifferenceMap, factors=(3, 2, 1))
+
+
+def test_multiresolution_checks_probe_size(make_ptycho):
+    set_backend("numpy")
+    ptycho = make_ptycho(num_points=5, r=0.45)
+    driver = MultiResolution(DifferenceMap, factors=(6, 3), n_iter=1)
+    with pytest.raises(ValueError, match="not divisible"):
+        driver.run(ptycho)
+    assert driver.engines == []
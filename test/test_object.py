@@ -58,3 +58,42 @@ def test_object_forward_backward_cycle(backend):
     obj.backward(data)
     new_msg = obj.msg_from_data[data]
     assert xp.allclose(new_msg.mean, old_msg)
+
+
+@pytest.mark.parametrize("support_threshold", [None, 0.5])
+def test_register_data_bulk_matches_single(support_threshold):
+    set_backend("numpy")
+    xp = backend_np()
+    shape = (24, 24)
+    rng = xp.random.default_rng(0)
+    obj_init = (rng.standard_normal(shape) + 1j * rng.standard_normal(shape)).astype(xp.complex64)
+    yy, xx = xp.mgrid[:8, :8]
+    prb_init = xp.exp(-((yy - 3.5) ** 2 + (xx - 3.5) ** 2) / 8).astype(xp.complex64)
+
+    def make_data():
+        data = []
+        for y, x in [(0, 0), (0, 5), (3, 3), (16, 16), (10, 2), (3, 3)]:
+            d = DiffractionData(diffraction=xp.ones((8, 8)), position=(y + 4, x + 4))
+            d.indices = (slice(y, y + 8), slice(x, x + 8))
+            data.append(d)
+        return data
+
+    single = Object(shape, rng=None, initial_probe=prb_init, initial_object=obj_init,
+                    support_threshold=support_threshold)
+    single_data = make_data()
+    for d in single_data:
+        single.register_data(d)
+
+    bulk = Object(shape, rng=None, initial_probe=prb_init, initial_object=obj_init,
+                  support_threshold=support_threshold)
+    bulk_data = make_data()
+    bulk.register_data_bulk(bulk_data, batch_size=4)
+
+    assert xp.allclose(bulk.get_belief().mean, single.get_belief().mean, atol=1e-6)
+    assert xp.allclose(bulk.get_belief().precision, single.get_belief().precision)
+    for ds, db in zip(single_data, bulk_data):
+        assert xp.allclose(bulk.msg_from_data[db].weighted_mean, single.msg_from_data[ds].weighted_mean)
+        assert xp.allclose(bulk.probe_registry[db].child.msg_from_likelihood.mean,
+                           single.probe_registry[ds].child.msg_from_likelihood.mean, atol=1e-5)
+        if support_threshold is not None:
+            assert xp.array_equal(bulk.flat_registry[db], single.flat_registry[ds])
@@ -0,0 +1,172 @@
+import pytest
+from ptychoep.backend.backend import set_backend, np
+from ptychoep.ptycho.aperture_utils import circular_aperture
+from ptychoep.ptycho.forward import generate_diffraction
+from ptychoep.classic_engines.difference_map import DifferenceMap
+from ptychoep.ptycho.noise import PoissonNoise
+from ptychoep.ptycho.preprocess import (crop_spectrum, fourier_resample, crop_detector, upsample_object,
+                                        bin_spectrum, bin_detector, reduce_detector)
+
+
+@pytest.mark.parametrize("backend", ["numpy", "cupy"])
+def test_crop_spectrum_keeps_low_frequencies(backend):
+    set_backend(backend)
+    xp = np()
+    freq = xp.fft.fftfreq(8)
+    spec = freq[:, None] + 10 * freq[None, :]
+    cropped = crop_spectrum(spec, 4)
+    expected_freq = xp.fft.fftfreq(4) * 0.5  # the same physical frequencies
+    assert xp.allclose(cropped, expected_freq[:, None] + 10 * expected_freq[None, :])
+    with pytest.raises(ValueError):
+        crop_spectrum(spec, 16)
+
+
+@pytest.mark.parametrize("backend", ["numpy", "cupy"])
+def test_fourier_resample_roundtrip(backend):
+    set_backend(backend)
+    xp = np()
+    probe = xp.asarray(circular_aperture(size=64, r=0.45))
+    small = fourier_resample(probe, 32)
+    assert small.shape == (32, 32)
+    # zero-padding the spectrum again preserves the retained band exactly
+    back = fourier_resample(small, 64)
+    assert xp.allclose(fourier_resample(back, 32), small, atol=1e-5)
+    assert xp.linalg.norm(small) <= xp.linalg.norm(probe) * (1 + 1e-6)
+
+
+@pytest.mark.parametrize("backend", ["numpy", "cupy"])
+def test_crop_detector_consistent_geometry(backend, make_ptycho):
+    set_backend(backend)
+    xp = np()
+    ptycho = make_ptycho(num_points=30, r=0.45)
+    low = crop_detector(ptycho, 32)
+
+    assert low.prb_len == 32 and low.obj_len == 256
+    assert len(low._diff_data) == len(ptycho._diff_data)
+    for d_low, d in zip(low._diff_data, ptycho._diff_data):
+        assert d_low.diffraction.shape == (32, 32)
+        assert all(abs(a * 2 - b) <= 1 for a, b in zip(d_low.position, d.position))
+    low.geometry  # patches lie inside the coarse grid
+
+    # the coarse forward model reproduces the cropped data up to model error
+    sim = xp.stack([d.diffraction for d in generate_diffraction(low, low.scan_pos)])
+    data = xp.stack(low.diffs)
+    assert float(xp.linalg.norm(sim - data) / xp.linalg.norm(data)) < 0.3
+
+    with pytest.raises(ValueError):
+        crop_detector(ptycho, 48)
+
+
+@pytest.mark.parametrize("backend", ["numpy", "cupy"])
+def test_bin_spectrum_centres_zero_frequency(backend):
+    set_backend(backend)
+    xp = np()
+    spec = xp.zeros((8, 8))
+    spec[0, 0] = 1.0   # zero frequency
+    spec[-1, 0] = 2.0  # frequency -1 shares its bin
+    spec[1, 0] = 4.0   # frequency +1 goes to the next bin
+    binned = bin_spectrum(spec, 2)
+    assert binned.shape == (4, 4)
+    assert binned[0, 0] == 3.0 and binned[1, 0] == 4.0
+    assert float(binned.sum()) == 7.0
+    with pytest.raises(ValueError):
+        bin_spectrum(spec, 3)
+
+
+@pytest.mark.parametrize("backend", ["numpy", "cupy"])
+def test_bin_detector_consistent_geometry(backend, make_ptycho):
+    set_backend(backend)
+    xp = np()
+    ptycho = make_ptycho(num_points=30, r=0.1)
+    ptycho.pixel_size = 10.0
+    binned = bin_detector(ptycho, 2)
+
+    assert binned.prb_len == 32 and binned.obj_len == ptycho.obj_len
+    assert binned.pixel_size == 10.0
+    assert binned.diffraction_stack.shape == (ptycho.n_scan, 32, 32)
+    assert (binned.positions == ptycho.positions).all()
+    assert (binned.offsets == ptycho.offsets + 16).all()
+    # binning conserves the total intensity
+    assert xp.allclose((binned.diffraction_stack ** 2).sum(axis=(1, 2)),
+                       (ptycho.diffraction_stack ** 2).sum(axis=(1, 2)), rtol=1e-4)
+
+    # the cropped-window forward model reproduces the binned data up to model error
+    sim = xp.stack([d.diffraction for d in generate_diffraction(binned, binned.scan_pos)])
+    data = binned.diffraction_stack
+    assert float(xp.linalg.norm(sim - data) / xp.linalg.norm(data)) < 0.2
+
+    with pytest.raises(ValueError):
+        bin_detector(ptycho, 3)
+
+
+def test_reduce_detector_crop_then_bin(make_ptycho):
+    set_backend("numpy")
+    xp = np()
+    ptycho = make_ptycho(num_points=30, r=0.2)
+    ptycho.pixel_size = 10.0
+    reduced = ptycho.reduce_detector(size=32, binning=2)
+
+    assert reduced.prb_len == 16 and reduced.obj_len == 256
+    assert reduced.pixel_size == 20.0
+    assert reduced.diffraction_stack.shape == (ptycho.n_scan, 16, 16)
+    reduced.geometry  # patches lie inside the coarse grid
+    assert ptycho.prb_len == 64 and ptycho.diffraction_stack.shape[1:] == (64, 64)
+    obj = DifferenceMap(reduced, seed=0).run(n_iter=2)[0]
+    assert obj.shape == (256, 256) and np().isfinite(obj).all()
+
+    # the method delegates to the preprocessing function
+    assert xp.array_equal(reduce_detector(ptycho, size=32, binning=2).diffraction_stack, reduced.diffraction_stack)
+    same = reduce_detector(ptycho)
+    assert same is not ptycho and same.n_scan == ptycho.n_scan
+
+
+def test_bin_detector_sums_photon_counts(make_ptycho):
+    set_backend("numpy")
+    xp = np()
+    scale = 1000.0
+
+    def noisy():
+        ptycho = make_ptycho(num_points=10, r=0.1)
+        PoissonNoise(scale=scale, seed=0) @ ptycho
+        return ptycho
+
+    # counts storage: the stored counts are summed and stay counts
+    counted = noisy()
+    counted.compact_storage("counts")
+    binned_counts = bin_detector(counted, 2)
+    assert binned_counts.encoding == "counts" and binned_counts.count_scale == scale
+    assert xp.array_equal(binned_counts.diffraction_stack,
+                          bin_spectrum(counted.diffraction_stack.astype(xp.int64), 2))
+
+    # Anscombe amplitudes: the 3/8 offset enters each binned pixel once
+    amplitudes = noisy()
+    binned_amp = bin_detector(amplitudes, 2)
+    assert binned_amp.encoding is None
+    counts = binned_amp.diffraction_stack.astype(xp.float64) ** 2 * scale - 3.0 / 8.0
+    assert xp.allclose(counts, binned_counts.diffraction_stack, atol=0.05)
+    assert xp.allclose(binned_amp.take_amplitude(), binned_counts.take_amplitude(), atol=1e-4)
+
+    # crop then bin keeps the count storage
+    reduced = reduce_detector(counted, size=32, binning=2)
+    assert reduced.encoding == "counts" and reduced.diffraction_stack.dtype == counted.diffraction_stack.dtype
+
+
+def test_bin_detector_on_subset_uses_photon_counts(make_ptycho):
+    set_backend("numpy")
+    xp = np()
+    ptycho = make_ptycho(num_points=10, r=0.1)
+    PoissonNoise(scale=1000.0, seed=0) @ ptycho
+    rows = [1, 4, 7]
+
+    binned = bin_detector(ptycho.subset(rows), 2)
+    assert binned.noise_stats is ptycho.noise_stats
+    assert xp.array_equal(binned.diffraction_stack, bin_detector(ptycho, 2).diffraction_stack[rows])
+
+
+def test_upsample_object():
+    set_backend("numpy")
+    xp = np()
+    obj = xp.arange(4, dtype=xp.complex64).reshape(2, 2)
+    fine = upsample_object(obj, 2, obj_len=5)
+    assert fine.shape == (5, 5)
+    assert fine[1, 1] == 0 and fine[0, 3] == 1 and fine[3, 0] == 2 and fine[4, 4] == 3
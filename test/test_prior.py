@@ -77,3 +77,63 @@ def test_no_prior_means_prior_is_none():
     ptycho = make_dummy_ptycho()
     engine = PtychoEP(ptycho, prior_name="gaussian")  # special case
     assert engine.obj_node.prior is None
+
+
+@pytest.mark.parametrize("kwargs", [
+    dict(prior_region="illuminated"),
+    dict(prior_region="illuminated", prior_tile=32, prior_threads=2),
+])
+def test_sparse_prior_illuminated_region_matches_full(kwargs):
+    ptycho = make_dummy_ptycho(image_size=256, probe_size=64, step=32)
+    # leave part of the object unscanned
+    ptycho = ptycho.subset(ptycho.positions[:, 0] < 150)
+
+    ep_full = PtychoEP(ptycho, prior_name="sparse", sparsity=0.2, seed=0)
+    mean_full, prec_full = ep_full.run(n_iter=4)
+
+    ep = PtychoEP(ptycho, prior_name="sparse", sparsity=0.2, seed=0, **kwargs)
+    mean, prec = ep.run(n_iter=4)
+
+    tiles = ep.obj_node.prior.tiles
+    assert tiles and sum((sy.stop - sy.start) * (sx.stop - sx.start) for sy, sx in tiles) < 256 * 256
+    assert np().allclose(mean, mean_full, atol=1e-5)
+    assert np().allclose(prec, prec_full, rtol=1e-5)
+
+
+def test_sparse_prior_illuminated_region_survives_mean_access():
+    """Reading msg_to_object.mean (mean form) must not drop later tile updates."""
+    ptycho = make_dummy_ptycho(image_size=256, probe_size=64, step=32)
+    ptycho = ptycho.subset(ptycho.positions[:, 0] < 150)
+
+    ep_full = PtychoEP(ptycho, prior_name="sparse", sparsity=0.2, seed=0)
+    mean_full, prec_full = ep_full.run(n_iter=4)
+
+    ep = PtychoEP(ptycho, prior_name="sparse", sparsity=0.2, seed=0, prior_region="illuminated",
+                  callback=lambda i, e, o: ep.obj_node.prior.msg_to_object.mean)
+    mean, prec = ep.run(n_iter=4)
+
+    assert not ep.obj_node.prior.msg_to_object.is_natural
+    assert np().allclose(mean, mean_full, atol=1e-5)
+    assert np().allclose(prec, prec_full, rtol=1e-5)
+
+
+def test_sparse_prior_schedule():
+    ptycho = make_dummy_ptycho()
+    ep = PtychoEP(ptycho, prior_name="sparse", sparsity=0.2, prior_interval=3)
+    ep.run(n_iter=7)
+    assert ep.obj_node.prior.n_updates == 3  # iterations 0, 3 and 6
+
+    # error-gated: no previous error at iteration 0
+    ep = PtychoEP(ptycho, prior_name="sparse", sparsity=0.2, prior_start_error=1e9)
+    ep.run(n_iter=3)
+    assert ep.obj_node.prior.n_updates == 2
+
+    ep = PtychoEP(ptycho, prior_name="sparse", sparsity=0.2, prior_start_error=0.0)
+    ep.run(n_iter=3)
+    assert ep.obj_node.prior.n_updates == 0
+
+
+def test_sparse_prior_invalid_region():
+    ptycho = make_dummy_ptycho()
+    with pytest.raises(ValueError):
+        PtychoEP(ptycho, prior_name="sparse", prior_region="dirty")
@@ -68,3 +68,65 @@ def test_probe_updater_runs_and_updates_probe(backend):
     for probe in obj_node.probe_registry.values():
         precision = probe.child.msg_from_likelihood.precision
         assert precision > 0
+
+
+def _build_graph(num_points=20):
+    obj = load_data_image("lily.png") * backend_np().exp(1j * (backend_np().pi / 2) * load_data_image("moon.png"))
+    probe = circular_aperture(size=64, r=0.5)
+    ptycho = Ptycho()
+    ptycho.set_object(obj)
+    ptycho.set_probe(probe)
+    ptycho.forward_and_set_diffraction(generate_spiral_scan_positions(512, 64, num_points, step=24.0))
+    obj_node = Object(shape=obj.shape, rng=None, initial_probe=probe, initial_object=obj)
+    for diff in ptycho._diff_data:
+        obj_node.register_data(diff)
+    for diff in ptycho._diff_data:
+        obj_node.forward(diff)
+        probe_node = obj_node.probe_registry[diff]
+        probe_node.forward()
+        probe_node.child.forward()
+        probe_node.child.likelihood.backward()
+        probe_node.child.backward()
+        probe_node.backward()
+        obj_node.backward(diff)
+    return ptycho, obj_node
+
+
+@pytest.mark.parametrize("sampling", ["random", "stratified"])
+def test_probe_updater_stochastic_mode(sampling):
+    set_backend("numpy")
+    xp = backend_np()
+    _, obj_node = _build_graph()
+    probes = list(obj_node.probe_registry.values())
+    updater = ProbeUpdater(obj_node, subsample=0.25, sampling=sampling, full_batch_tol=None, seed=0)
+
+    # the first call is a full batch and matches the full-batch updater
+    _, ref_node = _build_graph()
+    ProbeUpdater(ref_node).update(n_iter=1)
+    updater.update(n_iter=1)
+    ref_probe = next(iter(ref_node.probe_registry.values())).data
+    assert xp.allclose(probes[0].data, ref_probe, rtol=1e-4, atol=1e-6)
+
+    # later calls only refresh the precisions of the sampled scans
+    sel = updater._sample(len(probes))
+    assert len(sel) == 5 and len(set(sel.tolist())) == 5
+    for probe in probes:
+        probe.child.msg_from_likelihood.precision = -1.0
+    updater.update(n_iter=1)
+    refreshed = sum(probe.child.msg_from_likelihood.precision > 0 for probe in probes)
+    assert refreshed == 5
+    # every probe node shares the new estimate
+    assert all(xp.array_equal(probe.data, probes[0].data) for probe in probes)
+
+
+def test_probe_updater_switches_to_full_batch():
+    set_backend("numpy")
+    _, obj_node = _build_graph()
+    updater = ProbeUpdater(obj_node, subsample=5, full_batch_tol=1.0, seed=0)
+    updater.update()
+    assert not updater.full_batch
+    updater.update()  # change below the (loose) tolerance
+    assert updater.full_batch and updater._scan_stats is None
+
+    with pytest.raises(ValueError):
+        ProbeUpdater(obj_node, sampling="cyclic")
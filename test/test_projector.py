@@ -0,0 +1,56 @@
+import pytest
+from ptychoep.backend.backend import set_backend, np as backend_np
+from ptychoep.ptycho.projector import Fourier_projector, FourierProjector
+
+
+def make_waves(xp, shape, seed=0):
+    rng = xp.random.default_rng(seed) if hasattr(xp.random, "default_rng") else xp.random
+    exit_wave = (rng.standard_normal(shape) + 1j * rng.standard_normal(shape)).astype(xp.complex64)
+    target = xp.abs(rng.standard_normal(shape)).astype(xp.float32)
+    return exit_wave, target
+
+
+@pytest.mark.parametrize("backend", ["numpy", "cupy"])
+@pytest.mark.parametrize("shape", [(16, 16), (5, 16, 16)])
+def test_projector_matches_function(backend, shape):
+    set_backend(backend)
+    xp = backend_np()
+    exit_wave, target = make_waves(xp, shape)
+    projector = FourierProjector()
+
+    ref, ref_err = Fourier_projector(exit_wave, target)
+    proj, err = projector(exit_wave, target)
+    assert xp.allclose(proj, ref, atol=1e-5)
+    assert err == pytest.approx(ref_err, rel=1e-5)
+
+    res, err = projector.residual(exit_wave, target)
+    assert xp.allclose(res, ref - exit_wave, atol=1e-5)
+    assert projector.error(exit_wave, target) == pytest.approx(ref_err, rel=1e-5)
+
+    if len(shape) == 3:
+        _, ref_per_scan = Fourier_projector(exit_wave, target, return_per_scan=True)
+        _, per_scan = projector(exit_wave, target, return_per_scan=True)
+        assert xp.allclose(per_scan, ref_per_scan, rtol=1e-5)
+
+
+@pytest.mark.parametrize("backend", ["numpy", "cupy"])
+def test_projector_reuses_workspaces(backend):
+    set_backend(backend)
+    xp = backend_np()
+    projector = FourierProjector((4, 8, 8))
+    exit_wave, target = make_waves(xp, (4, 8, 8))
+
+    proj, _ = projector(exit_wave, target)
+    proj2, _ = projector(exit_wave, target)
+    assert proj2 is proj or proj2.base is proj.base  # same workspace
+
+    # a smaller batch is served from views of the same buffers
+    ws = projector._ws
+    ref, _ = Fourier_projector(exit_wave[:3], target[:3])
+    small, _ = projector(exit_wave[:3], target[:3])
+    assert projector._ws is ws
+    assert xp.allclose(small, ref, atol=1e-5)
+
+    out = xp.empty((4, 8, 8), dtype=xp.complex64)
+    res, _ = projector(exit_wave, target, out=out)
+    assert res is out
@@ -86,3 +86,154 @@ def test_add_diffraction_data_invalid_type():
     p = Ptycho()
     with pytest.raises(TypeError):
         p.add_diffraction_data("not a DiffractionData")  # type: ignore
+
+def test_compacted_roi_mapping():
+    """compactedが走査領域を含む正方サブグリッドを返し、expand/cropで往復できる"""
+    xp = backend_np()
+    p = Ptycho()
+    p.set_object(xp.arange(64 * 64, dtype=xp.complex64).reshape(64, 64))
+    p.set_probe(xp.ones((8, 8), dtype=xp.complex64))
+    for pos in [(20, 20), (20, 30), (26, 24)]:
+        y, x = pos
+        p.add_diffraction_data(DiffractionData(position=pos, diffraction=xp.ones((8, 8)),
+                                               indices=(slice(y - 4, y + 4), slice(x - 4, x + 4))))
+
+    c = p.compacted()
+    # bounding box y: 16..30, x: 16..34 -> square of 18 pixels
+    assert c.obj_len == 18 and c.parent_obj_len == 64
+    assert c.roi == (slice(14, 32), slice(16, 34))
+    for d_c, d in zip(c._diff_data, p._diff_data):
+        assert d_c.diffraction is d.diffraction
+        assert xp.array_equal(c.obj[d_c.indices], p.obj[d.indices])
+    c.geometry  # all patches inside the compact grid
+
+    full = c.expand(c.obj, fill=-1)
+    assert full.shape == (64, 64)
+    assert xp.array_equal(full[c.roi], p.obj[c.roi])
+    assert full[0, 0] == -1
+    assert xp.array_equal(c.crop(p.obj), c.obj)
+    obj, prb = c.expand_result((c.obj, p.prb))
+    assert obj.shape == (64, 64) and prb is p.prb
+    # uncompacted instances map nothing
+    assert p.expand(p.obj) is p.obj and p.crop(p.obj) is p.obj
+
+def _make_stack_ptycho(n=6, size=8):
+    xp = backend_np()
+    p = Ptycho()
+    p.set_object(xp.zeros((64, 64), dtype=xp.complex64))
+    p.set_probe(xp.ones((size, size), dtype=xp.complex64))
+    records = []
+    for i in range(n):
+        y, x = 10 + 5 * i, 40 - 4 * i
+        records.append(DiffractionData(position=(y, x), diffraction=xp.full((size, size), float(i), dtype=xp.float32),
+                                       indices=(slice(y - 4, y + 4), slice(x - 4, x + 4))))
+    p.add_diffraction_data_list(records)
+    return p, records
+
+def test_diffraction_stack_views():
+    """回折パターンは連続スタックに格納され、DiffractionDataはその行のビューになる"""
+    p, records = _make_stack_ptycho()
+    stack = p.diffraction_stack
+    assert stack.shape == (6, 8, 8) and stack.flags.c_contiguous
+    assert all(np.shares_memory(d.diffraction, stack) for d in records)
+    assert np.array_equal(p.positions[:, 0], 10 + 5 * np.arange(6))
+    assert np.array_equal(p.offsets[2], (16, 28))
+
+    # in-place changes are seen through both
+    records[1].diffraction += 1
+    assert (stack[1] == 2).all()
+
+    # appending grows the stack and re-points the existing views
+    p.add_diffraction_data(DiffractionData(position=(5, 5), diffraction=np.full((8, 8), 9.0, dtype=np.float32)))
+    assert p.n_scan == 7
+    assert (p.diffraction_stack[6] == 9).all()
+    assert all(np.shares_memory(d.diffraction, p.diffraction_stack) for d in p._diff_data)
+    with pytest.raises(ValueError):
+        p.add_diffraction_data(DiffractionData(position=(0, 0), diffraction=np.zeros((4, 4))))
+
+def test_sort_and_subset_are_permutations():
+    """ソートとサブセットはスタックを動かさず、走査順の置換として扱われる"""
+    p, records = _make_stack_ptycho()
+    storage = p._stack
+    p.sort_diffraction_data(key=lambda d: -d.position[0])
+    assert p._stack is storage
+    assert [d.position[0] for d in p._diff_data] == [35, 30, 25, 20, 15, 10]
+    assert np.array_equal(p.diffraction_stack[:, 0, 0], [5, 4, 3, 2, 1, 0])
+
+    sub = p.subset([0, 2])
+    assert sub.n_scan == 2 and sub._stack is storage
+    assert np.array_equal(sub.diffraction_stack[:, 0, 0], [5, 3])
+    assert sub._diff_data[0] is not records[5]  # own lightweight views
+    assert np.array_equal(sub.positions, p.positions[[0, 2]])
+
+    # appending to a subset copies its rows first and leaves the parent alone
+    sub.add_diffraction_data(DiffractionData(position=(1, 1), diffraction=np.full((8, 8), 7.0, dtype=np.float32)))
+    assert sub._stack is not storage
+    assert np.array_equal(sub.diffraction_stack[:, 0, 0], [5, 3, 7])
+    assert p.n_scan == 6 and np.array_equal(p.diffraction_stack[:, 0, 0], [5, 4, 3, 2, 1, 0])
+
+def test_forward_adopts_stack_without_copy():
+    """順計算の結果はそのままスタックとして採用され、ノイズはその場で加えられる"""
+    from ptychoep.ptycho.noise import GaussianNoise
+    xp = backend_np()
+    p = Ptycho()
+    p.set_object(xp.ones((32, 32), dtype=xp.complex64))
+    p.set_probe(xp.ones((8, 8), dtype=xp.complex64))
+    p.forward_and_set_diffraction([(8, 8), (16, 16), (24, 24)])
+    stack = p.diffraction_stack
+    storage = p._stack
+    assert np.shares_memory(stack, storage) and stack.shape == storage.shape
+    clean = stack.copy()
+    GaussianNoise(var=1e-2, seed=0) @ p
+    assert p._stack is storage and not np.allclose(stack, clean)
+    assert np.array_equal(p.diffs[1], stack[1])
+
+def test_compact_storage_counts_and_float16():
+    """光子数(uint16)およびfloat16での圧縮格納と、エンジンでの逐次デコードを確認"""
+    from ptychoep.ptycho.noise import PoissonNoise, GaussianNoise
+    from ptychoep.classic_engines.difference_map import DifferenceMap
+    xp = backend_np()
+    p = Ptycho()
+    rng = np.random.default_rng(0)
+    p.set_object(xp.asarray(rng.standard_normal((48, 48)) + 1j * rng.standard_normal((48, 48)), dtype=xp.complex64))
+    p.set_probe(xp.ones((16, 16), dtype=xp.complex64) / 16)
+    p.forward_and_set_diffraction([(12, 12), (12, 24), (24, 24), (36, 30), (30, 16)])
+    PoissonNoise(scale=100.0, seed=0) @ p
+    p.sort_diffraction_data(key="center_distance")
+    ref = p.diffraction_stack.copy()
+    dm_ref = DifferenceMap(p, seed=0).run(n_iter=2)[0]
+    records = p._diff_data
+
+    p.compact_storage("counts")
+    assert p._stack.dtype == np.uint16 and p.encoding == "counts" and p.count_scale == 100.0
+    assert p._diff_data == records  # same DiffractionData, re-pointed to the compact rows
+    assert np.array_equal(p.take_amplitude(), ref)  # exact for Poisson data
+    assert np.array_equal(p.diffs[2], ref[2])
+    assert np.array_equal(DifferenceMap(p, seed=0).run(n_iter=2)[0], dm_ref)
+    with pytest.raises(ValueError):
+        GaussianNoise(var=1e-3) @ p
+
+    # subsets and compacted views keep the noise statistics (photon scale)
+    p = Ptycho()
+    p.set_object(xp.asarray(rng.standard_normal((48, 48)) + 1j * rng.standard_normal((48, 48)), dtype=xp.complex64))
+    p.set_probe(xp.ones((16, 16), dtype=xp.complex64) / 16)
+    p.forward_and_set_diffraction([(12, 12), (12, 24), (24, 24), (36, 30), (30, 16)])
+    PoissonNoise(scale=100.0, seed=0) @ p
+    for view in (p.subset([0, 2, 3]), p.compacted()):
+        assert view.noise_stats is p.noise_stats
+        ref = view.take_amplitude().copy()
+        view.compact_storage("counts")
+        assert view.count_scale == 100.0
+        assert np.array_equal(view.take_amplitude(), ref)
+    assert p.encoding is None
+
+    q = Ptycho()
+    q.set_object(p.obj)
+    q.set_probe(p.prb)
+    q.forward_and_set_diffraction([(12, 12), (24, 24)])
+    amp = q.diffraction_stack.copy()
+    with pytest.raises(ValueError):
+        q.compact_storage("counts")  # no photon scale known
+    q.compact_storage("float16")
+    assert q._stack.dtype == np.float16
+    assert np.allclose(q.take_amplitude(), amp, rtol=1e-3, atol=1e-4)
@@ -4,6 +4,7 @@ from ptychoep.ptycho.core import Ptycho
 from ptychoep.utils.io_utils import load_data_image
 from ptychoep.ptycho.aperture_utils import circular_aperture
 from ptychoep.ptycho.scan_utils import generate_spiral_scan_positions
+from ptychoep.ptycho.noise import GaussianNoise
 from ptychoep.ptychoep.core import PtychoEP
 
 @pytest.mark.parametrize("backend", ["numpy", "cupy"])
@@ -51,3 +52,107 @@ def test_ptycho_ep_end_to_end(backend):
     assert xp.iscomplexobj(est_obj)
     assert xp.isrealobj(est_obj_precision)
     assert len(errors) == 1
+
+
+@pytest.mark.parametrize("warm_start", ["dm", "pie"])
+def test_ptycho_ep_warm_start(warm_start):
+    set_backend("numpy")
+    xp = backend_np()
+    obj = load_data_image("lily.png") * xp.exp(1j * (xp.pi / 2) * load_data_image("moon.png"))
+    ptycho = Ptycho()
+    ptycho.set_object(obj)
+    ptycho.set_probe(circular_aperture(size=64, r=0.45))
+    ptycho.forward_and_set_diffraction(generate_spiral_scan_positions(512, 64, 40, step=16.0))
+
+    ep = PtychoEP(ptycho, damping=0.7, seed=0, warm_start=warm_start, warm_start_iter=5,
+                  n_probe_update=1, prb_init=circular_aperture(size=64, r=0.4))
+    assert ep.warm_start_engine.monitor.n_done == 5
+
+    # the object messages are seeded with the warm-start result
+    warm_obj = ep.warm_start_engine.obj
+    belief = ep.obj_node.get_belief()
+    diff = ptycho._diff_data[0]
+    # (the accumulator starts from a zero-mean, unit-precision base)
+    weighted = (belief.mean * belief.precision)[diff.indices]
+    expected = (warm_obj * (belief.precision - 1))[diff.indices]
+    assert xp.allclose(weighted, expected, atol=1e-3)
+    # blind mode: the probe is seeded as well
+    assert xp.allclose(ep.obj_node.probe_registry[diff].data, ep.warm_start_engine.prb)
+
+    mean, precision, probe = ep.run(n_iter=2)
+    assert mean.shape == obj.shape
+
+
+@pytest.mark.parametrize("n_probe_update", [0, 2])
+def test_ptycho_ep_warm_start_does_not_end_worse(n_probe_update, make_ptycho):
+    set_backend("numpy")
+    xp = backend_np()
+    ptycho = make_ptycho(num_points=30, step=12)
+    GaussianNoise(var=1e-4, seed=0) @ ptycho
+    prb_init = xp.array(load_data_image("probe_init.png"), dtype=xp.complex64)
+
+    errors = []
+    ep = PtychoEP(ptycho, damping=0.5, seed=0, prb_init=prb_init, n_probe_update=n_probe_update,
+                  warm_start="pie", warm_start_iter=5, callback=lambda i, e, o: errors.append(e))
+    ep.run(n_iter=12)
+    assert errors[-1] < errors[0]
+
+
+def test_ptycho_ep_warm_start_invalid():
+    set_backend("numpy")
+    ptycho = Ptycho()
+    ptycho.set_object(load_data_image("lily.png").astype(complex))
+    ptycho.set_probe(circular_aperture(size=64, r=0.45))
+    ptycho.forward_and_set_diffraction(generate_spiral_scan_positions(512, 64, 10))
+    with pytest.raises(ValueError):
+        PtychoEP(ptycho, warm_start="raar")
+
+
+def test_ptycho_ep_probe_update_interval():
+    set_backend("numpy")
+    xp = backend_np()
+    ptycho = Ptycho()
+    ptycho.set_object(load_data_image("lily.png") * xp.exp(1j * (xp.pi / 2) * load_data_image("moon.png")))
+    ptycho.set_probe(circular_aperture(size=64, r=0.45))
+    ptycho.forward_and_set_diffraction(generate_spiral_scan_positions(512, 64, 30, step=16.0))
+
+    ep = PtychoEP(ptycho, damping=0.7, seed=0, n_probe_update=1, probe_update_interval=3,
+                  probe_update_options=dict(subsample=0.5, seed=0))
+    calls = []
+    update = ep.probe_updater.update
+    ep.probe_updater.update = lambda n_iter: calls.append(n_iter) or update(n_iter)
+    ep.run(n_iter=7)
+    assert len(calls) == 3  # iterations 0, 3 and 6
+    assert ep.probe_updater.subsample == 0.5
+
+
+def test_ptycho_ep_support_threshold():
+    set_backend("numpy")
+    xp = backend_np()
+    obj = load_data_image("lily.png") * xp.exp(1j * (xp.pi / 2) * load_data_image("moon.png"))
+    ptycho = Ptycho()
+    ptycho.set_object(obj)
+    ptycho.set_probe(circular_aperture(size=64, r=0.3))
+    ptycho.forward_and_set_diffraction(generate_spiral_scan_positions(512, 64, 60, step=10.0))
+
+    errors = {}
+    results = {}
+    for thr in (None, 1e-3):
+        errs = []
+        ep = PtychoEP(ptycho, damping=0.7, seed=0, support_threshold=thr,
+                      callback=lambda i, e, o: errs.append(e))
+        results[thr] = ep.run(n_iter=10)
+        errors[thr] = errs
+
+    # compact messages over the aperture pixels
+    n_support = int((xp.abs(ptycho.prb) > 1e-3 * xp.abs(ptycho.prb).max()).sum())
+    msg = next(iter(ep.obj_node.msg_from_data.values()))
+    assert msg.weighted_mean.shape == (n_support,)
+
+    # same fit quality as the full-patch computation
+    assert errors[1e-3][-1] < 1.2 * errors[None][-1]
+    mean, prec = results[1e-3]
+    assert mean.shape == obj.shape and prec.shape == obj.shape
+
+    with pytest.raises(ValueError):
+        PtychoEP(ptycho, support_threshold=1e-3, n_probe_update=1)
@@ -0,0 +1,91 @@
+import time
+import pytest
+import numpy as _np
+from ptychoep.backend.backend import set_backend
+from ptychoep.ptycho.core import Ptycho
+from ptychoep.utils.io_utils import load_data_image
+from ptychoep.ptycho.scan_utils import generate_spiral_scan_positions
+from ptychoep.ptycho.aperture_utils import circular_aperture
+from ptychoep.classic_engines.epie import ePIE
+from ptychoep.classic_engines.difference_map import DifferenceMap
+from ptychoep.ptychoep.core import PtychoEP
+from ptychoep.utils.run_control import RunMonitor
+
+
+def drive(monitor, errors, sleep=0.0):
+    """Feed a sequence of errors; the snapshot is the iteration index."""
+    for it in monitor:
+        if sleep:
+            time.sleep(sleep)
+        monitor.record(errors[it] if it < len(errors) else errors[-1], lambda: it)
+    return monitor
+
+
+def test_monitor_stops_on_n_iter_without_tracking():
+    m = drive(RunMonitor(n_iter=3), [3.0, 2.0, 1.0, 0.5])
+    assert m.stop_reason == "n_iter"
+    assert m.n_done == 3
+    assert m.best_result is None
+    assert m.result("last") == "last"
+
+
+def test_monitor_target_error_and_best_so_far():
+    m = drive(RunMonitor(n_iter=10, target_error=0.5), [3.0, 1.0, 2.0, 0.4, 0.1])
+    assert m.stop_reason == "target_error"
+    assert m.n_done == 4
+    assert m.best_iter == 3 and m.best_result == 3
+
+    m = drive(RunMonitor(n_iter=4, target_error=0.0), [3.0, 1.0, 2.0, 5.0])
+    assert m.result("last") == 1  # best, not last
+
+
+def test_monitor_stall_and_time_budget():
+    m = drive(RunMonitor(n_iter=None, stall_patience=2), [1.0, 0.5, 0.4999, 0.4999, 0.1])
+    assert m.stop_reason == "stall"
+    assert m.n_done == 4
+
+    m = drive(RunMonitor(n_iter=None, time_budget=0.05), [1.0], sleep=0.01)
+    assert m.stop_reason == "time_budget"
+    assert m.elapsed <= 0.05 + 0.02
+    assert 2 <= m.n_done <= 5
+
+
+def test_monitor_invalid_arguments():
+    with pytest.raises(ValueError):
+        RunMonitor(n_iter=None)
+    with pytest.raises(ValueError):
+        RunMonitor(stall_patience=0)
+
+
+@pytest.mark.parametrize("backend", ["numpy", "cupy"])
+def test_engines_accept_stopping_criteria(backend, make_ptycho):
+    set_backend(backend)
+    ptycho = make_ptycho(num_points=30)
+
+    errors = []
+    epie = ePIE(ptycho, prb_init=ptycho.prb.copy(), seed=0, callback=lambda it, e, o: errors.append(e))
+    obj, prb = epie.run(n_iter=50, target_error=1e-3)
+    assert epie.monitor.stop_reason in ("target_error", "n_iter")
+    assert epie.monitor.best_error == min(errors)
+
+    dm = DifferenceMap(ptycho, seed=0)
+    obj, prb = dm.run(n_iter=None, stall_patience=2, time_budget=30.0)
+    assert dm.monitor.stop_reason in ("stall", "time_budget")
+    assert obj.shape == ptycho.obj.shape
+
+
+def test_ptycho_ep_returns_best_so_far():
+    set_backend("numpy")
+    obj = load_data_image("lily.png") * _np.exp(1j * _np.pi / 2 * load_data_image("moon.png"))
+    ptycho = Ptycho()
+    ptycho.set_object(obj)
+    ptycho.set_probe(circular_aperture(size=64, r=0.45))
+    ptycho.forward_and_set_diffraction(generate_spiral_scan_positions(512, 64, 40, step=16.0))
+
+    ep = PtychoEP(ptycho, damping=0.7, seed=0)
+    mean, precision = ep.run(n_iter=6, time_budget=60.0)
+    monitor = ep.monitor
+    assert monitor.n_done == 6 and len(monitor.errors) == 6
+    best_mean, best_precision = monitor.best_result
+    assert mean is best_mean and precision is best_precision
+    assert monitor.best_error == min(monitor.errors)
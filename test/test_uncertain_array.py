@@ -138,3 +138,65 @@ def test_fft_and_ifft(backend):
     assert ua_ifft.mean.shape == ua.mean.shape
     assert ua_ifft.scalar_precision is True
     assert xp.allclose(xp.abs(ua_ifft.mean), xp.abs(ua.mean), atol=1e-4)
+
+@pytest.mark.parametrize("backend", ["numpy", "cupy"])
+def test_natural_form_matches_mean_form(backend):
+    set_backend(backend)
+    xp = backend_np()
+    rng = get_rng(0)
+    ua1 = UncertainArray.normal((3, 3), rng, scalar_precision=False)
+    ua2 = UncertainArray(ua1.mean * 0.5, xp.full((3, 3), 3.0, dtype=xp.float32))
+    ua3 = UncertainArray(ua1.mean * 2.0, xp.full((3, 3), 0.5, dtype=xp.float32))
+
+    # product and quotient are returned in natural form, mean is lazy
+    chain = (ua1 * ua2) / ua3
+    assert chain.is_natural
+    expected_prec = xp.maximum(1.0 + 3.0 - 0.5, 1.0)
+    expected_mean = (ua1.mean + 3.0 * ua2.mean - 0.5 * ua3.mean) / expected_prec
+    assert xp.allclose(chain.precision, expected_prec)
+    assert xp.allclose(chain.mean, expected_mean, atol=1e-5)
+
+    nat = UncertainArray.from_natural(chain.weighted_mean, chain.precision)
+    assert xp.allclose(nat.mean, chain.mean)
+
+@pytest.mark.parametrize("backend", ["numpy", "cupy"])
+def test_to_natural_and_setters(backend):
+    set_backend(backend)
+    xp = backend_np()
+    mean = xp.full((2, 2), 2.0 + 1.0j, dtype=xp.complex64)
+    ua = UncertainArray(mean, xp.full((2, 2), 4.0, dtype=xp.float32))
+    assert not ua.is_natural
+    ua.to_natural()
+    assert ua.is_natural
+    assert xp.allclose(ua.weighted_mean, 4.0 * mean)
+
+    # changing the precision keeps the mean fixed
+    ua.precision = xp.full((2, 2), 2.0, dtype=xp.float32)
+    assert not ua.is_natural
+    assert xp.allclose(ua.mean, mean)
+    assert xp.allclose(ua.weighted_mean, 2.0 * mean)
+
+    ua.mean = xp.zeros((2, 2), dtype=xp.complex64)
+    assert xp.allclose(ua.weighted_mean, 0)
+
+    ua_copy = UncertainArray.from_natural(mean, 1.0).copy()
+    assert ua_copy.is_natural
+    assert xp.allclose(ua_copy.mean, mean)
+
+@pytest.mark.parametrize("backend", ["numpy", "cupy"])
+def test_in_place_mean_update_is_seen_by_products(backend):
+    set_backend(backend)
+    xp = backend_np()
+    mean = xp.full((2, 2), 1.0 + 1.0j, dtype=xp.complex64)
+    prec = xp.full((2, 2), 2.0, dtype=xp.float32)
+    other = UncertainArray(xp.zeros((2, 2), dtype=xp.complex64), xp.ones((2, 2), dtype=xp.float32))
+
+    # natural-form UA whose mean has been materialized, then edited in place
+    ua = UncertainArray.from_natural(2.0 * mean, prec)
+    ua.mean *= 3.0
+    assert xp.allclose(ua.weighted_mean, 6.0 * mean)
+    assert xp.allclose((ua * other).mean, 6.0 * mean / 3.0)
+
+    ua.mean[...] = 0
+    assert xp.allclose((ua * other).weighted_mean, 0)
+    assert xp.allclose(ua.damp_with(other, 0.5).mean, 0)
@@ -0,0 +1,128 @@
+from typing import Sequence, Union
+from ptychoep.backend.backend import np
+from ptychoep.ptycho.preprocess import crop_detector, fourier_resample, upsample_object
+
+
+class MultiResolution:
+    """
+    Coarse-to-fine reconstruction driver for PtychoEP and the classic engines.
+
+    Each level runs the engine on a Ptycho whose diffraction patterns are
+    centrally cropped by the level factor f (see `ptycho.preprocess.crop_detector`):
+    the FFTs are f^2 times smaller, the object pixels f times larger. The
+    object estimate of a level, upsampled by pixel repetition, initializes the
+    next level (`obj_init`); the last level (factor 1) runs on the original data.
+
+    A new engine is built per level, so the EP messages are re-initialized
+    from the upsampled estimate at every level.
+
+    Example:
+        driver = MultiResolution(PtychoEP, factors=(4, 2, 1), n_iter=(10, 10, 20), damping=0.7)
+        mean, precision = driver.run(ptycho)
+        first_look = driver.level_results[0]
+
+    Attributes:
+        engine_cls (type): Engine class, e.g. PtychoEP, DifferenceMap or rPIE.
+        factors (tuple): Detector crop factors per level, ending with 1.
+        n_iter (tuple): Iterations per level.
+        carry_probe (bool): If True, the probe estimate of a level (blind engines)
+            initializes the next level; otherwise every level starts from the
+            (resampled) `prb_init` or `ptycho.prb`.
+        engine_kwargs (dict): Keyword arguments passed to every engine.
+        engines (list): Engine of each level after `run`.
+        level_results (list): Result returned by each level's `run`.
+
+    Args:
+        engine_cls (type): Engine class; it must accept `ptycho` and `obj_init`
+            (and `prb_init` when one is passed).
+        factors (Sequence[int]): Decreasing crop factors, each a multiple of the next;
+            1 is appended if missing.
+        n_iter (int or Sequence[int]): Iterations for every level or per level.
+        carry_probe (bool): Carry the probe estimate across levels.
+        **engine_kwargs: Further engine arguments (e.g. damping, seed, callback).
+    """
+
+    def __init__(self, engine_cls, factors: Sequence[int] = (4, 2, 1),
+                 n_iter: Union[int, Sequence[int]] = 50, carry_probe: bool = False, **engine_kwargs):
+        factors = tuple(int(f) for f in factors)
+        if factors[-1] != 1:
+            factors = factors + (1,)
+        if any(f < 1 for f in factors) or any(a <= b for a, b in zip(factors[:-1], factors[1:])):
+            raise ValueError("factors must be strictly decreasing positive integers.")
+        if any(a % b for a, b in zip(factors[:-1], factors[1:])):
+            raise ValueError(f"Each factor must be a multiple of the next one, got {factors}.")
+        if isinstance(n_iter, int):
+            n_iter = (n_iter,) * len(factors)
+        if len(n_iter) != len(factors):
+            raise ValueError("n_iter must be an int or have one entry per level.")
+        self.engine_cls = engine_cls
+        self.factors = factors
+        self.n_iter = tuple(n_iter)
+        self.carry_probe = carry_probe
+        self.engine_kwargs = engine_kwargs
+        self.engines = []
+        self.level_results = []
+
+    def run(self, ptycho):
+        """
+        Run all levels on `ptycho`.
+
+        Args:
+            ptycho (Ptycho): Full-resolution data; prb_len must be divisible by every factor.
+
+        Returns:
+            The result of the engine's `run` at full resolution.
+
+        Raises:
+            ValueError: If prb_len is not divisible by every factor.
+        """
+        bad = [f for f in self.factors if ptycho.prb_len is None or ptycho.prb_len % f]
+        if bad:
+            raise ValueError(f"Probe size {ptycho.prb_len} is not divisible by the factors {bad}.")
+        kwargs = dict(self.engine_kwargs)
+        obj_init = kwargs.pop("obj_init", None)
+        prb_init = kwargs.pop("prb_init", None)
+        self.engines = []
+        self.level_results = []
+
+        obj, prb, prev_factor = None, None, None
+        for factor, n_iter in zip(self.factors, self.n_iter):
+            level = ptycho if factor == 1 else crop_detector(ptycho, ptycho.prb_len // factor)
+            level_kwargs = dict(kwargs)
+
+            if obj is not None:
+                level_kwargs["obj_init"] = upsample_object(obj, prev_factor // factor, level.obj_len)
+            elif obj_init is not None:
+                level_kwargs["obj_init"] = self._downsample(np().asarray(obj_init), factor, level.obj_len)
+
+            if self.carry_probe and prb is not None:
+                level_kwargs["prb_init"] = fourier_resample(prb, level.prb_len)
+            elif prb_init is not None:
+                level_kwargs["prb_init"] = fourier_resample(np().asarray(prb_init), level.prb_len)
+
+            engine = self.engine_cls(level, **level_kwargs)
+            result = engine.run(n_iter=n_iter)
+            self.engines.append(engine)
+            self.level_results.append(result)
+            obj, prb = self._split(engine, result)
+            prev_factor = factor
+
+        return self.level_results[-1]
+
+    @staticmethod
+    def _split(engine, result):
+        """(object, probe or None) from an engine result."""
+        from ptychoep.ptychoep.core import PtychoEP
+        if isinstance(engine, PtychoEP):
+            # (mean, precision) or (mean, precision, probe)
+            return result[0], (result[2] if len(result) == 3 else None)
+        if isinstance(result, tuple):
+            return result[0], result[1]
+        return result, None
+
+    @staticmethod
+    def _downsample(obj, factor, obj_len):
+        if factor == 1:
+            return obj
+        obj = obj[:obj_len * factor, :obj_len * factor]
+        return obj.reshape(obj_len, factor, obj_len, factor).mean(axis=(1, 3))
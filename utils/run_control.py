@@ -0,0 +1,138 @@
+import math
+import time
+from typing import Callable, Optional
+
+
+class RunMonitor:
+    """
+    Stopping rules and best-so-far tracking shared by all reconstruction engines.
+
+    The monitor is used as the iteration source of an engine's main loop:
+
+        monitor = RunMonitor(n_iter, time_budget, target_error, stall_patience)
+        for it in monitor:
+            ...                                  # one sweep, giving `err`
+            monitor.record(err, snapshot)        # snapshot() -> copy of the result
+        return monitor.result(result)            # best-so-far or `result`
+
+    Iteration stops when any of the configured criteria is met:
+
+    - `n_iter` iterations have run (None: no limit),
+    - the next iteration is expected to exceed `time_budget` seconds of wall
+      clock (the previous iteration's duration is used as the estimate),
+    - the error reaches `target_error`,
+    - the best error has not improved by a relative `stall_tolerance` for
+      `stall_patience` iterations.
+
+    When any criterion other than `n_iter` is set, the snapshot of the
+    iteration with the lowest error is kept and should be returned instead of
+    the last iterate.
+
+    Attributes:
+        stop_reason (str or None): "n_iter", "time_budget", "target_error" or "stall".
+        n_done (int): Number of completed iterations.
+        elapsed (float): Wall-clock seconds spent in the loop.
+        best_error (float or None): Lowest recorded error.
+        best_iter (int or None): Iteration at which `best_error` was recorded.
+        best_result: Snapshot taken at `best_iter` (only when tracking is active).
+        errors (list): Recorded error of every iteration.
+    """
+
+    def __init__(self, n_iter: Optional[int] = 100, time_budget: Optional[float] = None,
+                 target_error: Optional[float] = None, stall_patience: Optional[int] = None,
+                 stall_tolerance: float = 1e-3):
+        if n_iter is None and time_budget is None and target_error is None and stall_patience is None:
+            raise ValueError("At least one stopping criterion (n_iter, time_budget, target_error, "
+                             "stall_patience) must be given.")
+        if stall_patience is not None and stall_patience < 1:
+            raise ValueError("stall_patience must be a positive integer.")
+        self.n_iter = n_iter
+        self.time_budget = time_budget
+        self.target_error = target_error
+        self.stall_patience = stall_patience
+        self.stall_tolerance = stall_tolerance
+
+        self.stop_reason = None
+        self.n_done = 0
+        self.elapsed = 0.0
+        self.best_error = None
+        self.best_iter = None
+        self.best_result = None
+        self.errors = []
+        self._since_improvement = 0
+        self._stall_ref = None
+        self._t0 = None
+        self._t_last = None
+        self._last_duration = 0.0
+
+    @property
+    def tracks_best(self) -> bool:
+        """True if a criterion other than n_iter is set (best-so-far result is kept)."""
+        return self.time_budget is not None or self.target_error is not None or self.stall_patience is not None
+
+    def __iter__(self):
+        self._t0 = self._t_last = time.perf_counter()
+        it = 0
+        while True:
+            reason = self._check(it)
+            if reason is not None:
+                self.stop_reason = reason
+                return
+            yield it
+            it += 1
+
+    def _check(self, it) -> Optional[str]:
+        now = time.perf_counter()
+        self.elapsed = now - self._t0
+        if self.n_iter is not None and it >= self.n_iter:
+            return "n_iter"
+        if self.target_error is not None and self.errors and self.errors[-1] <= self.target_error:
+            return "target_error"
+        if self.stall_patience is not None and self._since_improvement >= self.stall_patience:
+            return "stall"
+        if self.time_budget is not None and it > 0 and self.elapsed + self._last_duration > self.time_budget:
+            return "time_budget"
+        return None
+
+    def record(self, err: float, snapshot: Optional[Callable] = None) -> None:
+        """
+        Record the error of the iteration just completed.
+
+        Args:
+            err (float): Error (fitness) of the current estimate; lower is better.
+                NaN (error not evaluated) only advances the iteration count.
+            snapshot (callable or None): Returns a copy of the engine result. It is
+                called only when the error improves and best-so-far tracking is active.
+        """
+        now = time.perf_counter()
+        self._last_duration = now - self._t_last
+        self._t_last = now
+        self.n_done += 1
+        err = float(err)
+        self.errors.append(err)
+
+        if math.isnan(err):
+            return
+        if self.best_error is None or err < self.best_error:
+            self.best_error = err
+            self.best_iter = self.n_done - 1
+            if self.tracks_best and snapshot is not None:
+                self.best_result = snapshot()
+
+        # stall: no relative improvement over the reference error for `stall_patience` iterations
+        if self._stall_ref is None or err < self._stall_ref * (1.0 - self.stall_tolerance):
+            self._stall_ref = err
+            self._since_improvement = 0
+        else:
+            self._since_improvement += 1
+
+    def result(self, current):
+        """Return the best-so-far snapshot if one was kept, otherwise `current`."""
+        return self.best_result if self.best_result is not None else current
+
+
+def copy_result(result):
+    """Copy an engine result (an array or a tuple of arrays) for use as a snapshot."""
+    if isinstance(result, tuple):
+        return tuple(r.copy() for r in result)
+    return result.copy()